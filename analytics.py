@@ -0,0 +1,144 @@
+import calendar
+import numpy as np
+
+# Rolling averages are taken over this many complete months before the current one
+ROLLING_WINDOWS = (3, 6, 12)
+
+# The current month plus enough complete months for the longest rolling window
+HISTORY_MONTHS = max(ROLLING_WINDOWS) + 1
+
+def month_ordinal(value):
+    """Return the number of months since 1970-01 for a 'YYYY-MM' key or a date"""
+    if isinstance(value, str):
+        return int(np.datetime64(value[:7], 'M').astype(np.int64))
+    return (value.year - 1970) * 12 + value.month - 1
+
+def month_keys_ending(value, count):
+    """Return the 'YYYY-MM' keys of the count months ending with the month of value, oldest first"""
+    last = month_ordinal(value)
+    ordinals = np.arange(last - count + 1, last + 1).astype('datetime64[M]')
+    return [str(month) for month in ordinals]
+
+class SpendingHistory:
+    """A user's spending as columnar arrays: month ordinal, category code and amount in minor units"""
+    
+    def __init__(self, month_ordinals, category_codes, amounts_minor, categories):
+        self.month_ordinals = np.asarray(month_ordinals, dtype=np.int64)
+        self.category_codes = np.asarray(category_codes, dtype=np.int64)
+        self.amounts_minor = np.asarray(amounts_minor, dtype=np.int64)
+        self.categories = list(categories)
+    
+    @classmethod
+    def from_expenses(cls, dates, categories, amounts_minor):
+        """Build a history from per-expense columns (dates, category names, minor-unit amounts)"""
+        names, codes = np.unique(np.asarray(categories, dtype=object).astype(str), return_inverse=True)
+        months = np.asarray(dates, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        return cls(months, codes, amounts_minor, names.tolist())
+    
+    @classmethod
+    def from_month_totals(cls, month_totals):
+        """Build a history from {'YYYY-MM': {category: total_minor}}, as returned by get_rollup_totals"""
+        categories = sorted({category for totals in month_totals.values() for category in totals})
+        codes = {category: code for code, category in enumerate(categories)}
+        
+        months, category_codes, amounts = [], [], []
+        for month, totals in month_totals.items():
+            ordinal = month_ordinal(month)
+            for category, total in totals.items():
+                months.append(ordinal)
+                category_codes.append(codes[category])
+                amounts.append(total)
+        return cls(months, category_codes, amounts, categories)
+    
+    def monthly_matrix(self, first_month, month_count, categories):
+        """Sum amounts into a (months x categories) int64 matrix for the given month range and category order"""
+        # Map this history's category codes onto the requested order; unknown categories are dropped
+        column_of = np.array([categories.index(name) if name in categories else -1 for name in self.categories], dtype=np.int64)
+        rows = self.month_ordinals - first_month
+        columns = column_of[self.category_codes]
+        keep = (rows >= 0) & (rows < month_count) & (columns >= 0)
+        
+        # bincount sums in float64, which is exact while totals stay below 2**53 minor units
+        cells = rows[keep] * len(categories) + columns[keep]
+        sums = np.bincount(cells, weights=self.amounts_minor[keep], minlength=month_count * len(categories))
+        return np.rint(sums).astype(np.int64).reshape(month_count, len(categories))
+
+class SpendingAnalytics:
+    """Per-category monthly totals, rolling averages, changes and budget use computed in vectorized passes"""
+    
+    def __init__(self, history, budgets_minor, today, categories=None, projected_minor=None):
+        # Known categories keep the caller's order; anything only seen in history goes last
+        self.categories = list(categories or budgets_minor)
+        self.categories += [name for name in history.categories if name not in self.categories]
+        self.index = {name: position for position, name in enumerate(self.categories)}
+        self.months = month_keys_ending(today, HISTORY_MONTHS)
+        
+        # Monthly totals, oldest first; the last row is the current month
+        self.monthly_totals = history.monthly_matrix(
+            month_ordinal(today) - HISTORY_MONTHS + 1, HISTORY_MONTHS, self.categories
+        )
+        self.current = self.monthly_totals[-1]
+        self.previous = self.monthly_totals[-2]
+        self.budgets = np.array([budgets_minor.get(name, 0) for name in self.categories], dtype=np.int64)
+        
+        # Rolling averages of complete months: cumulative sums walking back from last month
+        trailing = np.cumsum(self.monthly_totals[-2::-1], axis=0)
+        self.rolling_averages = {window: trailing[window - 1] / window for window in ROLLING_WINDOWS}
+        
+        # Month-end projections come from a forecast when given, otherwise from the current daily rate
+        self.days_elapsed = today.day
+        self.days_in_month = calendar.monthrange(today.year, today.month)[1]
+        if projected_minor is None:
+            self.projected = self.current * (self.days_in_month / self.days_elapsed)
+        else:
+            self.projected = np.array([projected_minor.get(name, 0) for name in self.categories], dtype=np.float64)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.change_percent = np.where(self.previous > 0, (self.current - self.previous) / self.previous * 100, np.nan)
+            self.utilization = np.where(self.budgets > 0, self.current / self.budgets * 100, np.nan)
+            self.projected_utilization = np.where(self.budgets > 0, self.projected / self.budgets * 100, np.nan)
+    
+    @property
+    def current_total(self):
+        """Total spent in the current month, in minor units"""
+        return int(self.current.sum())
+    
+    @property
+    def previous_total(self):
+        """Total spent in the previous month, in minor units"""
+        return int(self.previous.sum())
+    
+    @property
+    def projected_total(self):
+        """Current month total projected to the end of the month, in minor units"""
+        return float(self.projected.sum())
+    
+    @property
+    def total_change_percent(self):
+        """Change of the current month total against the previous month, or None without a previous month"""
+        if self.previous_total <= 0:
+            return None
+        return (self.current_total - self.previous_total) / self.previous_total * 100
+    
+    def categories_where(self, mask):
+        """Return the names of categories selected by a boolean array, in category order"""
+        return [self.categories[position] for position in np.flatnonzero(mask)]
+    
+    def category_summary(self, name):
+        """Return one category's figures as plain Python values"""
+        position = self.index[name]
+        summary = {
+            'current_minor': int(self.current[position]),
+            'previous_minor': int(self.previous[position]),
+            'budget_minor': int(self.budgets[position]),
+            'change_percent': _optional(self.change_percent[position]),
+            'utilization': _optional(self.utilization[position]),
+            'projected_utilization': _optional(self.projected_utilization[position])
+        }
+        for window, averages in self.rolling_averages.items():
+            summary[f'average_{window}m_minor'] = float(averages[position])
+        return summary
+
+def _optional(value):
+    """Convert a NumPy scalar to float, or None where it is NaN"""
+    return None if np.isnan(value) else float(value)
@@ -1,9 +1,11 @@
 import os
 import logging
+import tempfile
 from flask import Flask, session, redirect, url_for, flash, request
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from flask_login import LoginManager, current_user, login_user, logout_user, login_required
+from query_cache import query_cache
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
@@ -26,8 +28,63 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
+# Password hashing: werkzeug method string such as "scrypt:32768:8:1" or "pbkdf2:sha256:600000",
+# and how many hashes may be computed at once per worker (default: half the cores)
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+app.config["PASSWORD_SALT_LENGTH"] = int(os.environ.get("PASSWORD_SALT_LENGTH", 16))
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+
+# Seconds a worker may serve the logged-in user from its in-process cache
+app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 60))
+
+# Seconds a worker may serve a user's categories from its in-process cache
+app.config["CATEGORY_CACHE_TTL"] = int(os.environ.get("CATEGORY_CACHE_TTL", 60))
+
+# Page sizes for the expense listing API
+app.config["EXPENSES_PAGE_SIZE"] = int(os.environ.get("EXPENSES_PAGE_SIZE", 50))
+app.config["EXPENSES_MAX_PAGE_SIZE"] = int(os.environ.get("EXPENSES_MAX_PAGE_SIZE", 200))
+
+# Batch size and error reporting limit for CSV imports
+app.config["IMPORT_BATCH_SIZE"] = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+app.config["IMPORT_MAX_ERRORS"] = int(os.environ.get("IMPORT_MAX_ERRORS", 100))
+
+# Rows fetched per round-trip when streaming exports
+app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+# Maximum number of operations accepted by the batch mutation API
+app.config["BATCH_MAX_OPERATIONS"] = int(os.environ.get("BATCH_MAX_OPERATIONS", 500))
+
+# Fitting a user's spending forecast longer than this (milliseconds) is logged as a warning
+app.config["FORECAST_FIT_BUDGET_MS"] = int(os.environ.get("FORECAST_FIT_BUDGET_MS", 50))
+
+# Stale insight bundles are served for this many seconds while the worker refreshes them
+app.config["INSIGHT_BUNDLE_MAX_STALE"] = int(os.environ.get("INSIGHT_BUNDLE_MAX_STALE", 300))
+
+# Seconds the insight worker sleeps when its queue is empty
+app.config["WORKER_POLL_INTERVAL"] = float(os.environ.get("WORKER_POLL_INTERVAL", 2))
+
+# Aggregate read cache: "memory" (per process LRU), "sqlite" (shared by the workers on a host) or "none"
+app.config["QUERY_CACHE_BACKEND"] = os.environ.get("QUERY_CACHE_BACKEND", "memory")
+app.config["QUERY_CACHE_MAX_BYTES"] = int(os.environ.get("QUERY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+app.config["QUERY_CACHE_PATH"] = os.environ.get("QUERY_CACHE_PATH", os.path.join(tempfile.gettempdir(), "fintrack-query-cache.sqlite3"))
+
+# Run a page's independent reads (rollups, categories, insights) concurrently on a thread pool,
+# each with its own pooled connection, so their database round-trips overlap
+app.config["CONCURRENT_READS"] = os.environ.get("CONCURRENT_READS", "0") == "1"
+app.config["CONCURRENT_READ_WORKERS"] = int(os.environ.get("CONCURRENT_READ_WORKERS", 4))
+
+# Prometheus metrics on /metrics; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "1") == "1"
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+
+# Development/staging SQL profiler: adds an X-SQL-Profile header and logs each request's statements,
+# warning about any statement repeated this many times (a likely N+1 loop)
+app.config["SQL_PROFILER"] = os.environ.get("SQL_PROFILER", "0") == "1"
+app.config["SQL_PROFILER_REPEAT_THRESHOLD"] = int(os.environ.get("SQL_PROFILER_REPEAT_THRESHOLD", 3))
+
 # Initialize the app with the extension
 db.init_app(app)
+query_cache.init_app(app)
 
 # Initialize login manager
 login_manager = LoginManager()
@@ -38,23 +95,5 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
-
-# Ensure the data directory exists (for backward compatibility)
-if not os.path.exists('data'):
-    os.makedirs('data')
-    
-# Initialize data files if they don't exist (for backward compatibility)
-from utils import initialize_data_files
-initialize_data_files()
-
-# Create database tables and migrate existing data
-with app.app_context():
-    db.create_all()
-    
-    # Import at this point to avoid circular imports
-    from models import migrate_data_from_json_to_db
-    
-    # Migrate data from JSON files to database if needed
-    migrate_data_from_json_to_db()
+    from models import get_cached_user
+    return get_cached_user(int(user_id))
@@ -0,0 +1,50 @@
+"""Measure POST /api/expenses throughput through the Flask test client
+
+Compare the cached login loader with the uncached one:
+
+    python benchmarks/bench_add_expense.py --requests 2000 --db-latency-ms 3
+    python benchmarks/bench_add_expense.py --requests 2000 --db-latency-ms 3 --user-cache-ttl 0
+"""
+import argparse
+import json
+import time
+from datetime import date
+
+from common import create_app, register_and_login, simulate_db_latency, summarize
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='number of expenses to add')
+    parser.add_argument('--database-url', default=None, help='database to use (default: temporary SQLite file)')
+    parser.add_argument('--user-cache-ttl', type=int, default=60, help='USER_CACHE_TTL; 0 disables the loader cache')
+    parser.add_argument('--db-latency-ms', type=float, default=0, help='simulated round-trip time per SQL statement')
+    args = parser.parse_args()
+    
+    app = create_app(args.database_url, USER_CACHE_TTL=args.user_cache_ttl)
+    client = app.test_client()
+    register_and_login(client, 'bench_add_expense')
+    simulate_db_latency(app, args.db_latency_ms)
+    
+    form = {'category': 'Food', 'amount': '12.50', 'date': date.today().isoformat(), 'description': 'benchmark'}
+    samples = []
+    cookies_sent = 0
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        request_started = time.perf_counter()
+        response = client.post('/api/expenses', data=form)
+        samples.append(time.perf_counter() - request_started)
+        if 'Set-Cookie' in response.headers:
+            cookies_sent += 1
+    elapsed = time.perf_counter() - started
+    
+    print(json.dumps({
+        'benchmark': 'post_api_expenses',
+        'user_cache_ttl': args.user_cache_ttl,
+        'db_latency_ms': args.db_latency_ms,
+        'requests_per_second': round(args.requests / elapsed, 1),
+        'responses_with_set_cookie': cookies_sent,
+        'latency': summarize(samples)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
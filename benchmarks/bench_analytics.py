@@ -0,0 +1,108 @@
+"""Compare the NumPy analytics engine with per-category Python loops
+
+Both sides compute monthly totals per category, rolling averages, month over
+month changes and budget utilization for one synthetic user:
+
+    python benchmarks/bench_analytics.py --rows 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from common import REPO_ROOT
+
+sys.path.insert(0, REPO_ROOT)
+
+from analytics import HISTORY_MONTHS, ROLLING_WINDOWS, SpendingAnalytics, SpendingHistory, month_keys_ending
+
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Health', 'Education', 'Other']
+
+def generate_expenses(row_count, today, seed=42):
+    """Generate expense dicts spread over the two years before today"""
+    rng = random.Random(seed)
+    return [
+        {
+            'category': rng.choice(CATEGORIES),
+            'amount_minor': rng.randint(100, 50000),
+            'date': (today - timedelta(days=rng.randint(0, 730))).isoformat()
+        }
+        for _ in range(row_count)
+    ]
+
+def loop_analytics(expenses, budgets_minor, today):
+    """The list-comprehension approach: filter each month, then re-scan it once per category"""
+    months = month_keys_ending(today, HISTORY_MONTHS)
+    monthly_totals = []
+    for month in months:
+        month_expenses = [e for e in expenses if e['date'][:7] == month]
+        monthly_totals.append({
+            category: sum(e['amount_minor'] for e in month_expenses if e['category'] == category)
+            for category in CATEGORIES
+        })
+    
+    current, previous = monthly_totals[-1], monthly_totals[-2]
+    results = {}
+    for category in CATEGORIES:
+        completed = [totals[category] for totals in reversed(monthly_totals[:-1])]
+        budget = budgets_minor[category]
+        results[category] = {
+            'monthly': [totals[category] for totals in monthly_totals],
+            'averages': {window: sum(completed[:window]) / window for window in ROLLING_WINDOWS},
+            'change_percent': (current[category] - previous[category]) / previous[category] * 100 if previous[category] else None,
+            'utilization': current[category] / budget * 100 if budget else None
+        }
+    return results
+
+def best_of(repeat, function):
+    """Run function repeat times and return (best elapsed seconds, last result)"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000], help='expense rows per user')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the best is reported')
+    args = parser.parse_args()
+    
+    today = date.today()
+    budgets_minor = {category: 500000 for category in CATEGORIES}
+    report = []
+    for row_count in args.rows:
+        expenses = generate_expenses(row_count, today)
+        
+        # Columns as a Core query would return them
+        dates = [expense['date'] for expense in expenses]
+        categories = [expense['category'] for expense in expenses]
+        amounts = [expense['amount_minor'] for expense in expenses]
+        
+        loop_seconds, expected = best_of(args.repeat, lambda: loop_analytics(expenses, budgets_minor, today))
+        build_seconds, history = best_of(args.repeat, lambda: SpendingHistory.from_expenses(dates, categories, amounts))
+        analyze_seconds, analytics = best_of(args.repeat, lambda: SpendingAnalytics(history, budgets_minor, today, CATEGORIES))
+        
+        # Both implementations must agree exactly on the monthly totals
+        matches = all(
+            analytics.monthly_totals[:, analytics.index[category]].tolist() == expected[category]['monthly']
+            for category in CATEGORIES
+        )
+        report.append({
+            'rows': row_count,
+            'loop_ms': round(loop_seconds * 1000, 3),
+            'numpy_build_ms': round(build_seconds * 1000, 3),
+            'numpy_analyze_ms': round(analyze_seconds * 1000, 3),
+            'speedup_analyze': round(loop_seconds / analyze_seconds, 1),
+            'speedup_including_build': round(loop_seconds / (build_seconds + analyze_seconds), 1),
+            'results_match': matches
+        })
+    
+    print(json.dumps({'benchmark': 'analytics', 'results': report}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Measure GET / latency with the dashboard's reads run one after another and concurrently
+
+The query cache is off and the category cache is dropped before every request by default,
+so each request pays for its reads the way the first one after a write does:
+
+    python benchmarks/bench_dashboard.py --requests 300 --db-latency-ms 3
+    python benchmarks/bench_dashboard.py --requests 300 --db-latency-ms 3 --query-cache memory --warm-categories
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from common import create_app, register_and_login, simulate_db_latency, summarize
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300, help='requests per mode')
+    parser.add_argument('--database-url', default=None, help='database to use (default: temporary SQLite file)')
+    parser.add_argument('--db-latency-ms', type=float, default=3, help='simulated round-trip time per SQL statement')
+    parser.add_argument('--workers', type=int, default=4, help='CONCURRENT_READ_WORKERS')
+    parser.add_argument('--query-cache', default='none', help="QUERY_CACHE_BACKEND: 'none', 'memory' or 'sqlite'")
+    parser.add_argument('--warm-categories', action='store_true', help='keep the per-user category cache between requests')
+    args = parser.parse_args()
+    
+    app = create_app(args.database_url, QUERY_CACHE_BACKEND=args.query_cache, CONCURRENT_READ_WORKERS=args.workers)
+    from query_cache import query_cache
+    query_cache.init_app(app)
+    
+    client = app.test_client()
+    register_and_login(client, 'bench_dashboard')
+    
+    # A year of history so the rollup read covers a realistic window
+    today = date.today()
+    for days_ago in range(0, 365, 3):
+        client.post('/api/expenses', data={
+            'category': ('Food', 'Transport', 'Bills', 'Shopping')[days_ago % 4],
+            'amount': str(10 + days_ago % 50),
+            'date': (today - timedelta(days=days_ago)).isoformat()
+        })
+    
+    from models import CategoryManager, User
+    with app.app_context():
+        user_id = User.query.filter_by(username='bench_dashboard').one().id
+    
+    # Compute the insight bundle once, as the worker would have
+    client.get('/')
+    simulate_db_latency(app, args.db_latency_ms)
+    
+    results = {}
+    for mode, concurrent in (('sequential', False), ('concurrent', True)):
+        app.config['CONCURRENT_READS'] = concurrent
+        samples = []
+        for _ in range(args.requests):
+            if not args.warm_categories:
+                CategoryManager.invalidate_cache(user_id)
+            request_started = time.perf_counter()
+            response = client.get('/')
+            samples.append(time.perf_counter() - request_started)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET / returned {response.status_code}")
+        results[mode] = summarize(samples)
+    
+    print(json.dumps({
+        'benchmark': 'get_dashboard',
+        'db_latency_ms': args.db_latency_ms,
+        'query_cache': args.query_cache,
+        'warm_categories': args.warm_categories,
+        'workers': args.workers,
+        'latency': results
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Drive the main pages and the expense CRUD API against generated data and report per-route latency
+
+Fills a database with datagen.py, logs several generated users in, and repeats a session of
+page views and API calls. By default requests go through the Flask test client; pass
+--base-url to drive a running server (e.g. local gunicorn) that uses the same database:
+
+    python benchmarks/bench_e2e.py --users 50 --expenses-per-user 1000 --iterations 100
+    python benchmarks/bench_e2e.py --database-url postgresql:///fintrack_bench --skip-generate \\
+        --base-url http://127.0.0.1:8000 --concurrency 8 --output results.json
+
+The JSON report includes the commit it ran against, so runs can be compared between commits.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from common import create_app, current_commit, simulate_db_latency, summarize
+from datagen import PASSWORD, generate
+
+ROUTES = [
+    'GET /', 'GET /expenses', 'GET /budget', 'GET /insights', 'GET /api/expenses',
+    'POST /api/expenses', 'PUT /api/expenses/<id>', 'DELETE /api/expenses/<id>'
+]
+
+class TestClientSession:
+    """A logged-in user driven through the Flask test client"""
+    
+    def __init__(self, app, username):
+        self.client = app.test_client()
+        response = self.client.post('/login', data={'username': username, 'password': PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f"Could not log in as {username}")
+    
+    def request(self, method, path, **kwargs):
+        response = self.client.open(path, method=method, **kwargs)
+        body = response.get_json(silent=True) if response.is_json else None
+        return response.status_code, body
+
+class HTTPSession:
+    """A logged-in user driven over HTTP against a running server"""
+    
+    def __init__(self, base_url, username):
+        import requests
+        
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        
+        # The login form is CSRF protected outside the test client
+        page = self.session.get(f"{self.base_url}/login").text
+        match = re.search(r'name="csrf_token"[^>]*value="([^"]+)"', page)
+        data = {'username': username, 'password': PASSWORD, 'csrf_token': match.group(1) if match else ''}
+        response = self.session.post(f"{self.base_url}/login", data=data, allow_redirects=False)
+        if response.status_code != 302:
+            raise RuntimeError(f"Could not log in as {username}")
+    
+    def request(self, method, path, **kwargs):
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+def run_session(session, rng, samples, errors, lock):
+    """One round of every route for one user, recording latency per route"""
+    def timed(route, method, path, **kwargs):
+        started = time.perf_counter()
+        status, body = session.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - started
+        with lock:
+            samples[route].append(elapsed)
+            if status >= 400:
+                errors[route] += 1
+        return body
+    
+    for route in ROUTES[:5]:
+        timed(route, 'GET', route.split(' ', 1)[1])
+    
+    expense_date = (date.today() - timedelta(days=rng.randint(0, 20))).isoformat()
+    body = timed('POST /api/expenses', 'POST', '/api/expenses', data={
+        'category': rng.choice(['Food', 'Transport', 'Shopping']),
+        'amount': f"{rng.uniform(5, 200):.2f}",
+        'date': expense_date,
+        'description': 'load test'
+    })
+    if not body or not body.get('success'):
+        return
+    expense_id = body['expense']['id']
+    timed('PUT /api/expenses/<id>', 'PUT', f"/api/expenses/{expense_id}", json={
+        'category': 'Food', 'amount': f"{rng.uniform(5, 200):.2f}", 'date': expense_date, 'description': 'edited'
+    })
+    timed('DELETE /api/expenses/<id>', 'DELETE', f"/api/expenses/{expense_id}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help='users to generate')
+    parser.add_argument('--expenses-per-user', type=int, default=1000, help='expenses per generated user')
+    parser.add_argument('--months', type=int, default=12, help='months of generated history')
+    parser.add_argument('--active-users', type=int, default=10, help='generated users to log in and drive')
+    parser.add_argument('--iterations', type=int, default=50, help='rounds of every route per active user')
+    parser.add_argument('--database-url', default=None, help='database to use (default: temporary SQLite file)')
+    parser.add_argument('--skip-generate', action='store_true', help='reuse users generated by an earlier run')
+    parser.add_argument('--base-url', default=None, help='drive a running server instead of the test client')
+    parser.add_argument('--concurrency', type=int, default=1, help='parallel users when using --base-url')
+    parser.add_argument('--db-latency-ms', type=float, default=0, help='simulated round-trip time per SQL statement')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--output', default=None, help='also write the report to this file')
+    args = parser.parse_args()
+    
+    # create_app switches to a scratch directory, so resolve the output path first
+    output_path = os.path.abspath(args.output) if args.output else None
+    
+    app = create_app(args.database_url)
+    if args.skip_generate:
+        usernames = [f"load_{index}" for index in range(args.users)]
+    else:
+        usernames = generate(app, args.users, args.expenses_per_user, args.months, args.seed)
+    active = usernames[:args.active_users]
+    
+    if args.base_url:
+        sessions = [HTTPSession(args.base_url, username) for username in active]
+    else:
+        simulate_db_latency(app, args.db_latency_ms)
+        sessions = [TestClientSession(app, username) for username in active]
+    
+    samples = {route: [] for route in ROUTES}
+    errors = {route: 0 for route in ROUTES}
+    lock = threading.Lock()
+    
+    def drive(index):
+        rng = random.Random(args.seed + index)
+        for _ in range(args.iterations):
+            run_session(sessions[index], rng, samples, errors, lock)
+    
+    # In-process test client requests would only contend for the GIL, so they run one user at a time
+    workers = args.concurrency if args.base_url else 1
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(drive, range(len(sessions))))
+    elapsed = time.perf_counter() - started
+    
+    total = sum(len(route_samples) for route_samples in samples.values())
+    report = {
+        'benchmark': 'e2e',
+        'commit': current_commit(),
+        'target': args.base_url or 'test-client',
+        'users': args.users,
+        'expenses_per_user': args.expenses_per_user,
+        'active_users': len(sessions),
+        'concurrency': workers,
+        'db_latency_ms': args.db_latency_ms,
+        'requests': total,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(total / elapsed, 1),
+        'routes': {
+            route: dict(
+                summarize(route_samples),
+                errors=errors[route],
+                requests_per_second=round(len(route_samples) / sum(route_samples), 1)
+            )
+            for route, route_samples in samples.items() if route_samples
+        }
+    }
+    
+    output = json.dumps(report, indent=2)
+    print(output)
+    if output_path:
+        with open(output_path, 'w') as file:
+            file.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Measure spending forecast fit and predict time per user
+
+Each synthetic user has a monthly rent payment plus everyday spending over a
+year of history. Compare the forecast with the linear projection on the
+second day of the month, when rent has just been paid:
+
+    python benchmarks/bench_forecast.py --users 200 --expenses-per-month 300
+"""
+import argparse
+import calendar
+import json
+import random
+import sys
+import time
+from datetime import date
+
+from common import REPO_ROOT, summarize
+
+sys.path.insert(0, REPO_ROOT)
+
+from forecasting import FORECAST_HISTORY_MONTHS, SpendingForecast
+
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Entertainment', 'Health']
+
+def generate_daily_totals(rng, today, expenses_per_month, rent_minor):
+    """Daily (date, category, total_minor) rows for the history months before today's month"""
+    totals = {}
+    year, month = today.year, today.month
+    for _ in range(FORECAST_HISTORY_MONTHS):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        days_in_month = calendar.monthrange(year, month)[1]
+        totals[(date(year, month, 1), 'Bills')] = rent_minor
+        for _ in range(expenses_per_month):
+            key = (date(year, month, rng.randint(1, days_in_month)), rng.choice(CATEGORIES))
+            totals[key] = totals.get(key, 0) + rng.randint(500, 15000)
+    return [(day, category, total) for (day, category), total in totals.items()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200, help='number of users to fit')
+    parser.add_argument('--expenses-per-month', type=int, default=300, help='everyday expenses per history month')
+    parser.add_argument('--fit-budget-ms', type=float, default=50, help='per-user fit latency budget')
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    today = date.today().replace(day=2)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    rent_minor = 300000
+    
+    fit_samples, predict_samples = [], []
+    linear_bills, forecast_bills = [], []
+    for _ in range(args.users):
+        rows = generate_daily_totals(rng, today, args.expenses_per_month, rent_minor)
+        dates, categories, amounts = zip(*rows)
+        
+        started = time.perf_counter()
+        forecast = SpendingForecast.fit(dates, categories, amounts, today)
+        fit_samples.append(time.perf_counter() - started)
+        
+        # Rent was paid yesterday, on the first of the month
+        current_minor = {'Bills': rent_minor, 'Food': 4000}
+        started = time.perf_counter()
+        projections = forecast.predict(today, current_minor)
+        predict_samples.append(time.perf_counter() - started)
+        
+        linear_bills.append(rent_minor / today.day * days_in_month)
+        forecast_bills.append(projections['Bills'])
+    
+    fit = summarize(fit_samples)
+    print(json.dumps({
+        'benchmark': 'forecast',
+        'users': args.users,
+        'history_rows_per_user': len(rows),
+        'fit': fit,
+        'predict': summarize(predict_samples),
+        'fit_within_budget': fit['p99_ms'] <= args.fit_budget_ms,
+        'bills_month_end_day_2': {
+            'actual_rent_minor': rent_minor,
+            'linear_projection_minor': round(sum(linear_bills) / len(linear_bills)),
+            'forecast_minor': round(sum(forecast_bills) / len(forecast_bills))
+        }
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""Time each data-access function in models.py and each insight function in utils.py on its own
+
+For every row count the database is emptied and refilled with datagen.py: one measured user with
+that many expenses, plus a few other users so filters by user do real work. Each function then
+runs with the query, category and forecast caches dropped, and reports its median time and the
+peak memory Python allocated during one call (tracemalloc). Save a baseline, then fail later
+runs when a function got slower or allocates more by over the allowed percentage:
+
+    python benchmarks/bench_functions.py --rows 1000 10000 --save-thresholds thresholds.json
+    python benchmarks/bench_functions.py --rows 1000 10000 --thresholds thresholds.json
+    python benchmarks/bench_functions.py --rows 10000 --only get_monthly_totals get_insights \\
+        --database-url postgresql:///fintrack_bench
+
+The default database is in-memory SQLite. A --database-url database is emptied for every row
+count, so point it at a scratch database.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from common import create_app, current_commit
+from datagen import generate
+
+# Changes smaller than this are timer and allocator noise, whatever the percentage
+TIME_NOISE_MS = 0.1
+MEMORY_NOISE_KIB = 16
+
+DEFAULT_MAX_REGRESSION_PERCENT = 20
+
+class Benchmark:
+    """A function to time; setup runs untimed before every call and returns its arguments"""
+    
+    def __init__(self, name, function, setup=None):
+        self.name = name
+        self.function = function
+        self.setup = setup or (lambda: ())
+
+def build_benchmarks(fixture):
+    """Every benchmarked function, called the way the routes call it for the measured user"""
+    from app import db
+    from models import (
+        Category, CategoryManager, Expense, ExpenseManager, get_data_version, get_sync_changes, migrate_data_from_json_to_db,
+        month_key, rebuild_expense_rollups, verify_expense_rollups
+    )
+    from utils import create_default_categories_for_user, get_insights, get_savings_tips, get_spending_alerts
+    
+    user_id = fixture['user_id']
+    today = date.today()
+    quarter_ago = today - timedelta(days=90)
+    months = [month_key(today - timedelta(days=30 * offset)) for offset in range(12)]
+    
+    def added_expense_id():
+        return ExpenseManager.add_expense('Food', 25, today, 'benchmark', user_id=user_id)['id']
+    
+    def bulk_rows():
+        return ([
+            {'category': 'Food', 'amount_minor': 1000 + index, 'date': today - timedelta(days=index % 30), 'description': ''}
+            for index in range(100)
+        ], user_id)
+    
+    def batch_operations():
+        return ([
+            {'op': 'create', 'id': None, 'expense': {
+                'category': 'Food', 'amount_minor': 2500, 'date': today, 'description': 'benchmark'
+            }},
+            {'op': 'update', 'id': fixture['expense_id'], 'expense': {
+                'category': 'Transport', 'amount_minor': 3000, 'date': today, 'description': 'benchmark'
+            }},
+            {'op': 'delete', 'id': added_expense_id(), 'expense': None}
+        ], user_id)
+    
+    def consume(rows):
+        return sum(1 for _ in rows)
+    
+    def empty_scratch_user():
+        db.session.execute(db.delete(Category).where(Category.user_id == fixture['scratch_user_id']))
+        db.session.commit()
+        return (fixture['scratch_user_id'],)
+    
+    def empty_database_for_migration():
+        # The migration only runs into a database with no expenses and no categories at all
+        db.session.execute(db.delete(Expense))
+        db.session.execute(db.delete(Category))
+        db.session.commit()
+        return ()
+    
+    return [
+        Benchmark('ExpenseManager.get_all_expenses', lambda: ExpenseManager.get_all_expenses(user_id=user_id)),
+        Benchmark('ExpenseManager.filter_expenses', lambda: ExpenseManager.filter_expenses(
+            Expense.query.filter_by(user_id=user_id), category='Food', start_date=quarter_ago.isoformat(),
+            end_date=today.isoformat(), min_amount=10
+        ).all()),
+        Benchmark('ExpenseManager.get_expenses_page', lambda: ExpenseManager.get_expenses_page(user_id, limit=50)),
+        Benchmark('ExpenseManager.iter_expense_rows', lambda: consume(ExpenseManager.iter_expense_rows(user_id=user_id))),
+        Benchmark('ExpenseManager.add_expense', lambda: ExpenseManager.add_expense('Food', 25, today, 'benchmark', user_id=user_id)),
+        Benchmark('ExpenseManager.add_expenses_bulk', ExpenseManager.add_expenses_bulk, bulk_rows),
+        Benchmark('ExpenseManager.apply_expense_batch', ExpenseManager.apply_expense_batch, batch_operations),
+        Benchmark('ExpenseManager.update_expense', lambda: ExpenseManager.update_expense(
+            fixture['expense_id'], 'Food', 42, today.isoformat(), 'benchmark', user_id=user_id
+        )),
+        Benchmark('ExpenseManager.delete_expense', ExpenseManager.delete_expense, lambda: (added_expense_id(), user_id)),
+        Benchmark('ExpenseManager.get_expense_by_id', lambda: ExpenseManager.get_expense_by_id(fixture['expense_id'], user_id=user_id)),
+        Benchmark('ExpenseManager.get_expenses_by_category', lambda: ExpenseManager.get_expenses_by_category('Food', user_id=user_id)),
+        Benchmark('ExpenseManager.get_expenses_by_date_range', lambda: ExpenseManager.get_expenses_by_date_range(
+            quarter_ago.isoformat(), today.isoformat(), user_id=user_id
+        )),
+        Benchmark('ExpenseManager.get_category_totals', lambda: ExpenseManager.get_category_totals(user_id=user_id)),
+        Benchmark('ExpenseManager.get_monthly_totals', lambda: ExpenseManager.get_monthly_totals(user_id=user_id)),
+        Benchmark('ExpenseManager.get_rollup_totals', lambda: ExpenseManager.get_rollup_totals(months, user_id=user_id)),
+        Benchmark('ExpenseManager.get_month_category_totals', lambda: ExpenseManager.get_month_category_totals(
+            months[0], user_id=user_id
+        )),
+        Benchmark('ExpenseManager.get_daily_category_totals', lambda: ExpenseManager.get_daily_category_totals(
+            quarter_ago, today, user_id=user_id
+        )),
+        Benchmark('CategoryManager.get_all_categories', lambda: CategoryManager.get_all_categories(user_id=user_id)),
+        Benchmark('CategoryManager.get_categories_by_name', lambda: CategoryManager.get_categories_by_name(user_id=user_id)),
+        Benchmark('CategoryManager.add_category', lambda: CategoryManager.add_category('Benchmark', 'تجربة', 100, user_id=user_id)),
+        Benchmark('CategoryManager.update_category', lambda: CategoryManager.update_category(
+            fixture['category_id'], 'Food', 'طعام', 1200, user_id=user_id
+        )),
+        Benchmark('CategoryManager.apply_category_batch', lambda: CategoryManager.apply_category_batch([
+            {'op': 'update', 'id': fixture['category_id'], 'category': {'budget_minor': 110000}}
+        ], user_id=user_id)),
+        Benchmark('CategoryManager.get_category_by_id', lambda: CategoryManager.get_category_by_id(
+            fixture['category_id'], user_id=user_id
+        )),
+        Benchmark('CategoryManager.get_category_budget', lambda: CategoryManager.get_category_budget(
+            fixture['category_id'], user_id=user_id
+        )),
+        Benchmark('get_data_version', lambda: get_data_version(user_id, with_insights=True)),
+        Benchmark('get_sync_changes', lambda: get_sync_changes(user_id)),
+        Benchmark('rebuild_expense_rollups', lambda: rebuild_expense_rollups(user_id)),
+        Benchmark('verify_expense_rollups', lambda: verify_expense_rollups(user_id)),
+        Benchmark('utils.get_insights', lambda: get_insights(user_id)),
+        Benchmark('utils.get_spending_alerts', lambda: get_spending_alerts(user_id)),
+        Benchmark('utils.get_savings_tips', lambda: get_savings_tips(user_id)),
+        Benchmark('utils.create_default_categories_for_user', create_default_categories_for_user, empty_scratch_user),
+        
+        # Empties the database, so it runs last
+        Benchmark('migrate_data_from_json_to_db', migrate_data_from_json_to_db, empty_database_for_migration)
+    ]
+
+def fill_database(app, rows, other_users, seed):
+    """Empty every table, generate the users and return the ids the benchmarks work on"""
+    from sqlalchemy import select
+    from app import db
+    from models import Category, Expense, User
+    
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    
+    usernames = generate(app, 2 + other_users, rows, seed=seed, prefix='micro')
+    
+    with app.app_context():
+        user_ids = db.session.scalars(select(User.id).where(User.username.in_(usernames)).order_by(User.id)).all()
+        user_id = user_ids[0]
+        fixture = {
+            'user_id': user_id,
+            'scratch_user_id': user_ids[-1],
+            'expense_id': db.session.scalar(select(Expense.id).where(Expense.user_id == user_id).limit(1)),
+            'category_id': db.session.scalar(
+                select(Category.id).where(Category.user_id == user_id, Category.name_en == 'Food')
+            )
+        }
+        
+        write_migration_files(user_id)
+    return fixture
+
+def write_migration_files(user_id):
+    """Write the user's categories and expenses as the JSON files migrate_data_from_json_to_db reads"""
+    from models import Category, Expense, minor_to_float
+    
+    categories = [
+        {'id': str(category.id), 'name_en': category.name_en, 'name_ar': category.name_ar,
+         'budget': minor_to_float(category.budget_minor)}
+        for category in Category.query.filter_by(user_id=user_id).all()
+    ]
+    expenses = [
+        {'category': expense.category, 'amount': minor_to_float(expense.amount_minor),
+         'date': expense.date.isoformat(), 'description': expense.description,
+         'created_at': expense.created_at.isoformat()}
+        for expense in Expense.query.filter_by(user_id=user_id).all()
+    ]
+    
+    # Relative to the working directory, which create_app made a scratch directory
+    os.makedirs('data', exist_ok=True)
+    with open('data/categories.json', 'w', encoding='utf-8') as file:
+        json.dump(categories, file, ensure_ascii=False)
+    with open('data/expenses.json', 'w', encoding='utf-8') as file:
+        json.dump(expenses, file)
+
+def drop_caches():
+    """Forget everything cached between calls, so each call does the work a cold request would"""
+    import forecasting
+    from models import CategoryManager
+    from query_cache import query_cache
+    
+    query_cache.clear()
+    CategoryManager.invalidate_cache()
+    with forecasting._cache_lock:
+        forecasting._cache.clear()
+
+def run_benchmark(app, benchmark, repeat):
+    """Median and fastest time of repeat calls, and the peak traced memory of one more call"""
+    def call(trace=False):
+        # A fresh app context per call gives each one a new session, like a request gets
+        with app.app_context():
+            drop_caches()
+            args = benchmark.setup()
+            if trace:
+                tracemalloc.start()
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            benchmark.function(*args)
+            elapsed = time.perf_counter() - started
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                return peak
+            return elapsed
+    
+    # The first call compiles the statements and warms the connection, like a long-running worker has
+    call()
+    samples = [call() for _ in range(repeat)]
+    peak = call(trace=True)
+    return {
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'min_ms': round(min(samples) * 1000, 3),
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+def find_regressions(results, thresholds, max_regression_percent=None):
+    """Results that got slower or allocate more than the threshold file allows"""
+    default_percent = max_regression_percent
+    if default_percent is None:
+        default_percent = thresholds.get('max_regression_percent', DEFAULT_MAX_REGRESSION_PERCENT)
+    regressions = []
+    for key, baseline in thresholds.get('functions', {}).items():
+        result = results.get(key)
+        if result is None:
+            continue
+        percent = baseline.get('max_regression_percent', default_percent)
+        for metric, noise in (('median_ms', TIME_NOISE_MS), ('peak_kib', MEMORY_NOISE_KIB)):
+            allowed = baseline[metric] * (1 + percent / 100)
+            if result[metric] > allowed and result[metric] - baseline[metric] > noise:
+                regressions.append({
+                    'function': key,
+                    'metric': metric,
+                    'baseline': baseline[metric],
+                    'current': result[metric],
+                    'change_percent': round((result[metric] / baseline[metric] - 1) * 100, 1) if baseline[metric] else None,
+                    'allowed_percent': percent
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='expenses of the measured user')
+    parser.add_argument('--other-users', type=int, default=3, help='additional users with the same number of expenses')
+    parser.add_argument('--repeat', type=int, default=7, help='timed calls per function')
+    parser.add_argument('--only', nargs='+', default=None, help='run functions whose name contains any of these')
+    parser.add_argument('--database-url', default='sqlite://', help='database to use (default: in-memory SQLite)')
+    parser.add_argument('--thresholds', default=None, help='fail when a function regressed against this baseline file')
+    parser.add_argument('--save-thresholds', default=None, help='write this run as a baseline file')
+    parser.add_argument('--max-regression-percent', type=float, default=None,
+                        help=f"allowed slowdown or extra memory (default: the file's, or {DEFAULT_MAX_REGRESSION_PERCENT})")
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--output', default=None, help='also write the report to this file')
+    args = parser.parse_args()
+    
+    # create_app switches to a scratch directory, so resolve the paths first
+    thresholds_path = os.path.abspath(args.thresholds) if args.thresholds else None
+    save_path = os.path.abspath(args.save_thresholds) if args.save_thresholds else None
+    output_path = os.path.abspath(args.output) if args.output else None
+    
+    app = create_app(args.database_url, QUERY_CACHE_BACKEND='none')
+    from app import db
+    from query_cache import query_cache
+    query_cache.init_app(app)
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    
+    results = {}
+    for rows in args.rows:
+        fixture = fill_database(app, rows, args.other_users, args.seed)
+        for benchmark in build_benchmarks(fixture):
+            if args.only and not any(name in benchmark.name for name in args.only):
+                continue
+            key = f"{benchmark.name}[rows={rows}]"
+            results[key] = dict(run_benchmark(app, benchmark, args.repeat), rows=rows)
+            print(f"{key}: {results[key]['median_ms']} ms, {results[key]['peak_kib']} KiB", file=sys.stderr)
+    
+    report = {
+        'benchmark': 'functions',
+        'commit': current_commit(),
+        'database': dialect,
+        'repeat': args.repeat,
+        'functions': results
+    }
+    
+    regressions = []
+    if thresholds_path:
+        with open(thresholds_path) as file:
+            regressions = find_regressions(results, json.load(file), args.max_regression_percent)
+        report['regressions'] = regressions
+    
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if output_path:
+        with open(output_path, 'w') as file:
+            file.write(output + '\n')
+    if save_path:
+        with open(save_path, 'w') as file:
+            json.dump({
+                'commit': report['commit'],
+                'max_regression_percent': (
+                    DEFAULT_MAX_REGRESSION_PERCENT if args.max_regression_percent is None else args.max_regression_percent
+                ),
+                'functions': {key: {'median_ms': result['median_ms'], 'peak_kib': result['peak_kib']}
+                              for key, result in results.items()}
+            }, file, indent=2)
+            file.write('\n')
+    
+    if regressions:
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['function']} {regression['metric']}: {regression['baseline']} -> "
+                f"{regression['current']} (+{regression['change_percent']}%, allowed {regression['allowed_percent']}%)",
+                file=sys.stderr
+            )
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
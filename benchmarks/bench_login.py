@@ -0,0 +1,81 @@
+"""Measure login throughput for each password hashing setting
+
+Each setting is timed in a single thread, so logins/sec is per core. The key derivation
+alone is reported separately from the full POST /login round-trip.
+
+    python benchmarks/bench_login.py --logins 20
+    python benchmarks/bench_login.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000
+"""
+import argparse
+import json
+import time
+
+from common import create_app, summarize
+
+DEFAULT_METHODS = [
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:210000'
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=20, help='logins to time per setting')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help='PASSWORD_HASH_METHOD values to compare')
+    parser.add_argument('--database-url', default=None, help='database to use (default: temporary SQLite file)')
+    args = parser.parse_args()
+    
+    app = create_app(args.database_url)
+    from app import db
+    from models import User
+    from security import hash_password, verify_password
+    
+    results = []
+    for index, method in enumerate(args.methods):
+        app.config['PASSWORD_HASH_METHOD'] = method
+        username = f'bench_login_{index}'
+        password = 'benchmark-password'
+        
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com')
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            
+            # Key derivation only
+            stored_hash = user.password_hash
+            kdf_samples = []
+            for _ in range(args.logins):
+                started = time.perf_counter()
+                verify_password(stored_hash, password)
+                kdf_samples.append(time.perf_counter() - started)
+            
+            hash_started = time.perf_counter()
+            hash_password(password)
+            hash_seconds = time.perf_counter() - hash_started
+        
+        # Full login round-trip through the app
+        client = app.test_client()
+        login_samples = []
+        for _ in range(args.logins):
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': username, 'password': password})
+            login_samples.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                raise RuntimeError(f"Login failed for {method}")
+            client.get('/logout')
+        
+        results.append({
+            'method': method,
+            'hash_ms': round(hash_seconds * 1000, 2),
+            'verify': summarize(kdf_samples),
+            'login': summarize(login_samples),
+            'logins_per_second_per_core': round(len(login_samples) / sum(login_samples), 1)
+        })
+    
+    print(json.dumps({'benchmark': 'login', 'results': results}, indent=2))
+
+if __name__ == '__main__':
+    main()
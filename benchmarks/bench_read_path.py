@@ -0,0 +1,102 @@
+"""Compare reading a user's expenses as ORM models with the Core read path (ExpenseRow and plain tuples)
+
+Each mode loads every expense of one generated user and reports rows per second and the memory
+held per row while the result is alive (tracemalloc), including what the session keeps for
+loaded models. The *_dicts modes also build the API dicts, as listing and sync do:
+
+    python benchmarks/bench_read_path.py --rows 10000 50000
+    python benchmarks/bench_read_path.py --rows 20000 --database-url postgresql:///fintrack_bench
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from common import create_app, current_commit
+from datagen import generate
+
+def build_modes(user_id):
+    """name -> function returning the loaded rows, every mode ordered by id"""
+    from sqlalchemy import select
+    from app import db
+    from models import Expense, ExpenseRow, read_rows
+    
+    def orm():
+        return Expense.query.filter_by(user_id=user_id).order_by(Expense.id).all()
+    
+    def rows():
+        return read_rows(ExpenseRow, select(*ExpenseRow.columns).where(Expense.user_id == user_id).order_by(Expense.id))
+    
+    def tuples():
+        # Only what an aggregation needs
+        return db.session.execute(
+            select(Expense.date, Expense.category, Expense.amount_minor)
+            .where(Expense.user_id == user_id).order_by(Expense.id)
+        ).all()
+    
+    return {
+        'orm': orm,
+        'orm_dicts': lambda: [expense.to_dict() for expense in orm()],
+        'rows': rows,
+        'rows_dicts': lambda: [expense.to_dict() for expense in rows()],
+        'tuples': tuples
+    }
+
+def measure(app, load, repeat):
+    """Median seconds per load, and bytes held by one loaded result"""
+    samples = []
+    for _ in range(repeat):
+        # A fresh app context per load gives each one an empty session
+        with app.app_context():
+            started = time.perf_counter()
+            result = load()
+            samples.append(time.perf_counter() - started)
+            del result
+    
+    with app.app_context():
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = load()
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        count = len(result)
+    return statistics.median(samples), held, count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000], help='expenses of the measured user')
+    parser.add_argument('--repeat', type=int, default=5, help='timed loads per mode')
+    parser.add_argument('--database-url', default='sqlite://', help='database to use (default: in-memory SQLite)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args()
+    
+    app = create_app(args.database_url)
+    from sqlalchemy import select
+    from app import db
+    from models import User
+    
+    report = {'benchmark': 'read_path', 'commit': current_commit(), 'results': {}}
+    for rows in args.rows:
+        [username] = generate(app, 1, rows, seed=args.seed, prefix=f"read{rows}")
+        with app.app_context():
+            user_id = db.session.scalar(select(User.id).where(User.username == username))
+        
+        modes = build_modes(user_id)
+        with app.app_context():
+            identical = modes['orm_dicts']() == modes['rows_dicts']()
+        
+        results = {}
+        for name, load in modes.items():
+            seconds, held, count = measure(app, load, args.repeat)
+            results[name] = {
+                'median_ms': round(seconds * 1000, 3),
+                'rows_per_second': round(count / seconds),
+                'bytes_per_row': round(held / count)
+            }
+        report['results'][f"rows={rows}"] = dict(results, identical_dicts=identical)
+    
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
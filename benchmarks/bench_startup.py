@@ -0,0 +1,63 @@
+"""Measure cold-boot time of one application worker
+
+Each sample starts a fresh interpreter and times "import main", which is what a gunicorn
+worker does on boot. Pass --with-init to also run the one-off database initialization in
+every worker, which reproduces how workers booted before it moved to "fintrack init-db".
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --runs 10 --with-init
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+if {with_init}:
+    main.commands.init_database()
+print(time.perf_counter() - started)
+"""
+
+def time_worker_boot(database_url, workdir, with_init):
+    """Boot one worker in a fresh interpreter and return its startup time in seconds"""
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER_SCRIPT.format(with_init=with_init)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='number of worker boots to time')
+    parser.add_argument('--database-url', default=None, help='database to boot against (default: temporary SQLite file)')
+    parser.add_argument('--with-init', action='store_true', help='run database initialization in every worker')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='fintrack-startup-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    
+    # Initialize once up front so every timed boot sees an existing schema, as in production
+    time_worker_boot(database_url, workdir, with_init=True)
+    
+    samples = [time_worker_boot(database_url, workdir, args.with_init) for _ in range(args.runs)]
+    print(json.dumps({
+        'benchmark': 'worker_startup',
+        'with_init': args.with_init,
+        'runs': args.runs,
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'median_ms': round(statistics.median(samples) * 1000, 2),
+        'min_ms': round(min(samples) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
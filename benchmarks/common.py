@@ -0,0 +1,78 @@
+"""Shared setup for the benchmark scripts"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def create_app(database_url=None, **config):
+    """Import the application against a benchmark database and initialize it"""
+    # The database URL is read when app.py is imported, so set it first
+    workdir = tempfile.mkdtemp(prefix='fintrack-bench-')
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    
+    import logging
+    logging.disable(logging.INFO)
+    
+    import main
+    main.app.config.update(WTF_CSRF_ENABLED=False, **config)
+    main.commands.init_database()
+    return main.app
+
+def simulate_db_latency(app, latency_ms):
+    """Sleep before every SQL statement to emulate the round-trip time of a networked database"""
+    if not latency_ms:
+        return
+    
+    import time
+    from sqlalchemy import event
+    from app import db
+    
+    with app.app_context():
+        engine = db.engine
+    
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(latency_ms / 1000)
+
+def register_and_login(client, username, password='benchmark-password'):
+    """Register a user through the normal form and log the test client in"""
+    client.post('/register', data={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': password,
+        'password2': password
+    })
+    response = client.post('/login', data={'username': username, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f"Could not log in as {username}")
+
+def percentile(samples, fraction):
+    """Return the given percentile (0-1) of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples):
+    """Summarize latency samples in seconds as milliseconds"""
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(percentile(samples, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3)
+    }
+
+def current_commit():
+    """The commit being measured, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
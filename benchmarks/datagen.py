@@ -0,0 +1,149 @@
+"""Generate synthetic users and expenses directly in the database, in bulk
+
+Each user gets the default categories and expenses spread over recent months: frequent small
+food and transport purchases, occasional larger shopping, health and education spending, and
+monthly bills on fixed days. Amounts follow a per-category log-normal distribution, weekends
+(Friday and Saturday) are busier, and users differ in how much they spend overall.
+
+    python benchmarks/datagen.py --users 100 --expenses-per-user 1000
+    python benchmarks/datagen.py --users 20 --expenses-per-user 5000 --database-url postgresql:///fintrack_bench
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from common import create_app
+
+PASSWORD = 'benchmark-password'
+
+# name_en, name_ar, monthly budget, share of day-to-day expenses, median amount, spread (log-normal sigma)
+CATEGORY_PROFILES = [
+    ('Food', 'طعام', 1000, 0.38, 45, 0.6),
+    ('Transport', 'مواصلات', 500, 0.22, 30, 0.5),
+    ('Shopping', 'تسوق', 800, 0.12, 150, 0.9),
+    ('Entertainment', 'ترفيه', 300, 0.10, 60, 0.7),
+    ('Health', 'صحة', 300, 0.06, 120, 0.8),
+    ('Education', 'تعليم', 500, 0.04, 300, 0.6),
+    ('Other', 'أخرى', 200, 0.08, 50, 1.0),
+    ('Bills', 'فواتير', 1500, 0.0, 0, 0)
+]
+
+# Recurring monthly bills: day of month, amount
+BILLS = [(1, 900), (10, 250), (25, 120)]
+
+# Relative activity by weekday, Monday first; the weekend is Friday and Saturday
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.1, 1.4, 1.4, 0.9]
+
+INSERT_CHUNK = 5000
+
+def generate_user_expenses(rng, user_id, count, today, months):
+    """Build count expense rows for one user over the given number of months before today"""
+    start = today - timedelta(days=months * 30)
+    rows = []
+    
+    # Bills first: the same days and nearly the same amounts every month
+    month_start = date(start.year, start.month, 1)
+    while month_start <= today and len(rows) < count:
+        for day, amount in BILLS:
+            bill_date = month_start.replace(day=day)
+            if start <= bill_date <= today and len(rows) < count:
+                rows.append(('Bills', round(amount * rng.uniform(0.95, 1.05), 2), bill_date))
+        month_start = (month_start + timedelta(days=32)).replace(day=1)
+    
+    # Day-to-day spending for the rest, scaled by how much this user spends
+    spend_scale = rng.lognormvariate(0, 0.4)
+    days = [start + timedelta(days=offset) for offset in range((today - start).days + 1)]
+    day_weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in days]
+    profiles = [profile for profile in CATEGORY_PROFILES if profile[3] > 0]
+    category_weights = [profile[3] for profile in profiles]
+    remaining = count - len(rows)
+    for profile, day in zip(
+        rng.choices(profiles, weights=category_weights, k=remaining),
+        rng.choices(days, weights=day_weights, k=remaining)
+    ):
+        name_en, _, _, _, median, sigma = profile
+        amount = max(1.0, rng.lognormvariate(math.log(median), sigma) * spend_scale)
+        rows.append((name_en, round(amount, 2), day))
+    
+    return [
+        {
+            'category': category,
+            'amount_minor': int(round(amount * 100)),
+            'date': expense_date,
+            'description': '',
+            'created_at': datetime.combine(expense_date, datetime.min.time()),
+            'user_id': user_id
+        }
+        for category, amount, expense_date in rows
+    ]
+
+def generate(app, users, expenses_per_user, months=12, seed=42, prefix='load'):
+    """Insert users, their categories and expenses, rebuild the rollups, and return the usernames"""
+    from sqlalchemy import insert, select
+    from app import db
+    from models import Category, Expense, User, rebuild_expense_rollups
+    from security import hash_password
+    
+    rng = random.Random(seed)
+    today = date.today()
+    usernames = [f"{prefix}_{index}" for index in range(users)]
+    
+    with app.app_context():
+        # Hashing is deliberately slow, so every generated user shares one hash of the same password
+        password_hash = hash_password(PASSWORD)
+        db.session.execute(insert(User), [
+            {'username': username, 'email': f"{username}@example.com", 'password_hash': password_hash,
+             'created_at': datetime.utcnow()}
+            for username in usernames
+        ])
+        user_ids = db.session.scalars(select(User.id).where(User.username.in_(usernames)).order_by(User.id)).all()
+        
+        db.session.execute(insert(Category), [
+            {'name_en': name_en, 'name_ar': name_ar, 'budget_minor': budget * 100, 'user_id': user_id}
+            for user_id in user_ids
+            for name_en, name_ar, budget, _, _, _ in CATEGORY_PROFILES
+        ])
+        
+        batch = []
+        for user_id in user_ids:
+            batch.extend(generate_user_expenses(rng, user_id, expenses_per_user, today, months))
+            if len(batch) >= INSERT_CHUNK:
+                db.session.execute(insert(Expense), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Expense), batch)
+        db.session.commit()
+        
+        rebuild_expense_rollups()
+    return usernames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100, help='number of users to create')
+    parser.add_argument('--expenses-per-user', type=int, default=1000, help='expenses per user')
+    parser.add_argument('--months', type=int, default=12, help='months of history before today')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--prefix', default='load', help='username prefix')
+    parser.add_argument('--database-url', default=None, help='database to fill (default: temporary SQLite file)')
+    args = parser.parse_args()
+    
+    app = create_app(args.database_url)
+    started = time.perf_counter()
+    generate(app, args.users, args.expenses_per_user, args.months, args.seed, args.prefix)
+    elapsed = time.perf_counter() - started
+    
+    rows = args.users * args.expenses_per_user
+    print(json.dumps({
+        'users': args.users,
+        'expenses': rows,
+        'seconds': round(elapsed, 3),
+        'expenses_per_second': round(rows / elapsed, 1),
+        'database_url': app.config['SQLALCHEMY_DATABASE_URI'],
+        'password': PASSWORD
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import os
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+from app import app, db
+
+# Command group for maintenance tasks: flask --app main fintrack <command>
+fintrack_cli = AppGroup('fintrack', help='FinTrack maintenance commands.')
+rollups_cli = AppGroup('rollups', help='Maintain the month x category spending rollup table.')
+fintrack_cli.add_command(rollups_cli)
+
+# Float money columns replaced by integer minor-unit columns: (table, old column, new column)
+MONEY_COLUMNS = [
+    ('expenses', 'amount', 'amount_minor'),
+    ('categories', 'budget', 'budget_minor'),
+    ('expense_rollups', 'total', 'total_minor')
+]
+
+def migrate_money_columns():
+    """Convert float money columns on existing tables to integer minor units"""
+    from models import MINOR_UNITS
+    
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table, old_column, new_column in MONEY_COLUMNS:
+        if table not in existing_tables:
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        if old_column not in columns or new_column in columns:
+            continue
+        
+        # Add, backfill and swap in one transaction so a failure leaves the table untouched
+        with db.engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {new_column} BIGINT"))
+            connection.execute(text(
+                f"UPDATE {table} SET {new_column} = CAST(ROUND(COALESCE({old_column}, 0) * {MINOR_UNITS}) AS BIGINT)"
+            ))
+            connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {old_column}"))
+            if db.engine.dialect.name == 'postgresql':
+                connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {new_column} SET NOT NULL"))
+        click.echo(f"Converted {table}.{old_column} to integer minor units in {new_column}")
+
+# Columns added to tables that older versions already created: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ('users', 'data_version', 'BIGINT NOT NULL DEFAULT 0'),
+    # Existing rows stay NULL and are stamped by their owner's next write; full syncs include them anyway
+    ('expenses', 'version', 'BIGINT'),
+    ('categories', 'version', 'BIGINT'),
+    # Bundles stored before it count as computed on an earlier day and are refreshed
+    ('insight_bundles', 'day', 'DATE'),
+    # Rows created before sync clients sent keys have none
+    ('expenses', 'client_id', 'VARCHAR(64)'),
+    ('categories', 'client_id', 'VARCHAR(64)')
+]
+
+def add_missing_columns():
+    """Add columns that create_all can't add to existing tables"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table, column, ddl_type in ADDED_COLUMNS:
+        if table not in existing_tables:
+            continue
+        if column in {existing['name'] for existing in inspector.get_columns(table)}:
+            continue
+        with db.engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        click.echo(f"Added {table}.{column}")
+
+def create_schema():
+    """Create missing tables, plus indexes added to tables that already existed"""
+    with app.app_context():
+        db.create_all()
+        
+        # Bring columns of tables created by older versions up to date, before indexing them
+        migrate_money_columns()
+        add_missing_columns()
+        
+        # create_all skips indexes on existing tables, so add any that are missing
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+
+def migrate_legacy_data():
+    """Import the legacy JSON data files and backfill derived tables"""
+    # Import here to avoid circular imports
+    from utils import initialize_data_files
+    from models import migrate_data_from_json_to_db, backfill_expense_rollups
+    
+    # Ensure the data directory and files exist (for backward compatibility)
+    if not os.path.exists('data'):
+        os.makedirs('data')
+    initialize_data_files()
+    
+    with app.app_context():
+        # Migrate data from JSON files to database if needed
+        migrate_data_from_json_to_db()
+        
+        # Build the spending rollups for data that predates them
+        backfill_expense_rollups()
+
+def init_database():
+    """Prepare the database once per deployment: schema, legacy data and default categories"""
+    from utils import create_default_categories_if_empty
+    from query_cache import query_cache
+    
+    create_schema()
+    migrate_legacy_data()
+    
+    # Create default categories if the categories table is empty
+    create_default_categories_if_empty()
+    
+    # A recreated database starts its data versions over, so cached reads of the old one must go
+    query_cache.clear()
+
+@fintrack_cli.command('init-db')
+def init_db_command():
+    """Create the schema, migrate legacy data and seed default categories"""
+    init_database()
+    click.echo("Database initialized")
+
+@fintrack_cli.command('migrate')
+def migrate_command():
+    """Migrate legacy JSON data and backfill derived tables on an existing schema"""
+    migrate_legacy_data()
+    click.echo("Migration complete")
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild rollups for this user.')
+def rebuild_rollups_command(user_id):
+    """Reconstruct the rollup table from the expenses table"""
+    from models import rebuild_expense_rollups
+    
+    rows = rebuild_expense_rollups(user_id=user_id)
+    click.echo(f"Rebuilt {rows} rollup rows")
+
+@rollups_cli.command('verify')
+@click.option('--user-id', type=int, default=None, help='Only verify rollups for this user.')
+@click.option('--fix', is_flag=True, help='Rebuild the rollups if any drift is found.')
+def verify_rollups_command(user_id, fix):
+    """Compare the rollup table with the expenses table and report drift"""
+    from models import verify_expense_rollups, rebuild_expense_rollups
+    
+    mismatches = verify_expense_rollups(user_id=user_id)
+    if not mismatches:
+        click.echo("Rollups are consistent with expenses")
+        return
+    
+    for mismatch in mismatches:
+        click.echo(
+            f"user={mismatch['user_id']} month={mismatch['month']} category={mismatch['category']}: "
+            f"expected {mismatch['expected_total']:.2f} ({mismatch['expected_count']}), "
+            f"found {mismatch['actual_total']:.2f} ({mismatch['actual_count']})"
+        )
+    
+    if fix:
+        rows = rebuild_expense_rollups(user_id=user_id)
+        click.echo(f"Rebuilt {rows} rollup rows")
+    else:
+        raise SystemExit(1)
+
+@fintrack_cli.command('worker')
+@click.option('--poll-interval', type=float, default=None, help='Seconds to wait when idle (defaults to WORKER_POLL_INTERVAL).')
+@click.option('--until-empty', is_flag=True, help='Exit once the job queue is empty instead of polling.')
+def worker_command(poll_interval, until_empty):
+    """Recompute users' insight bundles from the job queue"""
+    from jobs import run_worker
+    
+    poll_interval = poll_interval or app.config['WORKER_POLL_INTERVAL']
+    processed = run_worker(poll_interval=poll_interval, until_empty=until_empty)
+    click.echo(f"Processed {processed} insight jobs")
+
+@fintrack_cli.command('cache-stats')
+def cache_stats_command():
+    """Show query cache hit, miss and eviction counters"""
+    from query_cache import query_cache
+    
+    stats = query_cache.stats()
+    if stats is None:
+        click.echo("Query cache is disabled")
+        return
+    if stats['backend'] == 'memory':
+        click.echo("The memory backend keeps counters per process; these are for this command only")
+    for name in ('backend', 'hits', 'misses', 'evictions', 'entries', 'bytes'):
+        click.echo(f"{name}: {stats[name]}")
+
+@fintrack_cli.command('cache-clear')
+def cache_clear_command():
+    """Drop every cached query result; run after restoring the database from a backup"""
+    from query_cache import query_cache
+    
+    query_cache.clear()
+    click.echo("Query cache cleared")
+
+@fintrack_cli.command('import-csv')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--user-id', type=int, required=True, help='Owner of the imported expenses.')
+@click.option('--batch-size', type=int, default=None, help='Rows per insert batch (defaults to IMPORT_BATCH_SIZE).')
+def import_csv_command(path, user_id, batch_size):
+    """Import expenses from a CSV file with category, amount, date and description columns"""
+    import sys
+    from importer import import_expenses_csv
+    
+    batch_size = batch_size or app.config['IMPORT_BATCH_SIZE']
+    if path == '-':
+        result = import_expenses_csv(sys.stdin, user_id, batch_size=batch_size)
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+            result = import_expenses_csv(file, user_id, batch_size=batch_size)
+    
+    for error in result['errors']:
+        click.echo(f"line {error['line']}: {error['message']}", err=True)
+    click.echo(
+        f"Imported {result['imported']} rows, rejected {result['failed']}, "
+        f"in {result['elapsed_seconds']}s ({result['rows_per_second']} rows/sec)"
+    )
+
+app.cli.add_command(fintrack_cli)
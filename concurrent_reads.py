@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
+from sql_profiler import active_profiles, recording_into
+
+# Shared by every request in the process; created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+# Marks pool threads, which run their reads in order instead of queueing more work behind themselves
+_local = threading.local()
+
+def _get_executor(max_workers):
+    """Return the process-wide read pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fintrack-read')
+        return _executor
+
+def _run_in_app_context(app, data_versions, profiles, count_queries, call):
+    """Run one read on a pool thread with its own app context, and so its own session and connection
+    
+    Returns the call's result with the SQL statements it ran and their time, for the request's metrics.
+    """
+    _local.in_pool = True
+    try:
+        with app.app_context(), recording_into(profiles):
+            # Reuse the data versions the request already looked up instead of querying them again
+            g.data_versions = dict(data_versions)
+            if count_queries:
+                g.metrics_queries = 0
+                g.metrics_query_time = 0.0
+            result = call()
+            return result, g.get('metrics_queries', 0), g.get('metrics_query_time', 0.0)
+    finally:
+        _local.in_pool = False
+
+def run_concurrently(*calls):
+    """Run independent read-only callables and return their results in order
+    
+    With CONCURRENT_READS on, all but the first call run on the read pool so their database
+    round-trips overlap; otherwise, or when already on a pool thread, they run one after another.
+    Calls must only read: they run outside the request, with their own g and session. Their SQL
+    still counts toward the request's profile, query budget and metrics.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('CONCURRENT_READS') or len(calls) < 2 or getattr(_local, 'in_pool', False):
+        return [call() for call in calls]
+    
+    executor = _get_executor(app.config.get('CONCURRENT_READ_WORKERS', 4))
+    data_versions = g.get('data_versions', {})
+    profiles = active_profiles()
+    count_queries = 'metrics_queries' in g
+    futures = [
+        executor.submit(_run_in_app_context, app, data_versions, profiles, count_queries, call)
+        for call in calls[1:]
+    ]
+    
+    # The first call runs on the request's own thread and session meanwhile
+    results = [calls[0]()]
+    for future in futures:
+        result, queries, query_time = future.result()
+        results.append(result)
+        if count_queries:
+            g.metrics_queries += queries
+            g.metrics_query_time += query_time
+    return results
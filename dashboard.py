@@ -0,0 +1,76 @@
+from datetime import datetime
+from flask import current_app, g, has_request_context
+from analytics import HISTORY_MONTHS, SpendingAnalytics, SpendingHistory, month_keys_ending
+from concurrent_reads import run_concurrently
+from forecasting import get_spending_forecast
+from query_cache import query_cache
+from models import ExpenseManager, CategoryManager, month_key, previous_month_key, minor_to_float, to_minor_units
+
+class DashboardSnapshot:
+    """A user's recent monthly spending plus categories, loaded once per request"""
+    
+    def __init__(self, user_id, today=None):
+        self.user_id = user_id
+        self.today = today or datetime.now()
+        self.current_month = month_key(self.today)
+        self.previous_month = previous_month_key(self.current_month)
+        
+        # One rollup query covers the whole analytics window; categories come from the per-user cache.
+        # Both are cached by data version, so look it up first and hand it to the read pool
+        query_cache.data_version(user_id)
+        self.month_totals, self.categories = run_concurrently(
+            lambda: ExpenseManager.get_rollup_totals(month_keys_ending(self.today, HISTORY_MONTHS), user_id=user_id),
+            lambda: CategoryManager.get_all_categories(user_id=user_id)
+        )
+        # Totals are kept in integer minor units so comparisons and sums stay exact
+        self.current_minor = self.month_totals[self.current_month]
+        self.previous_minor = self.month_totals[self.previous_month]
+        self.categories_by_name = {category['name_en']: category for category in self.categories}
+        self._analytics = None
+    
+    @property
+    def analytics(self):
+        """Vectorized statistics over the snapshot's months, computed on first use"""
+        if self._analytics is None:
+            budgets_minor = {category['name_en']: to_minor_units(category['budget']) for category in self.categories}
+            
+            # Month-end projections come from the user's cached forecast model
+            forecast = get_spending_forecast(
+                self.user_id, self.month_totals, self.today,
+                fit_budget_ms=current_app.config.get('FORECAST_FIT_BUDGET_MS')
+            )
+            self._analytics = SpendingAnalytics(
+                SpendingHistory.from_month_totals(self.month_totals), budgets_minor, self.today,
+                projected_minor=forecast.predict(self.today, self.current_minor)
+            )
+        return self._analytics
+    
+    @property
+    def current_total_minor(self):
+        """Total spent in the current month, in minor units"""
+        return sum(self.current_minor.values())
+    
+    @property
+    def previous_total_minor(self):
+        """Total spent in the previous month, in minor units"""
+        return sum(self.previous_minor.values())
+    
+    @property
+    def current_totals(self):
+        """Current month spending per category as display amounts"""
+        return {category: minor_to_float(total) for category, total in self.current_minor.items()}
+    
+    @property
+    def current_total(self):
+        """Total spent in the current month as a display amount"""
+        return minor_to_float(self.current_total_minor)
+
+def get_dashboard_snapshot(user_id):
+    """Return the snapshot for a user, building it at most once per request"""
+    if not has_request_context():
+        return DashboardSnapshot(user_id)
+    
+    snapshots = g.setdefault('dashboard_snapshots', {})
+    if user_id not in snapshots:
+        snapshots[user_id] = DashboardSnapshot(user_id)
+    return snapshots[user_id]
@@ -0,0 +1,226 @@
+import calendar
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+from analytics import month_ordinal
+
+# Complete months before the current one used to fit a user's model
+FORECAST_HISTORY_MONTHS = 12
+
+# A recurring payment is the largest charge of a category on about the same day, for about the same amount
+RECURRING_MIN_MONTHS = 3
+RECURRING_DAY_TOLERANCE = 2
+RECURRING_AMOUNT_TOLERANCE = 0.15
+
+# Weight of the latest month when exponentially smoothing monthly non-recurring spending
+SMOOTHING_ALPHA = 0.5
+
+# Day-of-month and weekday profiles are shrunk towards flat by this many months of prior
+PROFILE_PRIOR_MONTHS = 3
+
+# Categories without history fall back to the linear rate, but only after this many days of the month
+LINEAR_MIN_DAYS = 7
+
+MAX_DAYS = 31
+
+def _weekdays(day_numbers):
+    """Monday=0 weekday for days counted from 1970-01-01 (a Thursday)"""
+    return (day_numbers + 3) % 7
+
+class SpendingForecast:
+    """A user's fitted spending model: recurring payments plus a smoothed, profiled daily rate per category"""
+    
+    def __init__(self, categories, level, day_factors, weekday_factors, recurring_day, recurring_amount, history_months):
+        self.categories = categories
+        self.index = {name: position for position, name in enumerate(categories)}
+        self.level = level
+        self.day_factors = day_factors
+        self.weekday_factors = weekday_factors
+        self.recurring_day = recurring_day
+        self.recurring_amount = recurring_amount
+        self.history_months = history_months
+    
+    @classmethod
+    def fit(cls, dates, categories, amounts_minor, today):
+        """Fit the model on daily spending from the complete months before today's month"""
+        names, codes = np.unique(np.asarray(categories, dtype=object).astype(str), return_inverse=True)
+        day_values = np.asarray(dates, dtype='datetime64[D]')
+        month_values = day_values.astype('datetime64[M]')
+        amounts = np.asarray(amounts_minor, dtype=np.float64)
+        category_count = len(names)
+        
+        # Daily spending as a (categories x months x day of month) cube
+        first_month = month_ordinal(today) - FORECAST_HISTORY_MONTHS
+        months = month_values.astype(np.int64) - first_month
+        days = (day_values - month_values.astype('datetime64[D]')).astype(np.int64)
+        keep = (months >= 0) & (months < FORECAST_HISTORY_MONTHS)
+        cells = (codes[keep] * FORECAST_HISTORY_MONTHS + months[keep]) * MAX_DAYS + days[keep]
+        daily = np.bincount(
+            cells, weights=amounts[keep], minlength=category_count * FORECAST_HISTORY_MONTHS * MAX_DAYS
+        ).reshape(category_count, FORECAST_HISTORY_MONTHS, MAX_DAYS)
+        
+        # Only months from the user's first spending onwards count as history
+        active = np.flatnonzero(daily.sum(axis=(0, 2)) > 0)
+        if category_count == 0 or len(active) == 0:
+            return cls.empty()
+        daily = daily[:, active[0]:, :]
+        month_firsts = np.arange(first_month + active[0], first_month + FORECAST_HISTORY_MONTHS).astype('datetime64[M]')
+        month_lengths = ((month_firsts + 1).astype('datetime64[D]') - month_firsts.astype('datetime64[D]')).astype(np.int64)
+        history_months = len(month_firsts)
+        
+        # Recurring payments: each month's largest day, consistent in day and amount over recent months
+        peak_days = daily.argmax(axis=2)
+        peak_amounts = daily.max(axis=2)
+        recurring_day = np.full(category_count, -1, dtype=np.int64)
+        recurring_amount = np.zeros(category_count)
+        if history_months >= RECURRING_MIN_MONTHS:
+            recent_days = peak_days[:, -RECURRING_MIN_MONTHS:]
+            recent_amounts = peak_amounts[:, -RECURRING_MIN_MONTHS:]
+            median_day = np.rint(np.median(recent_days, axis=1)).astype(np.int64)
+            median_amount = np.median(recent_amounts, axis=1)
+            recurring = (
+                (recent_amounts > 0).all(axis=1)
+                & (np.abs(recent_days - median_day[:, None]) <= RECURRING_DAY_TOLERANCE).all(axis=1)
+                & (np.abs(recent_amounts - median_amount[:, None]) <= RECURRING_AMOUNT_TOLERANCE * median_amount[:, None]).all(axis=1)
+            )
+            recurring_day = np.where(recurring, median_day, -1)
+            recurring_amount = np.where(recurring, np.rint(median_amount), 0.0)
+            
+            # Take matching payments out of the history so they don't inflate the daily rate
+            matches = (
+                recurring[:, None]
+                & (np.abs(peak_days - median_day[:, None]) <= RECURRING_DAY_TOLERANCE)
+                & (np.abs(peak_amounts - median_amount[:, None]) <= RECURRING_AMOUNT_TOLERANCE * median_amount[:, None])
+            )
+            category_index, month_index = np.nonzero(matches)
+            daily[category_index, month_index, peak_days[category_index, month_index]] = np.maximum(
+                daily[category_index, month_index, peak_days[category_index, month_index]] - recurring_amount[category_index], 0
+            )
+        
+        # Exponentially smoothed monthly non-recurring spending, oldest month first
+        monthly = daily.sum(axis=2)
+        level = monthly[:, 0].copy()
+        for month in range(1, history_months):
+            level = SMOOTHING_ALPHA * monthly[:, month] + (1 - SMOOTHING_ALPHA) * level
+        
+        # Relative spending by day of month and by weekday, shrunk towards flat for short histories
+        shrink = history_months / (history_months + PROFILE_PRIOR_MONTHS)
+        day_exists = np.arange(MAX_DAYS)[None, :] < month_lengths[:, None]
+        day_counts = day_exists.sum(axis=0)
+        day_weekdays = _weekdays(month_firsts.astype('datetime64[D]').astype(np.int64)[:, None] + np.arange(MAX_DAYS)[None, :])
+        weekday_counts = np.bincount(day_weekdays[day_exists], minlength=7)
+        weekday_totals = np.stack([
+            np.bincount(day_weekdays[day_exists], weights=daily[category][day_exists], minlength=7)
+            for category in range(category_count)
+        ])
+        mean_daily = monthly.sum(axis=1) / month_lengths.sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            day_factors = daily.sum(axis=1) / day_counts / mean_daily[:, None]
+            weekday_factors = weekday_totals / weekday_counts / mean_daily[:, None]
+        day_factors = shrink * np.nan_to_num(day_factors, nan=1.0, posinf=1.0) + (1 - shrink)
+        weekday_factors = shrink * np.nan_to_num(weekday_factors, nan=1.0, posinf=1.0) + (1 - shrink)
+        
+        return cls(names.tolist(), level, day_factors, weekday_factors, recurring_day, recurring_amount, history_months)
+    
+    @classmethod
+    def empty(cls):
+        """A model for a user without history; every category falls back to the linear rate"""
+        return cls([], np.zeros(0), np.ones((0, MAX_DAYS)), np.ones((0, 7)), np.zeros(0, dtype=np.int64), np.zeros(0), 0)
+    
+    def predict(self, today, current_minor):
+        """Project each category's month-end total in minor units from its spending so far this month"""
+        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        days_elapsed = today.day
+        projections = {}
+        
+        # Share of a typical month's non-recurring spending that falls after today
+        month_days = np.arange(days_in_month)
+        weekdays = _weekdays(np.datetime64(date(today.year, today.month, 1), 'D').astype(np.int64) + month_days)
+        weights = self.day_factors[:, :days_in_month] * self.weekday_factors[:, weekdays]
+        remaining_share = weights[:, days_elapsed:].sum(axis=1) / weights.sum(axis=1)
+        
+        for category in set(self.categories) | set(current_minor):
+            spent = current_minor.get(category, 0)
+            position = self.index.get(category)
+            if position is None:
+                # No history: linear projection once the month has enough days to go on
+                projections[category] = int(round(spent / days_elapsed * days_in_month)) if days_elapsed >= LINEAR_MIN_DAYS else spent
+                continue
+            
+            # A recurring payment counts as made once it is due and the month's spending covers it
+            amount = self.recurring_amount[position]
+            unpaid = 0.0
+            if self.recurring_day[position] >= 0:
+                due = days_elapsed - 1 >= self.recurring_day[position] - RECURRING_DAY_TOLERANCE
+                if due and spent >= amount * (1 - RECURRING_AMOUNT_TOLERANCE):
+                    spent_regular = spent - amount
+                else:
+                    spent_regular, unpaid = spent, amount
+            else:
+                spent_regular = spent
+            
+            # Blend the smoothed level with this month's pace, trusting the pace as the month progresses
+            remaining = remaining_share[position]
+            elapsed = 1 - remaining
+            pace = spent_regular / elapsed if elapsed > 0 else 0.0
+            expected_month = remaining * self.level[position] + elapsed * pace
+            projections[category] = int(round(spent + unpaid + remaining * expected_month))
+        return projections
+    
+    def recurring_payments(self):
+        """Return {category: (day of month, amount_minor)} for detected recurring payments"""
+        return {
+            category: (int(self.recurring_day[position]) + 1, int(self.recurring_amount[position]))
+            for category, position in self.index.items()
+            if self.recurring_day[position] >= 0
+        }
+
+# Per-process cache of fitted models: {user_id: (fingerprint, SpendingForecast)}, least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 1024
+
+def history_fingerprint(month_totals, today):
+    """Fingerprint of the fitted window: the current month and the rollup totals of the months before it"""
+    current = f"{today.year}-{today.month:02d}"
+    history = tuple(sorted(
+        (month, category, total)
+        for month, totals in month_totals.items() if month < current
+        for category, total in totals.items()
+    ))
+    return (current, hash(history))
+
+def get_spending_forecast(user_id, month_totals, today, fit_budget_ms=None):
+    """Return the user's fitted model, refitting only when their completed months changed"""
+    from models import ExpenseManager
+    
+    fingerprint = history_fingerprint(month_totals, today)
+    with _cache_lock:
+        cached = _cache.get(user_id)
+        if cached is not None and cached[0] == fingerprint:
+            _cache.move_to_end(user_id)
+            return cached[1]
+    
+    # Fit from daily totals over the history window; the current month is never part of it
+    first_day = date(today.year, today.month, 1)
+    start = np.datetime64(first_day, 'M') - FORECAST_HISTORY_MONTHS
+    rows = ExpenseManager.get_daily_category_totals(
+        start.astype('datetime64[D]').item(), first_day - timedelta(days=1), user_id
+    )
+    started = time.perf_counter()
+    forecast = SpendingForecast.fit(
+        [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows], today
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if fit_budget_ms is not None and elapsed_ms > fit_budget_ms:
+        logging.warning(f"Forecast fit for user {user_id} took {elapsed_ms:.1f}ms (budget {fit_budget_ms}ms)")
+    
+    with _cache_lock:
+        _cache[user_id] = (fingerprint, forecast)
+        _cache.move_to_end(user_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return forecast
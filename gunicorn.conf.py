@@ -0,0 +1,20 @@
+"""Gunicorn settings, loaded automatically by "gunicorn main:app" from the working directory"""
+import glob
+import os
+import tempfile
+
+# Workers write their metrics here so /metrics can add up every worker's samples; the master sets
+# it before any worker imports prometheus_client, which reads it at import time
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'fintrack-metrics'))
+
+def on_starting(server):
+    # Files from a previous run would be added to this run's totals
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges (checked out connections) from the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+from datetime import date
+from functools import wraps
+from flask import g, request, session, make_response
+from flask_login import current_user
+from models import get_data_version
+
+# Pages change with each release too, so ETags include a fingerprint of the templates and static files
+_release_fingerprint = None
+
+def release_fingerprint():
+    """Hash of the shipped templates and static files, computed once per process"""
+    global _release_fingerprint
+    if _release_fingerprint is None:
+        digest = hashlib.sha1()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for directory in ('templates', 'static'):
+            for dirpath, dirnames, filenames in sorted(os.walk(os.path.join(root, directory))):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    path = os.path.join(dirpath, filename)
+                    digest.update(os.path.relpath(path, root).encode('utf-8'))
+                    with open(path, 'rb') as file:
+                        digest.update(file.read())
+        _release_fingerprint = digest.hexdigest()[:12]
+    return _release_fingerprint
+
+def data_version_etag(user_id, version, *parts):
+    """Build a strong ETag value from a user's data version and any extra parts"""
+    raw = ':'.join(str(part) for part in (release_fingerprint(), user_id, version) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def conditional_on_data_version(date_sensitive=False, with_insights=False):
+    """Answer conditional GETs with 304 from the user's data version before the view runs any query"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # Anonymous pages and pages about to show a flashed message are always rendered
+            if not current_user.is_authenticated or '_flashes' in session:
+                return view(*args, **kwargs)
+            
+            user_id = current_user.id
+            version = get_data_version(user_id, with_insights=with_insights)
+            
+            # Share the version with the query cache so the view doesn't look it up again
+            g.setdefault('data_versions', {})[user_id] = version[0] if with_insights else version
+            parts = [request.full_path]
+            if date_sensitive:
+                # Month totals, projections and alerts move with the calendar, not just with writes
+                parts.append(date.today().isoformat())
+            etag = data_version_etag(user_id, version, *parts)
+            
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            # Private to this user's session, and revalidated on every use
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapped
+    return decorator
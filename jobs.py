@@ -0,0 +1,184 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from query_cache import query_cache
+from singleflight import single_flight
+from models import InsightBundle, InsightJob, CategoryManager, enqueue_insight_jobs, month_key
+
+# Failed jobs are retried with a growing delay, then left as 'failed'
+MAX_JOB_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 30
+
+# A 'running' job older than this belonged to a worker that died and is picked up again
+JOB_TIMEOUT_SECONDS = 300
+
+def compute_insight_bundle(user_id, snapshot=None):
+    """Compute a user's insights, alerts and tips from current data, or from the request's snapshot"""
+    # Import here to avoid circular imports
+    from dashboard import get_dashboard_snapshot
+    from utils import get_insights, get_spending_alerts, get_savings_tips
+    
+    # Requests from several tabs at once share one computation for the same data and day
+    key = ('insight_bundle', user_id, query_cache.data_version(user_id), datetime.now().date().isoformat())
+    
+    def compute():
+        current = snapshot or get_dashboard_snapshot(user_id)
+        return {
+            'insights': get_insights(user_id=user_id, snapshot=current),
+            'alerts': get_spending_alerts(user_id=user_id, snapshot=current),
+            'tips': get_savings_tips(user_id=user_id, snapshot=current)
+        }
+    return single_flight.do(key, compute)
+
+def store_insight_bundle(user_id, bundle, day):
+    """Save a bundle computed on the given day for a user inside the current transaction"""
+    row = db.session.get(InsightBundle, user_id)
+    if row is None:
+        row = InsightBundle(user_id=user_id)
+        db.session.add(row)
+    row.month = month_key(day)
+    row.day = day
+    row.payload = json.dumps(bundle, ensure_ascii=False)
+    row.computed_at = datetime.utcnow()
+    row.stale_since = None
+
+def load_insight_bundle(user_id):
+    """Return a user's stored bundle while it is usable, or None when it has to be computed; only reads"""
+    row = db.session.get(InsightBundle, user_id)
+    
+    # Missing, or from an earlier day: month-to-date projections, days-left alerts and
+    # upcoming payments move with the calendar
+    if row is None or row.day != datetime.now().date():
+        return None
+    
+    # Stale-while-revalidate: the write that made it stale already queued a refresh for the worker.
+    # Past the limit (no worker running) it is computed now
+    max_stale = timedelta(seconds=current_app.config['INSIGHT_BUNDLE_MAX_STALE'])
+    if row.stale_since is not None and datetime.utcnow() - row.stale_since > max_stale:
+        return None
+    return json.loads(row.payload)
+
+def refresh_insight_bundle(user_id, snapshot=None):
+    """Compute a user's bundle now and store it, reusing the request's snapshot when given"""
+    bundle = compute_insight_bundle(user_id, snapshot)
+    try:
+        store_insight_bundle(user_id, bundle, datetime.now().date())
+        db.session.commit()
+    except IntegrityError:
+        # Another request stored it first; this result is just as fresh
+        db.session.rollback()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error storing insight bundle for user ID {user_id}: {str(e)}")
+    return bundle
+
+def get_insight_bundle(user_id, snapshot=None):
+    """Return a user's stored bundle, serving it while stale and computing it only when unusable"""
+    bundle = load_insight_bundle(user_id)
+    if bundle is None:
+        bundle = refresh_insight_bundle(user_id, snapshot)
+    return bundle
+
+def claim_next_job():
+    """Mark the oldest due pending job as running and return it, or None when the queue is empty"""
+    now = datetime.utcnow()
+    
+    # Jobs stuck in 'running' were abandoned by a worker that stopped mid-job
+    db.session.execute(
+        update(InsightJob)
+        .where(InsightJob.status == 'running', InsightJob.started_at < now - timedelta(seconds=JOB_TIMEOUT_SECONDS))
+        .values(status='pending')
+    )
+    
+    # SKIP LOCKED lets several workers poll the same table on PostgreSQL
+    job = db.session.scalars(
+        select(InsightJob)
+        .where(InsightJob.status == 'pending', InsightJob.run_after <= now)
+        .order_by(InsightJob.run_after, InsightJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if job is None:
+        db.session.commit()
+        return None
+    
+    job.status = 'running'
+    job.started_at = now
+    job.attempts += 1
+    db.session.commit()
+    return job
+
+def run_job(job):
+    """Recompute and store the bundle for a claimed job"""
+    user_id = job.user_id
+    try:
+        # Budgets may have changed in another process, so don't trust this process's category cache
+        CategoryManager.invalidate_cache(user_id)
+        bundle = compute_insight_bundle(user_id)
+        store_insight_bundle(user_id, bundle, datetime.now().date())
+        
+        # Pending jobs queued before this run started are covered by it
+        db.session.execute(
+            update(InsightJob)
+            .where(
+                InsightJob.user_id == user_id,
+                InsightJob.status == 'pending',
+                InsightJob.created_at <= job.started_at
+            )
+            .values(status='done', finished_at=datetime.utcnow())
+        )
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error running insight job {job.id} for user ID {user_id}: {str(e)}")
+        
+        job = db.session.get(InsightJob, job.id)
+        job.last_error = str(e)
+        if job.attempts >= MAX_JOB_ATTEMPTS:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'pending'
+            job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_DELAY_SECONDS * job.attempts)
+        db.session.commit()
+        return False
+
+def enqueue_day_rollover_jobs(today):
+    """Queue refreshes for every bundle computed on a day before the given one"""
+    user_ids = db.session.scalars(
+        select(InsightBundle.user_id).where(or_(InsightBundle.day.is_(None), InsightBundle.day != today))
+    ).all()
+    queued = enqueue_insight_jobs(user_ids, 'day_rollover')
+    db.session.commit()
+    return queued
+
+def run_worker(poll_interval=2.0, until_empty=False):
+    """Process insight jobs until stopped; returns the number of jobs run"""
+    processed = 0
+    checked_day = None
+    while True:
+        # Once a day (and at start-up) refresh bundles computed on an earlier day
+        today = datetime.now().date()
+        if today != checked_day:
+            queued = enqueue_day_rollover_jobs(today)
+            if queued:
+                logging.info(f"Queued {queued} insight refreshes for the new day")
+            checked_day = today
+        
+        job = claim_next_job()
+        if job is None:
+            if until_empty:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        
+        run_job(job)
+        processed += 1
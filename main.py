@@ -1,11 +1,18 @@
+import os
 from app import app  # noqa: F401
 import routes  # noqa: F401
-from utils import create_default_categories_if_empty
+import commands  # noqa: F401
+import metrics
+import sql_profiler
 
-# Create default categories if the categories table is empty
-create_default_categories_if_empty()
+# Request, SQL and pool metrics need the routes and models loaded first
+metrics.init_app(app)
+sql_profiler.init_app(app)
 
 if __name__ == "__main__":
+    # The development server is a single process, so it can safely prepare the database itself;
+    # deployments run "flask --app main fintrack init-db" once instead
+    commands.init_database()
+    
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
- 
@@ -0,0 +1,155 @@
+import functools
+import hmac
+import os
+import time
+from flask import Response, current_app, g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker writes its samples to files
+# in that directory and /metrics adds up all of them, whichever worker answers the scrape
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+REQUEST_LATENCY = Histogram(
+    'fintrack_request_duration_seconds', 'Time to handle a request', ['endpoint', 'method']
+)
+REQUESTS = Counter(
+    'fintrack_requests_total', 'Requests handled', ['endpoint', 'method', 'status']
+)
+REQUEST_QUERIES = Histogram(
+    'fintrack_request_db_queries', 'SQL statements run while handling a request', ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf'))
+)
+REQUEST_QUERY_TIME = Histogram(
+    'fintrack_request_db_seconds', 'Time spent in SQL while handling a request', ['endpoint']
+)
+QUERY_LATENCY = Histogram(
+    'fintrack_db_query_duration_seconds', 'Time to run one SQL statement'
+)
+POOL_CHECKED_OUT = Gauge(
+    'fintrack_db_pool_checked_out', 'Database connections currently checked out of the pool',
+    multiprocess_mode='livesum'
+)
+POOL_OVERFLOW = Gauge(
+    'fintrack_db_pool_overflow', 'Connections open beyond the pool size',
+    multiprocess_mode='livesum'
+)
+POOL_CHECKOUTS = Counter(
+    'fintrack_db_pool_checkouts_total', 'Connections checked out of the pool'
+)
+MANAGER_CALLS = Counter(
+    'fintrack_manager_calls_total', 'Calls to ExpenseManager and CategoryManager methods', ['manager', 'method']
+)
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_time = 0.0
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    
+    # Endpoint names, not paths, so ids in URLs don't create a series per expense
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    REQUEST_QUERIES.labels(endpoint).observe(g.pop('metrics_queries', 0))
+    REQUEST_QUERY_TIME.labels(endpoint).observe(g.pop('metrics_query_time', 0.0))
+    return response
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    QUERY_LATENCY.observe(elapsed)
+    
+    # Statements outside a request (CLI, insight worker) only count globally; read pool threads
+    # count into their own g and concurrent_reads adds the totals to the request
+    if has_app_context() and 'metrics_queries' in g:
+        g.metrics_queries += 1
+        g.metrics_query_time += elapsed
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get('metrics_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_manager(manager):
+    """Count calls to each static method of a manager class"""
+    for name, attribute in list(vars(manager).items()):
+        if not isinstance(attribute, staticmethod) or name.startswith('_'):
+            continue
+        counter = MANAGER_CALLS.labels(manager.__name__, name)
+        
+        def wrap(function, counter):
+            @functools.wraps(function)
+            def wrapped(*args, **kwargs):
+                counter.inc()
+                return function(*args, **kwargs)
+            return wrapped
+        setattr(manager, name, staticmethod(wrap(attribute.__func__, counter)))
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+def metrics_view():
+    # Scrapers authenticate with a bearer token when METRICS_TOKEN is set
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+def init_app(app):
+    """Hook request timing, SQL and pool events and manager counters into the app, and serve /metrics"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    
+    # Import here to avoid circular imports
+    from app import db
+    from models import ExpenseManager, CategoryManager
+    
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    
+    pool = engine.pool
+    
+    @event.listens_for(pool, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc()
+        POOL_CHECKED_OUT.inc()
+        if hasattr(pool, 'overflow'):
+            POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    
+    @event.listens_for(pool, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec()
+        if hasattr(pool, 'overflow'):
+            POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    
+    instrument_manager(ExpenseManager)
+    instrument_manager(CategoryManager)
+    
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
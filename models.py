@@ -1,12 +1,21 @@
+import base64
+import csv
+import io
 import json
 import os
+import threading
+import time
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from flask import current_app, g, has_request_context
 from app import db
-from sqlalchemy import func, and_, desc
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, and_, or_, desc, update, insert, select, event
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
 import logging
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from security import hash_password, verify_password, needs_rehash
+from query_cache import query_cache
 
 # Define User model for authentication
 class User(UserMixin, db.Model):
@@ -17,18 +26,25 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every expense or category change; read it with get_data_version, cached copies may lag
+    data_version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
     
     # Relationships
     expenses = db.relationship('Expense', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     categories = db.relationship('Category', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    rollups = db.relationship('ExpenseRollup', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check whether the stored hash predates the configured hashing method or cost"""
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert model to dictionary for API responses"""
@@ -39,38 +55,119 @@ class User(UserMixin, db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+# Money is stored as integer minor units (hundredths) so sums are exact
+MINOR_UNITS = 100
+
+# Largest single amount accepted, in minor units; far below BIGINT so rollup sums can't overflow
+MAX_AMOUNT_MINOR = 10 ** 13
+
+# Ids are INTEGER columns; a larger id can't exist, and Postgres rejects it in a query
+MAX_ROW_ID = 2 ** 31 - 1
+
+def to_minor_units(value):
+    """Convert an amount such as '12.34', 12.34 or Decimal('12.34') to integer minor units"""
+    amount = Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return int(amount * MINOR_UNITS)
+
+def from_minor_units(value):
+    """Convert integer minor units back to a Decimal amount"""
+    return (Decimal(int(value or 0)) / MINOR_UNITS).quantize(Decimal('0.01'))
+
+def minor_to_float(value):
+    """Convert integer minor units to a float amount for templates and JSON"""
+    return float(from_minor_units(value))
+
+# Per-process cache of users for the login loader: {user_id: (loaded_at, detached copy)}
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+def get_cached_user(user_id):
+    """Load a user for the current request, reusing a recent copy instead of querying"""
+    # Other workers can't invalidate this process's cache, so entries also expire
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+    
+    if cached is None or time.monotonic() - cached[0] > ttl:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        
+        # Keep a detached copy so the cached row never belongs to another request's session
+        copy = User(**{attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs})
+        make_transient_to_detached(copy)
+        with _user_cache_lock:
+            _user_cache[user_id] = (time.monotonic(), copy)
+        return user
+    
+    # Attach the cached state to this request's session without a SELECT
+    return db.session.merge(cached[1], load=False)
+
+def invalidate_cached_user(user_id):
+    """Drop a user from the login loader cache"""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user_on_change(mapper, connection, target):
+    # Profile and password changes must not be served from the cache
+    invalidate_cached_user(target.id)
+
 # Define SQLAlchemy models for database tables
 class Expense(db.Model):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        # Supports keyset pagination of a user's history ordered by (date, id)
+        db.Index('ix_expenses_user_date_id', 'user_id', 'date', 'id'),
+        # Supports delta sync of rows changed since a data version
+        db.Index('ix_expenses_user_version', 'user_id', 'version'),
+        # A create retried by a sync client finds the row its first attempt made; two retries
+        # racing can't both insert, the loser fails and its next retry is replayed
+        db.Index('uq_expenses_user_client_id', 'user_id', 'client_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     category = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount_minor = db.Column(db.BigInteger, nullable=False)
     date = db.Column(db.Date, nullable=False)
     description = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # The user's data version when this row last changed; NULL until the writing transaction commits
+    version = db.Column(db.BigInteger, nullable=True)
+    # Key a sync client generated for the create, so retrying it doesn't add a copy
+    client_id = db.Column(db.String(64), nullable=True)
     
     def to_dict(self):
         """Convert model to dictionary for API responses"""
         return {
             'id': self.id,
             'category': self.category,
-            'amount': float(self.amount),
+            'amount': minor_to_float(self.amount_minor),
             'date': self.date.strftime('%Y-%m-%d'),
             'description': self.description or '',
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'user_id': self.user_id
+            'user_id': self.user_id,
+            'version': self.version,
+            'client_id': self.client_id
         }
 
 class Category(db.Model):
     __tablename__ = 'categories'
+    __table_args__ = (
+        db.Index('ix_categories_user_version', 'user_id', 'version'),
+        db.Index('uq_categories_user_client_id', 'user_id', 'client_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name_en = db.Column(db.String(100), nullable=False)
     name_ar = db.Column(db.String(100), nullable=False)
-    budget = db.Column(db.Float, default=0.0)
+    budget_minor = db.Column(db.BigInteger, nullable=False, default=0)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Same meaning as Expense.version and Expense.client_id
+    version = db.Column(db.BigInteger, nullable=True)
+    client_id = db.Column(db.String(64), nullable=True)
     
     def to_dict(self):
         """Convert model to dictionary for API responses"""
@@ -78,25 +175,608 @@ class Category(db.Model):
             'id': str(self.id),
             'name_en': self.name_en,
             'name_ar': self.name_ar,
-            'budget': float(self.budget),
-            'user_id': self.user_id
+            'budget': minor_to_float(self.budget_minor),
+            'user_id': self.user_id,
+            'version': self.version,
+            'client_id': self.client_id
+        }
+
+class ExpenseRow:
+    """An expense read with a Core select rather than loaded as a model: no identity map or change
+    tracking, and the amount and dates are only formatted when the row is turned into a dict"""
+    __slots__ = (
+        'id', 'category', 'amount_minor', 'date', 'description', 'created_at', 'user_id', 'version', 'client_id'
+    )
+    columns = (
+        Expense.id, Expense.category, Expense.amount_minor, Expense.date,
+        Expense.description, Expense.created_at, Expense.user_id, Expense.version, Expense.client_id
+    )
+    
+    def __init__(self, id, category, amount_minor, date, description, created_at, user_id, version, client_id):
+        self.id = id
+        self.category = category
+        self.amount_minor = amount_minor
+        self.date = date
+        self.description = description
+        self.created_at = created_at
+        self.user_id = user_id
+        self.version = version
+        self.client_id = client_id
+    
+    # Same attribute names as the model, so the same dict
+    to_dict = Expense.to_dict
+
+class CategoryRow:
+    """A category read with a Core select, like ExpenseRow"""
+    __slots__ = ('id', 'name_en', 'name_ar', 'budget_minor', 'user_id', 'version', 'client_id')
+    columns = (
+        Category.id, Category.name_en, Category.name_ar, Category.budget_minor,
+        Category.user_id, Category.version, Category.client_id
+    )
+    
+    def __init__(self, id, name_en, name_ar, budget_minor, user_id, version, client_id):
+        self.id = id
+        self.name_en = name_en
+        self.name_ar = name_ar
+        self.budget_minor = budget_minor
+        self.user_id = user_id
+        self.version = version
+        self.client_id = client_id
+    
+    to_dict = Category.to_dict
+
+def read_rows(row_class, statement):
+    """Run a select of row_class.columns and return one row object per result row"""
+    return [row_class(*row) for row in db.session.execute(statement)]
+
+class SyncTombstone(db.Model):
+    """Record of a deleted expense or category, so sync clients learn about the delete"""
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_user_version', 'user_id', 'version'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    entity = db.Column(db.String(16), nullable=False)  # 'expense' or 'category'
+    entity_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.BigInteger, nullable=True)  # Stamped like Expense.version
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert model to dictionary for API responses"""
+        return {
+            'entity': self.entity,
+            'id': self.entity_id,
+            'version': self.version
         }
 
+# Models whose rows are versioned for delta sync, with their tombstone entity names
+SYNCED_MODELS = {'expense': Expense, 'category': Category}
+SYNCED_ROWS = {'expense': ExpenseRow, 'category': CategoryRow}
+
+@event.listens_for(Expense, 'before_update')
+@event.listens_for(Category, 'before_update')
+def _clear_sync_version(mapper, connection, target):
+    # The commit stamps the user's new data version on every row left without one
+    target.version = None
+
+@event.listens_for(Expense, 'after_delete')
+@event.listens_for(Category, 'after_delete')
+def _record_sync_tombstone(mapper, connection, target):
+    entity = 'expense' if isinstance(target, Expense) else 'category'
+    connection.execute(
+        insert(SyncTombstone).values(
+            user_id=target.user_id, entity=entity, entity_id=target.id, deleted_at=datetime.utcnow()
+        )
+    )
+
+class ExpenseRollup(db.Model):
+    """Per-user spending totals for each month and category, kept in step with expenses"""
+    __tablename__ = 'expense_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month', 'category', name='uq_expense_rollups_user_month_category'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    category = db.Column(db.String(100), nullable=False)
+    total_minor = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class InsightBundle(db.Model):
+    """A user's precomputed insights, alerts and tips, refreshed by the background worker"""
+    __tablename__ = 'insight_bundles'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM' the bundle was computed for
+    payload = db.Column(db.Text, nullable=False)  # JSON: {'insights': [...], 'alerts': [...], 'tips': [...]}
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    day = db.Column(db.Date, nullable=True)  # Local date computed on; projections and alerts are for that day
+    stale_since = db.Column(db.DateTime, nullable=True)  # First write after computed_at, if any
+
+class InsightJob(db.Model):
+    """A queued recomputation of a user's insight bundle"""
+    __tablename__ = 'insight_jobs'
+    __table_args__ = (
+        # The worker polls for the oldest due pending job
+        db.Index('ix_insight_jobs_status_run_after', 'status', 'run_after'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    reason = db.Column(db.String(32), nullable=False)  # 'write', 'day_rollover', ...
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+def enqueue_insight_jobs(user_ids, reason, session=None):
+    """Queue a bundle refresh for each user that doesn't already have one pending"""
+    session = session or db.session
+    user_ids = set(user_ids)
+    if not user_ids:
+        return 0
+    
+    pending = set(session.scalars(
+        select(InsightJob.user_id).where(InsightJob.user_id.in_(user_ids), InsightJob.status == 'pending')
+    ))
+    now = datetime.utcnow()
+    jobs = [
+        {'user_id': user_id, 'reason': reason, 'status': 'pending', 'attempts': 0, 'run_after': now, 'created_at': now}
+        for user_id in sorted(user_ids - pending)
+    ]
+    if jobs:
+        session.execute(insert(InsightJob), jobs)
+    return len(jobs)
+
+def mark_user_data_changed(user_id):
+    """Record that a user's expenses or categories changed; applied when the transaction commits"""
+    db.session.info.setdefault('changed_user_ids', set()).add(user_id)
+
+def get_data_version(user_id, with_insights=False):
+    """Return a user's data version, plus when their insight bundle was computed if asked, in one query"""
+    if not with_insights:
+        return db.session.scalar(select(User.data_version).where(User.id == user_id))
+    return tuple(db.session.execute(
+        select(User.data_version, InsightBundle.computed_at)
+        .outerjoin(InsightBundle, InsightBundle.user_id == User.id)
+        .where(User.id == user_id)
+    ).one())
+
+def get_sync_changes(user_id, since=None):
+    """Return a user's expenses, categories and deletes changed after a data version, or everything if since is None"""
+    # Read the version first: rows committed later may also be returned, and are sent again next time
+    version = get_data_version(user_id)
+    changes = {'version': version, 'full': since is None}
+    
+    for entity, model in SYNCED_MODELS.items():
+        row_class = SYNCED_ROWS[entity]
+        statement = select(*row_class.columns).where(model.user_id == user_id)
+        if since is not None:
+            statement = statement.where(model.version > since)
+        changes[f"{entity}_changes"] = [row.to_dict() for row in read_rows(row_class, statement.order_by(model.id))]
+    
+    # A full download has nothing to delete locally
+    changes['deleted'] = []
+    if since is not None:
+        tombstones = SyncTombstone.query.filter(
+            SyncTombstone.user_id == user_id, SyncTombstone.version > since
+        ).order_by(SyncTombstone.version, SyncTombstone.id).all()
+        changes['deleted'] = [tombstone.to_dict() for tombstone in tombstones]
+    return changes
+
+def find_sync_conflict(row, base_version):
+    """Return 'conflict' if a row changed after the version the client last saw, else None"""
+    if base_version is not None and (row.version or 0) > base_version:
+        return 'conflict'
+    return None
+
+def _rows_by_client_id(model, user_id, operations):
+    """Rows a client already created for the client_id keys of the batch's creates, by key"""
+    keys = {operation['client_id'] for operation in operations if operation['op'] == 'create' and operation.get('client_id')}
+    if not keys:
+        return {}
+    return {row.client_id: row for row in model.query.filter(model.user_id == user_id, model.client_id.in_(keys))}
+
+def _stage_expense_batch(operations, user_id):
+    """Apply expense batch operations in the current transaction without committing it
+    
+    Returns the results, and a function that completes them once the transaction has committed.
+    """
+    results = []
+    
+    # Load every expense the batch touches with a single IN (...) query; ids out of the
+    # column's range can't match and are reported as not found
+    ids = {
+        operation['id'] for operation in operations
+        if operation['op'] in ('update', 'delete') and 0 < operation['id'] <= MAX_ROW_ID
+    }
+    existing = {}
+    deleted = set()
+    if ids:
+        existing = {
+            expense.id: expense
+            for expense in Expense.query.filter(Expense.user_id == user_id, Expense.id.in_(ids)).all()
+        }
+        
+        # Tell sync clients apart an expense deleted elsewhere from one that never existed
+        missing = ids - set(existing)
+        if missing:
+            deleted = set(db.session.scalars(
+                select(SyncTombstone.entity_id).where(
+                    SyncTombstone.user_id == user_id,
+                    SyncTombstone.entity == 'expense',
+                    SyncTombstone.entity_id.in_(missing)
+                )
+            ))
+    by_client_id = _rows_by_client_id(Expense, user_id, operations)
+    
+    created = []
+    replayed = []
+    written = []
+    removed = set()
+    deltas = {}
+    
+    def add_delta(date_value, category, amount, count):
+        key = (month_key(date_value), category)
+        total, rows = deltas.get(key, (0, 0))
+        deltas[key] = (total + amount, rows + count)
+    
+    for operation in operations:
+        action = operation['op']
+        fields = operation.get('expense')
+        
+        if action == 'create':
+            # A retry of a create that was already applied reports the row it made instead of adding a copy
+            client_id = operation.get('client_id')
+            if client_id in by_client_id:
+                replayed.append((len(results), by_client_id[client_id]))
+                results.append({'op': action, 'success': True, 'replayed': True})
+                continue
+            
+            expense = Expense(
+                category=fields['category'],
+                amount_minor=fields['amount_minor'],
+                date=fields['date'],
+                description=fields.get('description', ''),
+                user_id=user_id,
+                client_id=client_id
+            )
+            db.session.add(expense)
+            add_delta(expense.date, expense.category, expense.amount_minor, 1)
+            created.append((len(results), expense))
+            written.append(expense)
+            if client_id:
+                by_client_id[client_id] = expense
+            results.append({'op': action, 'success': True})
+            continue
+        
+        expense = existing.get(operation['id'])
+        if expense is None:
+            error = 'deleted' if operation['id'] in deleted else 'not_found'
+            results.append({'op': action, 'id': operation['id'], 'success': False, 'error': error})
+            continue
+        
+        # Keep the newer server copy and hand it back instead of overwriting it
+        if find_sync_conflict(expense, operation.get('version')):
+            results.append({
+                'op': action, 'id': expense.id, 'success': False, 'error': 'conflict', 'expense': expense.to_dict()
+            })
+            continue
+        
+        add_delta(expense.date, expense.category, -expense.amount_minor, -1)
+        if action == 'update':
+            expense.category = fields['category']
+            expense.amount_minor = fields['amount_minor']
+            expense.date = fields['date']
+            expense.description = fields.get('description', '')
+            add_delta(expense.date, expense.category, expense.amount_minor, 1)
+            written.append(expense)
+            results.append({'op': action, 'id': expense.id, 'success': True, 'expense': expense.to_dict()})
+        else:
+            results.append({'op': action, 'id': expense.id, 'success': True})
+            db.session.delete(expense)
+            # A later operation in the same batch can no longer see this expense, and
+            # earlier updates must not report a row that no longer exists
+            del existing[expense.id]
+            removed.add(expense.id)
+            if expense in written:
+                written.remove(expense)
+            for result in results:
+                if result.get('id') == expense.id:
+                    result.pop('expense', None)
+    
+    for (month, category), (total, count) in deltas.items():
+        if count or total:
+            _apply_rollup_delta(user_id, month, category, total, count)
+    
+    # Flush to assign ids to the created expenses before reporting them
+    db.session.flush()
+    for index, expense in created:
+        results[index].update({'id': expense.id, 'expense': expense.to_dict()})
+    for index, expense in replayed:
+        results[index]['id'] = expense.id
+    replayed = [(index, expense) for index, expense in replayed if expense.id not in removed]
+    
+    def finish():
+        # Every row the batch wrote carries the version its commit stamped
+        if written:
+            version = written[0].version
+            for result in results:
+                if result['success'] and 'expense' in result:
+                    result['expense']['version'] = version
+        
+        # Replayed rows are read back after the commit, as they may have kept an older version
+        for index, expense in replayed:
+            results[index]['expense'] = expense.to_dict()
+    return results, finish
+
+def _stage_category_batch(operations, user_id):
+    """Apply category batch operations in the current transaction without committing it, like _stage_expense_batch"""
+    results = []
+    ids = {
+        operation['id'] for operation in operations
+        if operation['op'] == 'update' and 0 < operation['id'] <= MAX_ROW_ID
+    }
+    existing = {}
+    if ids:
+        existing = {
+            category.id: category
+            for category in Category.query.filter(Category.user_id == user_id, Category.id.in_(ids)).all()
+        }
+    by_client_id = _rows_by_client_id(Category, user_id, operations)
+    
+    written = []
+    reported = []
+    for operation in operations:
+        action = operation['op']
+        fields = operation['category']
+        
+        if action == 'create':
+            client_id = operation.get('client_id')
+            if client_id in by_client_id:
+                reported.append((len(results), by_client_id[client_id]))
+                results.append({'op': action, 'success': True, 'replayed': True})
+                continue
+            
+            category = Category(user_id=user_id, client_id=client_id, **fields)
+            db.session.add(category)
+            written.append(category)
+            reported.append((len(results), category))
+            if client_id:
+                by_client_id[client_id] = category
+            results.append({'op': action, 'success': True})
+            continue
+        
+        category = existing.get(operation['id'])
+        if category is None:
+            results.append({'op': action, 'id': operation['id'], 'success': False, 'error': 'not_found'})
+            continue
+        if find_sync_conflict(category, operation.get('version')):
+            results.append({
+                'op': action, 'id': str(category.id), 'success': False, 'error': 'conflict',
+                'category': category.to_dict()
+            })
+            continue
+        
+        for name, value in fields.items():
+            setattr(category, name, value)
+        written.append(category)
+        reported.append((len(results), category))
+        results.append({'op': action, 'success': True})
+    
+    if written:
+        mark_user_data_changed(user_id)
+    
+    def finish():
+        if written:
+            CategoryManager.invalidate_cache(user_id)
+        
+        # Reported after the commit so each category carries its id and stamped version
+        for index, category in reported:
+            results[index].update({'id': str(category.id), 'category': category.to_dict()})
+    return results, finish
+
+def apply_sync_batch(category_operations, expense_operations, user_id):
+    """Apply a sync push's category and expense operations in one transaction
+    
+    Takes the operations of CategoryManager.apply_category_batch and ExpenseManager.apply_expense_batch
+    and returns both lists of results; if any part fails, nothing is written.
+    """
+    try:
+        # Categories first, so expenses recorded offline in a new category have it when they land
+        category_results, finish_categories = _stage_category_batch(category_operations, user_id)
+        expense_results, finish_expenses = _stage_expense_batch(expense_operations, user_id)
+        db.session.commit()
+        finish_categories()
+        finish_expenses()
+        return category_results, expense_results
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error applying sync batch: {str(e)}")
+        raise
+
+@event.listens_for(db.session, 'before_commit')
+def _apply_user_data_changes(session):
+    # Bump data versions, flag insight bundles and queue refreshes in the same transaction as the write.
+    # Releasing a savepoint fires this too; the marks wait for the outermost commit
+    if session.in_nested_transaction():
+        return
+    user_ids = session.info.pop('changed_user_ids', None)
+    if not user_ids:
+        return
+    session.execute(
+        update(User).where(User.id.in_(user_ids)).values(data_version=User.data_version + 1)
+    )
+    
+    # Stamp the rows this transaction wrote with the new version; the user row stays locked until
+    # commit, so concurrent writers get distinct versions and a sync never sees a version twice
+    new_versions = session.execute(select(User.id, User.data_version).where(User.id.in_(user_ids))).all()
+    for user_id, version in new_versions:
+        for model in (Expense, Category, SyncTombstone):
+            session.execute(
+                update(model)
+                .where(model.user_id == user_id, model.version.is_(None))
+                .values(version=version)
+                .execution_options(synchronize_session=False)
+            )
+    if has_request_context():
+        # Later reads in this request must not use the version looked up before the write
+        for user_id in user_ids:
+            g.get('data_versions', {}).pop(user_id, None)
+    session.execute(
+        update(InsightBundle)
+        .where(InsightBundle.user_id.in_(user_ids), InsightBundle.stale_since.is_(None))
+        .values(stale_since=datetime.utcnow())
+    )
+    enqueue_insight_jobs(user_ids, 'write', session=session)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _forget_user_data_changes(session, previous_transaction):
+    # A rolled back write changed nothing; savepoint rollbacks keep the outer transaction's marks
+    if not previous_transaction.nested:
+        session.info.pop('changed_user_ids', None)
+
+def month_key(value):
+    """Return the 'YYYY-MM' rollup key for a date, datetime or 'YYYY-MM-DD' string"""
+    if isinstance(value, str):
+        return value[:7]
+    return f"{value.year}-{value.month:02d}"
+
+def previous_month_key(month):
+    """Return the 'YYYY-MM' key of the month before the given key"""
+    year, month_number = int(month[:4]), int(month[5:7])
+    if month_number == 1:
+        return f"{year - 1}-12"
+    return f"{year}-{month_number - 1:02d}"
+
+def encode_expense_cursor(date_value, expense_id):
+    """Encode a (date, id) keyset position as an opaque pagination cursor"""
+    raw = f"{date_value.strftime('%Y-%m-%d')}:{int(expense_id)}"
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+def decode_expense_cursor(cursor):
+    """Decode a pagination cursor back into a (date, id) pair, raising ValueError if invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_part, id_part = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split(':')
+        return datetime.strptime(date_part, '%Y-%m-%d').date(), int(id_part)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _apply_rollup_delta(user_id, date_value, category, amount_minor, count):
+    """Add an amount (in minor units) and count delta to a rollup row inside the current transaction"""
+    month = month_key(date_value)
+    mark_user_data_changed(user_id)
+    key = and_(
+        ExpenseRollup.user_id == user_id,
+        ExpenseRollup.month == month,
+        ExpenseRollup.category == category
+    )
+    
+    # Increment in SQL so concurrent writers never lose an update
+    result = db.session.execute(
+        update(ExpenseRollup)
+        .where(key)
+        .values(total_minor=ExpenseRollup.total_minor + amount_minor, count=ExpenseRollup.count + count)
+    )
+    if result.rowcount:
+        return
+    
+    # No row yet for this key; another writer may create it first, so retry as an update
+    try:
+        with db.session.begin_nested():
+            db.session.execute(
+                insert(ExpenseRollup).values(
+                    user_id=user_id, month=month, category=category, total_minor=amount_minor, count=count
+                )
+            )
+    except IntegrityError:
+        db.session.execute(
+            update(ExpenseRollup)
+            .where(key)
+            .values(total_minor=ExpenseRollup.total_minor + amount_minor, count=ExpenseRollup.count + count)
+        )
+
 # Maintain the original interface for backward compatibility
 class ExpenseManager:
     @staticmethod
     def get_all_expenses(user_id=None):
         """Retrieve all expenses from the database for a specific user"""
         try:
+            statement = select(*ExpenseRow.columns).order_by(desc(Expense.date))
             if user_id:
-                expenses = Expense.query.filter_by(user_id=user_id).order_by(desc(Expense.date)).all()
-            else:
-                expenses = Expense.query.order_by(desc(Expense.date)).all()
-            return [expense.to_dict() for expense in expenses]
+                statement = statement.where(Expense.user_id == user_id)
+            return [expense.to_dict() for expense in read_rows(ExpenseRow, statement)]
         except SQLAlchemyError as e:
             logging.error(f"Database error retrieving expenses: {str(e)}")
             return []
-
+    
+    @staticmethod
+    def filter_expenses(query, category=None, start_date=None, end_date=None, min_amount=None, max_amount=None):
+        """Apply the optional listing filters to an expense query"""
+        if category:
+            query = query.filter(Expense.category == category)
+        if start_date:
+            query = query.filter(Expense.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
+        if end_date:
+            query = query.filter(Expense.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+        if min_amount is not None:
+            query = query.filter(Expense.amount_minor >= to_minor_units(min_amount))
+        if max_amount is not None:
+            query = query.filter(Expense.amount_minor <= to_minor_units(max_amount))
+        return query
+    
+    @staticmethod
+    def get_expenses_page(user_id, cursor=None, limit=50, **filters):
+        """Get one page of a user's expenses, newest first, using (date, id) keyset pagination"""
+        # Invalid cursors and filter values raise ValueError for the caller to report
+        query = ExpenseManager.filter_expenses(select(*ExpenseRow.columns).where(Expense.user_id == user_id), **filters)
+        
+        # Continue strictly after the last row of the previous page
+        if cursor:
+            cursor_date, cursor_id = decode_expense_cursor(cursor)
+            query = query.filter(or_(
+                Expense.date < cursor_date,
+                and_(Expense.date == cursor_date, Expense.id < cursor_id)
+            ))
+        
+        # Fetch one extra row to know whether another page exists
+        rows = read_rows(ExpenseRow, query.order_by(desc(Expense.date), desc(Expense.id)).limit(limit + 1))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_expense_cursor(rows[-1].date, rows[-1].id)
+        
+        return {
+            'expenses': [expense.to_dict() for expense in rows],
+            'next_cursor': next_cursor
+        }
+    
+    @staticmethod
+    def iter_expense_rows(user_id, batch_size=1000, **filters):
+        """Yield a user's expenses, newest first, as (id, category, amount_minor, date, description, created_at) rows"""
+        statement = ExpenseManager.filter_expenses(
+            select(
+                Expense.id, Expense.category, Expense.amount_minor,
+                Expense.date, Expense.description, Expense.created_at
+            ).where(Expense.user_id == user_id),
+            **filters
+        ).order_by(desc(Expense.date), desc(Expense.id))
+        
+        # yield_per streams through a server-side cursor so memory stays flat
+        result = db.session.execute(statement.execution_options(yield_per=batch_size))
+        try:
+            for row in result:
+                yield row
+        finally:
+            result.close()
+    
     @staticmethod
     def add_expense(category, amount, date, description="", user_id=None):
         """Add a new expense to the database"""
@@ -108,16 +788,18 @@ class ExpenseManager:
                 date_obj = date
             
             # Create new expense
+            amount_minor = to_minor_units(amount)
             new_expense = Expense(
                 category=category,
-                amount=float(amount),
+                amount_minor=amount_minor,
                 date=date_obj,
                 description=description,
                 user_id=user_id
             )
             
-            # Add and commit
+            # Add, update the rollup and commit together
             db.session.add(new_expense)
+            _apply_rollup_delta(user_id, date_obj, category, amount_minor, 1)
             db.session.commit()
             
             return new_expense.to_dict()
@@ -125,7 +807,82 @@ class ExpenseManager:
             db.session.rollback()
             logging.error(f"Error adding expense: {str(e)}")
             return None
-
+    
+    @staticmethod
+    def add_expenses_bulk(rows, user_id):
+        """Insert a batch of validated expenses and their rollup deltas in one transaction"""
+        # Each row is a dict with category, amount_minor (int), date (date) and description
+        if not rows:
+            return 0
+        
+        try:
+            created_at = datetime.utcnow()
+            records = [
+                {
+                    'category': row['category'],
+                    'amount_minor': row['amount_minor'],
+                    'date': row['date'],
+                    'description': row.get('description', ''),
+                    'created_at': created_at,
+                    'user_id': user_id
+                }
+                for row in rows
+            ]
+            
+            if db.engine.dialect.name == 'postgresql':
+                # COPY is much faster than INSERT for large batches on Postgres
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for record in records:
+                    writer.writerow([
+                        record['category'], record['amount_minor'], record['date'].isoformat(),
+                        record['description'], record['created_at'].isoformat(), record['user_id']
+                    ])
+                buffer.seek(0)
+                cursor = db.session.connection().connection.cursor()
+                cursor.copy_expert(
+                    "COPY expenses (category, amount_minor, date, description, created_at, user_id) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            else:
+                # A list of parameter sets runs as a single executemany
+                db.session.execute(insert(Expense), records)
+            
+            # Apply one rollup delta per (month, category) rather than per row
+            deltas = {}
+            for record in records:
+                key = (month_key(record['date']), record['category'])
+                total, count = deltas.get(key, (0, 0))
+                deltas[key] = (total + record['amount_minor'], count + 1)
+            for (month, category), (total, count) in deltas.items():
+                _apply_rollup_delta(user_id, month, category, total, count)
+            
+            db.session.commit()
+            return len(records)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error bulk adding expenses: {str(e)}")
+            raise
+    
+    @staticmethod
+    def apply_expense_batch(operations, user_id):
+        """Apply create/update/delete operations for a user in one transaction"""
+        # Each operation is {'op', 'id', 'expense'} with 'expense' holding validated fields
+        # for create/update, and optionally 'version': the row version the client last saw,
+        # which makes the operation fail with a conflict if the row changed since, and for
+        # create 'client_id', which makes a retried create report the row it already made;
+        # returns one result dict per operation, in order
+        try:
+            results, finish = _stage_expense_batch(operations, user_id)
+            db.session.commit()
+            finish()
+            return results
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error applying expense batch: {str(e)}")
+            raise
+    
     @staticmethod
     def update_expense(expense_id, category, amount, date, description="", user_id=None):
         """Update an existing expense in the database"""
@@ -137,22 +894,29 @@ class ExpenseManager:
                 expense = Expense.query.get(expense_id)
             
             if expense:
+                # Move the old values out of the rollup before changing them
+                previous = {'category': expense.category, 'date': expense.date.strftime('%Y-%m-%d')}
+                _apply_rollup_delta(expense.user_id, expense.date, expense.category, -expense.amount_minor, -1)
+                
                 # Update fields
                 expense.category = category
-                expense.amount = float(amount)
+                expense.amount_minor = to_minor_units(amount)
                 expense.date = datetime.strptime(date, '%Y-%m-%d').date()
                 expense.description = description
                 
+                _apply_rollup_delta(expense.user_id, expense.date, expense.category, expense.amount_minor, 1)
+                
                 # Commit changes
                 db.session.commit()
                 
-                return expense.to_dict()
+                # Callers refreshing totals need to know where the expense used to be
+                return dict(expense.to_dict(), previous=previous)
             return None
         except Exception as e:
             db.session.rollback()
             logging.error(f"Error updating expense: {str(e)}")
             return None
-
+    
     @staticmethod
     def delete_expense(expense_id, user_id=None):
         """Delete an expense from the database"""
@@ -167,7 +931,8 @@ class ExpenseManager:
                 # Store the data for return value
                 expense_data = expense.to_dict()
                 
-                # Delete the expense
+                # Delete the expense and remove it from the rollup
+                _apply_rollup_delta(expense.user_id, expense.date, expense.category, -expense.amount_minor, -1)
                 db.session.delete(expense)
                 db.session.commit()
                 
@@ -177,7 +942,7 @@ class ExpenseManager:
             db.session.rollback()
             logging.error(f"Error deleting expense: {str(e)}")
             return None
-
+    
     @staticmethod
     def get_expense_by_id(expense_id, user_id=None):
         """Retrieve a specific expense by ID from the database"""
@@ -190,20 +955,19 @@ class ExpenseManager:
         except Exception as e:
             logging.error(f"Error retrieving expense by ID: {str(e)}")
             return None
-
+    
     @staticmethod
     def get_expenses_by_category(category, user_id=None):
         """Get all expenses for a specific category from the database"""
         try:
+            statement = select(*ExpenseRow.columns).where(Expense.category == category)
             if user_id:
-                expenses = Expense.query.filter_by(category=category, user_id=user_id).all()
-            else:
-                expenses = Expense.query.filter_by(category=category).all()
-            return [expense.to_dict() for expense in expenses]
+                statement = statement.where(Expense.user_id == user_id)
+            return [expense.to_dict() for expense in read_rows(ExpenseRow, statement)]
         except Exception as e:
             logging.error(f"Error retrieving expenses by category: {str(e)}")
             return []
-
+    
     @staticmethod
     def get_expenses_by_date_range(start_date, end_date, user_id=None):
         """Get all expenses within a date range from the database"""
@@ -213,7 +977,7 @@ class ExpenseManager:
             end = datetime.strptime(end_date, '%Y-%m-%d').date()
             
             # Query database with date range and optional user_id
-            query = Expense.query.filter(
+            statement = select(*ExpenseRow.columns).where(
                 and_(
                     Expense.date >= start,
                     Expense.date <= end
@@ -222,82 +986,149 @@ class ExpenseManager:
             
             # Add user filter if provided
             if user_id:
-                query = query.filter_by(user_id=user_id)
+                statement = statement.where(Expense.user_id == user_id)
                 
-            expenses = query.all()
-            
-            return [expense.to_dict() for expense in expenses]
+            return [expense.to_dict() for expense in read_rows(ExpenseRow, statement)]
         except Exception as e:
             logging.error(f"Error retrieving expenses by date range: {str(e)}")
             return []
-
+    
     @staticmethod
+    @query_cache.cached('category_totals')
     def get_category_totals(user_id=None):
-        """Get total expenses by category from the database"""
+        """Get total expenses by category from the rollup table"""
         try:
-            # Use SQLAlchemy aggregate functions
             query = db.session.query(
-                Expense.category,
-                func.sum(Expense.amount).label('total')
-            )
+                ExpenseRollup.category,
+                func.sum(ExpenseRollup.total_minor).label('total')
+            ).filter(ExpenseRollup.count > 0)
             
             # Filter by user if provided
             if user_id:
-                query = query.filter_by(user_id=user_id)
+                query = query.filter(ExpenseRollup.user_id == user_id)
                 
-            category_totals = query.group_by(Expense.category).all()
+            category_totals = query.group_by(ExpenseRollup.category).all()
             
             # Convert to dictionary
-            return {category: float(total) for category, total in category_totals}
+            return {category: minor_to_float(total) for category, total in category_totals}
         except Exception as e:
             logging.error(f"Error retrieving category totals: {str(e)}")
-            return {}
-
+            return query_cache.fallback({})
+    
     @staticmethod
+    @query_cache.cached('monthly_totals')
     def get_monthly_totals(user_id=None):
-        """Get total expenses by month from the database"""
+        """Get total expenses by month from the rollup table"""
         try:
-            # Extract year and month from date and group
             query = db.session.query(
-                func.extract('year', Expense.date).label('year'),
-                func.extract('month', Expense.date).label('month'),
-                func.sum(Expense.amount).label('total')
-            )
+                ExpenseRollup.month,
+                func.sum(ExpenseRollup.total_minor).label('total')
+            ).filter(ExpenseRollup.count > 0)
             
             # Filter by user if provided
             if user_id:
-                query = query.filter_by(user_id=user_id)
+                query = query.filter(ExpenseRollup.user_id == user_id)
                 
-            monthly_totals_query = query.group_by(
-                func.extract('year', Expense.date),
-                func.extract('month', Expense.date)
-            ).all()
+            monthly_totals_query = query.group_by(ExpenseRollup.month).all()
             
-            # Format the result as required
-            monthly_totals = {}
-            for year, month, total in monthly_totals_query:
-                month_key = f"{int(year)}-{int(month):02d}"
-                monthly_totals[month_key] = float(total)
-                
-            return monthly_totals
+            return {month: minor_to_float(total) for month, total in monthly_totals_query}
         except Exception as e:
             logging.error(f"Error retrieving monthly totals: {str(e)}")
-            return {}
+            return query_cache.fallback({})
+    
+    @staticmethod
+    @query_cache.cached('rollup_totals')
+    def get_rollup_totals(months, user_id=None):
+        """Get category totals in minor units for each of the given 'YYYY-MM' months from the rollup table"""
+        totals = {month: {} for month in months}
+        try:
+            query = db.session.query(
+                ExpenseRollup.month,
+                ExpenseRollup.category,
+                func.sum(ExpenseRollup.total_minor).label('total')
+            ).filter(
+                ExpenseRollup.month.in_(list(months)),
+                ExpenseRollup.count > 0
+            )
+            
+            # Filter by user if provided
+            if user_id:
+                query = query.filter(ExpenseRollup.user_id == user_id)
+                
+            for month, category, total in query.group_by(ExpenseRollup.month, ExpenseRollup.category).all():
+                totals[month][category] = int(total)
+            return totals
+        except Exception as e:
+            logging.error(f"Error retrieving rollup totals: {str(e)}")
+            return query_cache.fallback(totals)
+    
+    @staticmethod
+    def get_month_category_totals(month, user_id=None):
+        """Get total expenses in minor units by category for one 'YYYY-MM' month from the rollup table"""
+        return ExpenseManager.get_rollup_totals([month], user_id=user_id)[month]
+    
+    @staticmethod
+    def get_daily_category_totals(start_date, end_date, user_id):
+        """Get (date, category, total_minor) rows per day and category for a user's expenses in a date range"""
+        try:
+            statement = select(
+                Expense.date, Expense.category, func.sum(Expense.amount_minor)
+            ).where(
+                Expense.user_id == user_id,
+                Expense.date >= start_date,
+                Expense.date <= end_date
+            ).group_by(Expense.date, Expense.category)
+            return [(row[0], row[1], int(row[2])) for row in db.session.execute(statement)]
+        except Exception as e:
+            logging.error(f"Error retrieving daily category totals: {str(e)}")
+            return []
 
 class CategoryManager:
+    # Per-process cache of each user's categories: {user_id: (loaded_at, data version, [category dicts])}
+    _cache = {}
+    _cache_lock = threading.Lock()
+    
     @staticmethod
     def get_all_categories(user_id=None):
-        """Retrieve all expense categories from the database"""
+        """Retrieve a user's expense categories, served from the per-user cache when fresh"""
         try:
-            if user_id:
-                categories = Category.query.all()
-            else:
-                categories = Category.query.all()
-            return [category.to_dict() for category in categories]
+            if not user_id:
+                return [category.to_dict() for category in read_rows(CategoryRow, select(*CategoryRow.columns))]
+            
+            # Other workers can't invalidate this process's cache, so entries are only reused at the
+            # data version they were loaded at; pages ETagged by that version must show its categories.
+            # The version is shared with the query cache, looked up at most once per request
+            version = query_cache.data_version(user_id)
+            ttl = current_app.config.get('CATEGORY_CACHE_TTL', 60)
+            with CategoryManager._cache_lock:
+                cached = CategoryManager._cache.get(user_id)
+            if cached is None or cached[1] != version or time.monotonic() - cached[0] > ttl:
+                statement = select(*CategoryRow.columns).where(Category.user_id == user_id)
+                categories = [category.to_dict() for category in read_rows(CategoryRow, statement)]
+                cached = (time.monotonic(), version, categories)
+                with CategoryManager._cache_lock:
+                    CategoryManager._cache[user_id] = cached
+            
+            # Callers decorate the dicts they get back, so hand out copies
+            return [dict(category) for category in cached[2]]
         except Exception as e:
             logging.error(f"Error retrieving categories: {str(e)}")
             return []
-
+    
+    @staticmethod
+    def get_categories_by_name(user_id=None):
+        """Get a user's categories keyed by English name, for matching Expense.category"""
+        return {category['name_en']: category for category in CategoryManager.get_all_categories(user_id=user_id)}
+    
+    @staticmethod
+    def invalidate_cache(user_id=None):
+        """Drop cached categories for a user, or for everyone when no user is given"""
+        with CategoryManager._cache_lock:
+            if user_id:
+                CategoryManager._cache.pop(user_id, None)
+            else:
+                CategoryManager._cache.clear()
+    
     @staticmethod
     def add_category(name_en, name_ar, budget=0, user_id=None):
         """Add a new expense category to the database"""
@@ -306,20 +1137,22 @@ class CategoryManager:
             new_category = Category(
                 name_en=name_en,
                 name_ar=name_ar,
-                budget=float(budget),
+                budget_minor=to_minor_units(budget),
                 user_id=user_id
             )
             
             # Add to database
             db.session.add(new_category)
+            mark_user_data_changed(user_id)
             db.session.commit()
+            CategoryManager.invalidate_cache(user_id)
             
             return new_category.to_dict()
         except Exception as e:
             db.session.rollback()
             logging.error(f"Error adding category: {str(e)}")
             return None
-
+    
     @staticmethod
     def update_category(category_id, name_en, name_ar, budget, user_id=None):
         """Update an existing category in the database"""
@@ -334,10 +1167,12 @@ class CategoryManager:
                 # Update fields
                 category.name_en = name_en
                 category.name_ar = name_ar
-                category.budget = float(budget)
+                category.budget_minor = to_minor_units(budget)
                 
                 # Commit changes
+                mark_user_data_changed(category.user_id)
                 db.session.commit()
+                CategoryManager.invalidate_cache(category.user_id)
                 
                 return category.to_dict()
             return None
@@ -345,7 +1180,22 @@ class CategoryManager:
             db.session.rollback()
             logging.error(f"Error updating category: {str(e)}")
             return None
-
+    
+    @staticmethod
+    def apply_category_batch(operations, user_id):
+        """Apply create/update category operations for a user in one transaction"""
+        # Each operation is {'op', 'id', 'category', 'version', 'client_id'} like in
+        # apply_expense_batch, with 'category' holding validated name_en, name_ar and budget_minor
+        try:
+            results, finish = _stage_category_batch(operations, user_id)
+            db.session.commit()
+            finish()
+            return results
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error applying category batch: {str(e)}")
+            raise
+    
     @staticmethod
     def get_category_by_id(category_id, user_id=None):
         """Get a category by its ID from the database"""
@@ -358,20 +1208,110 @@ class CategoryManager:
         except Exception as e:
             logging.error(f"Error retrieving category by ID: {str(e)}")
             return None
-
+    
     @staticmethod
     def get_category_budget(category_id, user_id=None):
         """Get the budget for a specific category from the database"""
         try:
+            statement = select(Category.budget_minor).where(Category.id == category_id)
             if user_id:
-                category = Category.query.filter_by(id=category_id, user_id=user_id).first()
-            else:
-                category = Category.query.get(category_id)
-            return float(category.budget) if category else 0
+                statement = statement.where(Category.user_id == user_id)
+            return minor_to_float(db.session.scalar(statement) or 0)
         except Exception as e:
             logging.error(f"Error retrieving category budget: {str(e)}")
             return 0
 
+def _aggregate_expenses_by_month(user_id=None):
+    """Aggregate the expenses table into rollup rows keyed by (user_id, month, category)"""
+    year = func.extract('year', Expense.date)
+    month = func.extract('month', Expense.date)
+    query = db.session.query(
+        Expense.user_id,
+        year.label('year'),
+        month.label('month'),
+        Expense.category,
+        func.sum(Expense.amount_minor).label('total'),
+        func.count(Expense.id).label('count')
+    )
+    
+    if user_id:
+        query = query.filter(Expense.user_id == user_id)
+        
+    rows = query.group_by(Expense.user_id, year, month, Expense.category).all()
+    return {
+        (row_user_id, f"{int(row_year)}-{int(row_month):02d}", category): (int(total), int(count))
+        for row_user_id, row_year, row_month, category, total, count in rows
+    }
+
+def rebuild_expense_rollups(user_id=None):
+    """Rebuild the rollup table from the expenses table, optionally for a single user"""
+    try:
+        aggregates = _aggregate_expenses_by_month(user_id)
+        
+        # Replace the existing rollup rows in one transaction
+        query = ExpenseRollup.query
+        if user_id:
+            query = query.filter_by(user_id=user_id)
+        previous_user_ids = {row_user_id for (row_user_id,) in query.with_entities(ExpenseRollup.user_id).distinct()}
+        query.delete(synchronize_session=False)
+        
+        # Totals served from the query cache, ETags and insight bundles are keyed by the data version
+        for rebuilt_user_id in previous_user_ids | {row_user_id for row_user_id, _, _ in aggregates}:
+            mark_user_data_changed(rebuilt_user_id)
+        
+        if aggregates:
+            db.session.execute(insert(ExpenseRollup), [
+                {'user_id': row_user_id, 'month': month, 'category': category, 'total_minor': total, 'count': count}
+                for (row_user_id, month, category), (total, count) in aggregates.items()
+            ])
+        db.session.commit()
+        
+        logging.info(f"Rebuilt {len(aggregates)} expense rollup rows")
+        return len(aggregates)
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error rebuilding expense rollups: {str(e)}")
+        raise
+
+def verify_expense_rollups(user_id=None):
+    """Compare the rollup table with the expenses table and return the keys that drifted"""
+    expected = _aggregate_expenses_by_month(user_id)
+    
+    statement = select(
+        ExpenseRollup.user_id, ExpenseRollup.month, ExpenseRollup.category, ExpenseRollup.total_minor, ExpenseRollup.count
+    ).where(ExpenseRollup.count != 0)
+    if user_id:
+        statement = statement.where(ExpenseRollup.user_id == user_id)
+    actual = {
+        (row_user_id, month, category): (int(total), int(count))
+        for row_user_id, month, category, total, count in db.session.execute(statement)
+    }
+    
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1], k[2])):
+        expected_total, expected_count = expected.get(key, (0, 0))
+        actual_total, actual_count = actual.get(key, (0, 0))
+        if expected_count != actual_count or expected_total != actual_total:
+            mismatches.append({
+                'user_id': key[0],
+                'month': key[1],
+                'category': key[2],
+                'expected_total': minor_to_float(expected_total),
+                'actual_total': minor_to_float(actual_total),
+                'expected_count': expected_count,
+                'actual_count': actual_count
+            })
+    return mismatches
+
+def backfill_expense_rollups():
+    """Build the rollup table on first start when expenses exist but no rollups do"""
+    try:
+        if ExpenseRollup.query.first() is None and Expense.query.first() is not None:
+            rebuild_expense_rollups()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error backfilling expense rollups: {str(e)}")
+
 # Function to migrate data from JSON files to database if needed
 def migrate_data_from_json_to_db():
     """Migrate existing data from JSON files to database"""
@@ -417,7 +1357,7 @@ def migrate_data_from_json_to_db():
                             id=int(category_data['id']),
                             name_en=category_data['name_en'],
                             name_ar=category_data['name_ar'],
-                            budget=float(category_data['budget']),
+                            budget_minor=to_minor_units(category_data['budget']),
                             user_id=default_user.id
                         )
                         db.session.add(new_category)
@@ -436,7 +1376,7 @@ def migrate_data_from_json_to_db():
                         
                         new_expense = Expense(
                             category=expense_data['category'],
-                            amount=float(expense_data['amount']),
+                            amount_minor=to_minor_units(expense_data['amount']),
                             date=date_obj,
                             description=expense_data.get('description', ''),
                             created_at=created_at,
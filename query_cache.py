@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, has_app_context, has_request_context
+from singleflight import single_flight
+
+# Set by QueryCache.fallback() while a missed read runs on this thread
+_load_state = threading.local()
+
+class LRUCacheBackend:
+    """In-process cache of serialized values, evicting least recently used entries beyond max_bytes"""
+    
+    name = 'memory'
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+    
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters['evictions'] += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._bytes)
+
+class SQLiteCacheBackend:
+    """Cache in a local SQLite file shared by every worker process on the host"""
+    
+    name = 'sqlite'
+    
+    # Recency is only rewritten when older than this, so most hits stay read-only
+    TOUCH_INTERVAL = 5.0
+    
+    # Counters are added to the shared totals after this many seconds
+    STATS_FLUSH_INTERVAL = 5.0
+    
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._pending = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (accessed)")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    
+    def _connect(self):
+        """One connection per thread; WAL lets readers in other processes run alongside a writer"""
+        # A connection inherited across fork (gunicorn --preload) must not be reused by the child
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+    
+    def _count(self, name, amount=1):
+        with self._pending_lock:
+            self._pending[name] += amount
+            if time.monotonic() - self._last_flush < self.STATS_FLUSH_INTERVAL:
+                return
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0, 'evictions': 0}
+            self._last_flush = time.monotonic()
+        self._flush_stats(pending)
+    
+    def _flush_stats(self, pending):
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                [(name, value) for name, value in pending.items() if value]
+            )
+    
+    def get(self, key):
+        connection = self._connect()
+        row = connection.execute("SELECT value, accessed FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+        
+        now = time.time()
+        if now - row[1] > self.TOUCH_INTERVAL:
+            connection.execute("UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count('hits')
+        return row[0]
+    
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            
+            # Evict the least recently used entries until the file is back under its budget
+            excess = connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0] - self.max_bytes
+            evicted = 0
+            while excess > 0:
+                rows = connection.execute(
+                    "SELECT key, size FROM cache_entries WHERE key != ? ORDER BY accessed LIMIT 64", (key,)
+                ).fetchall()
+                if not rows:
+                    break
+                for row_key, size in rows:
+                    connection.execute("DELETE FROM cache_entries WHERE key = ?", (row_key,))
+                    excess -= size
+                    evicted += 1
+                    if excess <= 0:
+                        break
+        if evicted:
+            self._count('evictions', evicted)
+    
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM cache_entries")
+    
+    def stats(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0, 'evictions': 0}
+            self._last_flush = time.monotonic()
+        self._flush_stats(pending)
+        
+        connection = self._connect()
+        totals = {'hits': 0, 'misses': 0, 'evictions': 0}
+        totals.update(connection.execute("SELECT name, value FROM cache_stats").fetchall())
+        entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+        return dict(totals, entries=entries, bytes=size)
+
+class QueryCache:
+    """Caches per-user aggregate reads, keyed by the user's data version so writes invalidate implicitly
+    
+    Misses are coalesced per key, so concurrent identical reads run one query.
+    """
+    
+    def __init__(self):
+        self.backend = None
+        self.database_key = None
+    
+    def init_app(self, app):
+        """Create the backend selected by QUERY_CACHE_BACKEND ('memory', 'sqlite' or 'none')"""
+        # Keys include the database, so databases sharing the cache file never see each other's
+        # entries; a reset or restored database is cleared by init-db or cache-clear instead
+        database_url = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        self.database_key = hashlib.sha256(database_url.encode('utf-8')).hexdigest()[:16]
+        
+        backend = app.config.get('QUERY_CACHE_BACKEND', 'memory')
+        max_bytes = app.config.get('QUERY_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        if backend == 'memory':
+            self.backend = LRUCacheBackend(max_bytes)
+        elif backend == 'sqlite':
+            self.backend = SQLiteCacheBackend(app.config['QUERY_CACHE_PATH'], max_bytes)
+        elif backend == 'none':
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown QUERY_CACHE_BACKEND: {backend}")
+    
+    def data_version(self, user_id):
+        """The user's data version, looked up at most once per request"""
+        from models import get_data_version
+        
+        # Pool threads reading for a request get a copy of its versions (see concurrent_reads)
+        if not has_request_context() and not (has_app_context() and 'data_versions' in g):
+            return get_data_version(user_id)
+        versions = g.setdefault('data_versions', {})
+        if user_id not in versions:
+            versions[user_id] = get_data_version(user_id)
+        return versions[user_id]
+    
+    def cached(self, namespace):
+        """Decorate a read taking user_id so its result is cached per user and data version"""
+        def decorator(function):
+            @wraps(function)
+            def wrapped(*args, user_id=None, **kwargs):
+                if not user_id:
+                    return function(*args, user_id=user_id, **kwargs)
+                
+                try:
+                    key = json.dumps(
+                        [self.database_key, namespace, user_id, self.data_version(user_id), args, sorted(kwargs.items())],
+                        default=str
+                    )
+                    cached = self.backend.get(key) if self.backend is not None else None
+                    if cached is not None:
+                        return json.loads(cached)
+                except Exception as e:
+                    # A broken cache must never break the read itself
+                    logging.error(f"Error reading query cache: {str(e)}")
+                    return function(*args, user_id=user_id, **kwargs)
+                
+                # Concurrent misses for the same key wait for one query instead of each running it
+                return single_flight.do(key, lambda: self._load(key, function, args, user_id, kwargs))
+            return wrapped
+        return decorator
+    
+    def fallback(self, result):
+        """Return a read's result from its error path, which must not be cached"""
+        _load_state.failed = True
+        return result
+    
+    def _load(self, key, function, args, user_id, kwargs):
+        """Run a missed read and store its result"""
+        enclosing_failed = getattr(_load_state, 'failed', False)
+        _load_state.failed = False
+        try:
+            result = function(*args, user_id=user_id, **kwargs)
+            failed = _load_state.failed
+        finally:
+            # A failed inner read makes any cached read built on it fail too
+            _load_state.failed = enclosing_failed or _load_state.failed
+        
+        # Fallbacks from a failed query would be served as real data until the next write;
+        # empty results aren't cached either
+        if failed or not result or self.backend is None:
+            return result
+        try:
+            self.backend.set(key, json.dumps(result).encode('utf-8'))
+        except Exception as e:
+            logging.error(f"Error writing query cache: {str(e)}")
+        return result
+    
+    def stats(self):
+        """Hit, miss and eviction counters plus current size, or None when caching is off"""
+        if self.backend is None:
+            return None
+        return dict(self.backend.stats(), backend=self.backend.name)
+    
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+query_cache = QueryCache()
@@ -1,8 +1,15 @@
-from flask import render_template, request, redirect, url_for, jsonify, flash, session
+from flask import render_template, request, redirect, url_for, jsonify, flash, session, Response, stream_with_context
 from app import app, db
-from models import ExpenseManager, CategoryManager, User
-from utils import get_insights, get_spending_alerts, get_savings_tips
-from datetime import datetime, timedelta
+from models import ExpenseManager, CategoryManager, User, MAX_ROW_ID, apply_sync_batch, get_data_version, get_sync_changes, month_key, to_minor_units, from_minor_units, minor_to_float
+from dashboard import get_dashboard_snapshot
+from jobs import get_insight_bundle, load_insight_bundle, refresh_insight_bundle
+from http_cache import conditional_on_data_version
+from concurrent_reads import run_concurrently
+from sql_profiler import query_budget
+from importer import import_expenses_csv, parse_expense_row
+from datetime import datetime
+import csv
+import io
 import json
 from forms import LoginForm, RegistrationForm
 from flask_login import login_user, logout_user, current_user, login_required
@@ -22,7 +29,9 @@ category_translations = {
 # Set Arabic as the only language
 @app.before_request
 def set_language():
-    session['lang'] = 'ar'  # Always use Arabic
+    # Only write when it changes, so responses don't re-send the session cookie every time
+    if session.get('lang') != 'ar':
+        session['lang'] = 'ar'  # Always use Arabic
 
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -38,6 +47,11 @@ def login():
         if user is None or not user.check_password(form.password.data):
             flash('اسم المستخدم أو كلمة المرور غير صحيحة', 'danger')
             return redirect(url_for('login'))
+        
+        # Upgrade hashes made with older settings now that we have the plain password
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
             
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
@@ -81,11 +95,59 @@ def logout():
     flash('تم تسجيل الخروج بنجاح', 'info')
     return redirect(url_for('index'))
 
-# Helper function to get category display name in Arabic
-def get_category_display_name(category_name_en):
+# Helper function to get category display name in Arabic, preferring the user's own category names
+def get_category_display_name(category_name_en, categories_by_name=None):
+    if categories_by_name and category_name_en in categories_by_name:
+        return categories_by_name[category_name_en]['name_ar']
     return category_translations.get(category_name_en, category_name_en)
 
+# Helper function to get a category's spending against its budget for the budget bars
+def get_budget_status(category, spent_minor):
+    budget_minor = to_minor_units(category['budget'])
+    return {
+        'spent': minor_to_float(spent_minor),
+        'percentage': (spent_minor / budget_minor) * 100 if budget_minor > 0 else 0
+    }
+
+# Helper function to build the delta mutation APIs return so pages can update in place:
+# per-category totals for the affected months (and the current one) and the affected budget bars
+def get_spending_delta(user_id, expenses=(), category_names=()):
+    current_month = month_key(datetime.now())
+    months = sorted({month_key(expense['date']) for expense in expenses} | {current_month})
+    month_totals = ExpenseManager.get_rollup_totals(months, user_id=user_id)
+    categories_by_name = CategoryManager.get_categories_by_name(user_id)
+    
+    delta = {'current_month': current_month, 'months': {}, 'budgets': []}
+    for month in months:
+        totals = month_totals[month]
+        delta['months'][month] = {
+            'total': minor_to_float(sum(totals.values())),
+            'categories': [
+                {
+                    'category': category_name,
+                    'display_name': get_category_display_name(category_name, categories_by_name),
+                    'total': minor_to_float(total)
+                }
+                for category_name, total in totals.items()
+            ]
+        }
+    
+    affected = {expense['category'] for expense in expenses} | set(category_names)
+    for category_name in sorted(affected):
+        category = categories_by_name.get(category_name)
+        if category is None:
+            continue
+        delta['budgets'].append({
+            'category_id': category['id'],
+            'category': category_name,
+            'budget': category['budget'],
+            **get_budget_status(category, month_totals[current_month].get(category_name, 0))
+        })
+    return delta
+
 @app.route('/')
+@query_budget(9)
+@conditional_on_data_version(date_sensitive=True, with_insights=True)
 def index():
     # Check if user is not authenticated
     if not current_user.is_authenticated:
@@ -102,42 +164,36 @@ def index():
     # User is authenticated, get data for current user
     user_id = current_user.id
     
-    # Get current month's expenses
-    today = datetime.now()
-    start_of_month = datetime(today.year, today.month, 1).strftime('%Y-%m-%d')
-    end_of_month = (datetime(today.year, today.month + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    monthly_expenses = ExpenseManager.get_expenses_by_date_range(start_of_month, end_of_month, user_id=user_id)
-    total_spent = sum(expense['amount'] for expense in monthly_expenses)
+    # Load this month's spending and the categories once for the whole page, and the spending
+    # alerts and savings tips precomputed by the insight worker; the reads are independent
+    snapshot, bundle = run_concurrently(
+        lambda: get_dashboard_snapshot(user_id),
+        lambda: load_insight_bundle(user_id)
+    )
+    if bundle is None:
+        # Computing and storing it writes, so it happens here, from the snapshot just loaded
+        bundle = refresh_insight_bundle(user_id, snapshot)
+    category_totals = snapshot.current_minor
+    total_spent = snapshot.current_total
     
     # Get categories for the form
-    categories = CategoryManager.get_all_categories(user_id=user_id)
+    categories = snapshot.categories
     
-    # Get spending alerts and savings tips for this user
-    alerts = get_spending_alerts(user_id=user_id)
-    tips = get_savings_tips(user_id=user_id)
+    alerts = bundle['alerts']
+    tips = bundle['tips']
     
     # Get category totals for pie chart with localized category names
-    category_totals = {}
     display_category_totals = {}
     # Dictionary to keep track of English category names for each Arabic category name
     category_mappings = {}
     
-    for expense in monthly_expenses:
-        category_en = expense['category']
-        
-        # Add to English category totals (for backend operations)
-        if category_en in category_totals:
-            category_totals[category_en] += expense['amount']
-        else:
-            category_totals[category_en] = expense['amount']
-            
+    for category_en, total in category_totals.items():
         # Add to display category totals (for frontend display)
-        category_display = get_category_display_name(category_en)
+        category_display = get_category_display_name(category_en, snapshot.categories_by_name)
         if category_display in display_category_totals:
-            display_category_totals[category_display] += expense['amount']
+            display_category_totals[category_display] += total
         else:
-            display_category_totals[category_display] = expense['amount']
+            display_category_totals[category_display] = total
             
         # Store mapping from Arabic to English
         category_mappings[category_display] = category_en
@@ -146,7 +202,7 @@ def index():
         'index.html',
         categories=categories,
         total_spent=total_spent,
-        category_totals=json.dumps(display_category_totals),
+        category_totals=json.dumps({name: minor_to_float(total) for name, total in display_category_totals.items()}),
         category_names=json.dumps(category_mappings),
         alerts=alerts,
         tips=tips,
@@ -154,53 +210,45 @@ def index():
     )
 
 @app.route('/expenses')
+@query_budget(4)
 @login_required
+@conditional_on_data_version()
 def expenses():
     # Get user ID
     user_id = current_user.id
     
-    # Get all expenses for this user, sorted by date (newest first)
-    all_expenses = ExpenseManager.get_all_expenses(user_id=user_id)
-    all_expenses.sort(key=lambda x: x['date'], reverse=True)
-    
-    # Add display category name for each expense
-    for expense in all_expenses:
-        expense['display_category'] = get_category_display_name(expense['category'])
+    # Render only the first page; the rest is loaded from /api/expenses on scroll
+    page = ExpenseManager.get_expenses_page(user_id, limit=app.config['EXPENSES_PAGE_SIZE'])
+    first_page = page['expenses']
     
     # Get categories for the form
     categories = CategoryManager.get_all_categories(user_id=user_id)
+    categories_by_name = {category['name_en']: category for category in categories}
+    
+    # Add display category name for each expense
+    for expense in first_page:
+        expense['display_category'] = get_category_display_name(expense['category'], categories_by_name)
     
     return render_template(
         'expenses.html',
-        expenses=all_expenses,
+        expenses=first_page,
+        next_cursor=page['next_cursor'],
         categories=categories,
         translations=category_translations
     )
 
 @app.route('/budget')
+@query_budget(4)
 @login_required
+@conditional_on_data_version(date_sensitive=True)
 def budget():
     # Get user ID
     user_id = current_user.id
     
-    # Get all categories with their budgets for this user
-    categories = CategoryManager.get_all_categories(user_id=user_id)
-    
-    # Get current month spending for each category
-    today = datetime.now()
-    start_of_month = datetime(today.year, today.month, 1).strftime('%Y-%m-%d')
-    end_of_month = (datetime(today.year, today.month + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    monthly_expenses = ExpenseManager.get_expenses_by_date_range(start_of_month, end_of_month, user_id=user_id)
-    
-    # Calculate spending per category
-    category_spending = {}
-    for expense in monthly_expenses:
-        category = expense['category']
-        if category in category_spending:
-            category_spending[category] += expense['amount']
-        else:
-            category_spending[category] = expense['amount']
+    # Get all categories with their budgets and this month's spending for this user
+    snapshot = get_dashboard_snapshot(user_id)
+    categories = [dict(category) for category in snapshot.categories]
+    category_spending = snapshot.current_minor
     
     # Add spending to each category
     for category in categories:
@@ -210,27 +258,21 @@ def budget():
         # Always use Arabic display name
         category['display_name'] = category['name_ar']
         
-        if category_name in category_spending:
-            category['spent'] = category_spending[category_name]
-        else:
-            category['spent'] = 0
-            
-        # Calculate percentage of budget spent
-        if category['budget'] > 0:
-            category['percentage'] = (category['spent'] / category['budget']) * 100
-        else:
-            category['percentage'] = 0
+        # Add this month's spending and the percentage of budget spent
+        category.update(get_budget_status(category, category_spending.get(category_name, 0)))
     
     return render_template('budget.html', categories=categories)
 
 @app.route('/insights')
+@query_budget(9)
 @login_required
+@conditional_on_data_version(date_sensitive=True, with_insights=True)
 def insights():
     # Get user ID
     user_id = current_user.id
     
-    # Get insights data for this user
-    insights_data = get_insights(user_id=user_id)
+    # Get insights data precomputed by the insight worker
+    insights_data = get_insight_bundle(user_id)['insights']
     
     # Get monthly expenses for chart for this user
     monthly_totals = ExpenseManager.get_monthly_totals(user_id=user_id)
@@ -249,7 +291,55 @@ def insights():
         chart_values=json.dumps(chart_values)
     )
 
+# Helper function to read the expense listing filters from the query string
+def get_expense_filters():
+    filters = {
+        'category': request.args.get('category') or None,
+        'start_date': request.args.get('start_date') or None,
+        'end_date': request.args.get('end_date') or None,
+        'min_amount': request.args.get('min_amount') or None,
+        'max_amount': request.args.get('max_amount') or None
+    }
+    
+    # Validate here so bad input is reported as a 400 rather than a query error
+    for key in ('start_date', 'end_date'):
+        if filters[key]:
+            datetime.strptime(filters[key], '%Y-%m-%d')
+    for key in ('min_amount', 'max_amount'):
+        if filters[key] is not None:
+            try:
+                to_minor_units(filters[key])
+            except ArithmeticError:
+                raise ValueError(f"Invalid {key}: {filters[key]}")
+    return filters
+
 # API endpoints for AJAX operations
+@app.route('/api/expenses', methods=['GET'])
+@query_budget(4)
+@login_required
+@conditional_on_data_version()
+def list_expenses_api():
+    # Get user ID
+    user_id = current_user.id
+    
+    # Cap the page size so a single request can't pull the whole history
+    try:
+        limit = int(request.args.get('limit', app.config['EXPENSES_PAGE_SIZE']))
+        limit = max(1, min(limit, app.config['EXPENSES_MAX_PAGE_SIZE']))
+        filters = get_expense_filters()
+        page = ExpenseManager.get_expenses_page(
+            user_id, cursor=request.args.get('cursor'), limit=limit, **filters
+        )
+    except ValueError:
+        return jsonify({'success': False, 'message': 'معايير البحث غير صالحة'}), 400
+    
+    # Add display category name for each expense
+    categories_by_name = CategoryManager.get_categories_by_name(user_id=user_id)
+    for expense in page['expenses']:
+        expense['display_category'] = get_category_display_name(expense['category'], categories_by_name)
+    
+    return jsonify({'success': True, 'expenses': page['expenses'], 'next_cursor': page['next_cursor']})
+
 @app.route('/api/expenses', methods=['POST'])
 @login_required
 def add_expense_api():
@@ -267,10 +357,262 @@ def add_expense_api():
     
     try:
         new_expense = ExpenseManager.add_expense(category, amount, date, description, user_id=user_id)
-        return jsonify({'success': True, 'expense': new_expense})
+        if not new_expense:
+            return jsonify({'success': False, 'message': 'تعذر إضافة المصروف'}), 500
+        new_expense['display_category'] = get_category_display_name(new_expense['category'], CategoryManager.get_categories_by_name(user_id))
+        return jsonify({'success': True, 'expense': new_expense, 'delta': get_spending_delta(user_id, [new_expense])})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/expenses/export', methods=['GET'])
+@login_required
+def export_expenses_api():
+    # Get user ID
+    user_id = current_user.id
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'صيغة التصدير غير مدعومة'}), 400
+    
+    try:
+        filters = get_expense_filters()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'معايير البحث غير صالحة'}), 400
+    
+    rows = ExpenseManager.iter_expense_rows(
+        user_id, batch_size=app.config['EXPORT_BATCH_SIZE'], **filters
+    )
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['id', 'category', 'amount', 'date', 'description', 'created_at'])
+        for expense_id, category, amount, date, description, created_at in rows:
+            writer.writerow([
+                expense_id, category, from_minor_units(amount), date.strftime('%Y-%m-%d'),
+                description or '', created_at.isoformat() if created_at else ''
+            ])
+            # Flush in chunks rather than per row to keep the response efficient
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    def generate_ndjson():
+        for expense_id, category, amount, date, description, created_at in rows:
+            yield json.dumps({
+                'id': expense_id,
+                'category': category,
+                'amount': minor_to_float(amount),
+                'date': date.strftime('%Y-%m-%d'),
+                'description': description or '',
+                'created_at': created_at.isoformat() if created_at else None
+            }, ensure_ascii=False) + '\n'
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    filename = f"expenses-{datetime.now().strftime('%Y-%m-%d')}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/expenses/import', methods=['POST'])
+@login_required
+def import_expenses_api():
+    # Get user ID
+    user_id = current_user.id
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'message': 'يرجى اختيار ملف CSV'}), 400
+    
+    try:
+        batch_size = int(request.form.get('batch_size', app.config['IMPORT_BATCH_SIZE']))
+        batch_size = max(1, min(batch_size, app.config['IMPORT_BATCH_SIZE'] * 10))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'حجم الدفعة غير صالح'}), 400
+    
+    try:
+        # Decode the upload lazily so rows are parsed as they are read
+        text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        result = import_expenses_csv(
+            text_stream, user_id, batch_size=batch_size, max_errors=app.config['IMPORT_MAX_ERRORS']
+        )
+        success = result['imported'] > 0 or result['failed'] == 0
+        return jsonify({'success': success, **result}), 200 if success else 400
+    except UnicodeDecodeError:
+        return jsonify({'success': False, 'message': 'يجب أن يكون الملف بترميز UTF-8'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# Helper function to validate expense batch operations, shared by the batch and sync APIs; returns
+# one result per operation with the invalid ones filled in, and the valid ones parsed with their positions
+def parse_expense_operations(operations):
+    results = [None] * len(operations)
+    valid_operations = []
+    for index, operation in enumerate(operations):
+        action = operation.get('op') if isinstance(operation, dict) else None
+        if action not in ('create', 'update', 'delete'):
+            results[index] = {'op': action, 'success': False, 'message': 'نوع العملية غير صالح'}
+            continue
+        
+        parsed = {'op': action}
+        try:
+            if action != 'create':
+                parsed['id'] = int(operation.get('id'))
+                if not 0 < parsed['id'] <= MAX_ROW_ID:
+                    raise ValueError
+        except (TypeError, ValueError):
+            results[index] = {'op': action, 'success': False, 'message': 'معرف المصروف غير صالح'}
+            continue
+        try:
+            parsed['version'] = parse_sync_version(operation.get('version'))
+            if action == 'create':
+                parsed['client_id'] = parse_client_id(operation.get('client_id'))
+            if action != 'delete':
+                parsed['expense'] = parse_expense_row(operation)
+        except ValueError as e:
+            results[index] = {'op': action, 'id': parsed.get('id'), 'success': False, 'message': str(e)}
+            continue
+        valid_operations.append((index, parsed))
+    return results, valid_operations
+
+# Helper function to put the manager's results for the valid expense operations in place, with messages
+def report_expense_results(user_id, results, valid_operations, applied):
+    categories_by_name = CategoryManager.get_categories_by_name(user_id=user_id)
+    for (index, _), result in zip(valid_operations, applied):
+        error = result.get('error')
+        if error in SYNC_ERROR_MESSAGES:
+            result['message'] = SYNC_ERROR_MESSAGES[error]['expense']
+        if 'expense' in result:
+            result['expense']['display_category'] = get_category_display_name(
+                result['expense']['category'], categories_by_name
+            )
+        results[index] = result
+    return results
+
+# Helper function to validate and apply expense batch operations; returns one result per operation, in order
+def apply_expense_operations(user_id, operations):
+    # Validate every operation up front; only valid ones reach the database
+    results, valid_operations = parse_expense_operations(operations)
+    applied = []
+    if valid_operations:
+        applied = ExpenseManager.apply_expense_batch([parsed for _, parsed in valid_operations], user_id)
+    return report_expense_results(user_id, results, valid_operations, applied)
+
+# Helper function to validate category sync operations, like parse_expense_operations
+def parse_category_operations(operations):
+    results = [None] * len(operations)
+    valid_operations = []
+    for index, operation in enumerate(operations):
+        action = operation.get('op') if isinstance(operation, dict) else None
+        if action not in ('create', 'update'):
+            results[index] = {'op': action, 'success': False, 'message': 'نوع العملية غير صالح'}
+            continue
+        
+        parsed = {'op': action}
+        try:
+            if action == 'update':
+                parsed['id'] = int(operation.get('id'))
+                if not 0 < parsed['id'] <= MAX_ROW_ID:
+                    raise ValueError
+        except (TypeError, ValueError):
+            results[index] = {'op': action, 'success': False, 'message': 'معرف الفئة غير صالح'}
+            continue
+        try:
+            if action == 'create':
+                parsed['client_id'] = parse_client_id(operation.get('client_id'))
+        except ValueError as e:
+            results[index] = {'op': action, 'success': False, 'message': str(e)}
+            continue
+        
+        # Names arrive as arbitrary JSON; anything but text is rejected for this operation alone
+        names = [operation.get('name_en') or '', operation.get('name_ar') or '']
+        if not all(isinstance(name, str) for name in names):
+            results[index] = {'op': action, 'id': parsed.get('id'), 'success': False, 'message': 'اسم الفئة غير صالح'}
+            continue
+        name_en, name_ar = (name.strip() for name in names)
+        if not all([name_en, name_ar]):
+            results[index] = {'op': action, 'id': parsed.get('id'), 'success': False, 'message': 'اسم الفئة مطلوب'}
+            continue
+        if len(name_en) > 100 or len(name_ar) > 100:
+            results[index] = {'op': action, 'id': parsed.get('id'), 'success': False, 'message': 'اسم الفئة طويل جدًا'}
+            continue
+        try:
+            parsed['version'] = parse_sync_version(operation.get('version'))
+            budget_minor = to_minor_units(operation.get('budget', 0))
+            if budget_minor < 0:
+                raise ValueError
+        except (ArithmeticError, ValueError):
+            results[index] = {'op': action, 'id': parsed.get('id'), 'success': False, 'message': 'الميزانية غير صالحة'}
+            continue
+        parsed['category'] = {'name_en': name_en, 'name_ar': name_ar, 'budget_minor': budget_minor}
+        valid_operations.append((index, parsed))
+    return results, valid_operations
+
+# Helper function to put the manager's results for the valid category operations in place, with messages
+def report_category_results(results, valid_operations, applied):
+    for (index, _), result in zip(valid_operations, applied):
+        error = result.get('error')
+        if error in SYNC_ERROR_MESSAGES:
+            result['message'] = SYNC_ERROR_MESSAGES[error]['category']
+        results[index] = result
+    return results
+
+# Messages for operations the managers rejected, by error code and entity
+SYNC_ERROR_MESSAGES = {
+    'not_found': {'expense': 'المصروف غير موجود', 'category': 'الفئة غير موجودة'},
+    'deleted': {'expense': 'تم حذف المصروف من جهاز آخر', 'category': 'تم حذف الفئة من جهاز آخر'},
+    'conflict': {'expense': 'تم تعديل المصروف من جهاز آخر', 'category': 'تم تعديل الفئة من جهاز آخر'}
+}
+
+# Helper function to parse the key a sync client generated for a create, None when absent
+def parse_client_id(value):
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str) or len(value) > 64:
+        raise ValueError('معرف العميل غير صالح')
+    return value
+
+# Helper function to parse the row or data version a sync client sends, None when absent
+def parse_sync_version(value):
+    if value is None or value == '':
+        return None
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('رقم الإصدار غير صالح')
+    if version < 0:
+        raise ValueError('رقم الإصدار غير صالح')
+    return version
+
+@app.route('/api/expenses/batch', methods=['POST'])
+@login_required
+def batch_expenses_api():
+    # Get user ID
+    user_id = current_user.id
+    
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'message': 'لا توجد عمليات لتنفيذها'}), 400
+    if len(operations) > app.config['BATCH_MAX_OPERATIONS']:
+        return jsonify({'success': False, 'message': 'عدد العمليات أكبر من المسموح'}), 400
+    
+    try:
+        results = apply_expense_operations(user_id, operations)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    return jsonify({'success': all(result['success'] for result in results), 'results': results})
+
 @app.route('/api/expenses/<expense_id>', methods=['PUT'])
 @login_required
 def update_expense_api(expense_id):
@@ -291,7 +633,14 @@ def update_expense_api(expense_id):
     try:
         updated_expense = ExpenseManager.update_expense(expense_id, category, amount, date, description, user_id=user_id)
         if updated_expense:
-            return jsonify({'success': True, 'expense': updated_expense})
+            # The old month and category change too when an expense moves
+            previous = updated_expense.pop('previous')
+            updated_expense['display_category'] = get_category_display_name(updated_expense['category'], CategoryManager.get_categories_by_name(user_id))
+            return jsonify({
+                'success': True,
+                'expense': updated_expense,
+                'delta': get_spending_delta(user_id, [updated_expense, previous])
+            })
         else:
             return jsonify({'success': False, 'message': 'المصروف غير موجود'}), 404
     except Exception as e:
@@ -306,7 +655,7 @@ def delete_expense_api(expense_id):
     try:
         deleted_expense = ExpenseManager.delete_expense(expense_id, user_id=user_id)
         if deleted_expense:
-            return jsonify({'success': True})
+            return jsonify({'success': True, 'delta': get_spending_delta(user_id, [deleted_expense])})
         else:
             return jsonify({'success': False, 'message': 'المصروف غير موجود'}), 404
     except Exception as e:
@@ -351,8 +700,75 @@ def update_category_api(category_id):
     try:
         updated_category = CategoryManager.update_category(category_id, name_en, name_ar, budget, user_id=user_id)
         if updated_category:
-            return jsonify({'success': True, 'category': updated_category})
+            return jsonify({
+                'success': True,
+                'category': updated_category,
+                'delta': get_spending_delta(user_id, category_names=[updated_category['name_en']])
+            })
         else:
             return jsonify({'success': False, 'message': 'الفئة غير موجودة'}), 404
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/sync', methods=['GET'])
+@query_budget(6)
+@login_required
+@conditional_on_data_version()
+def get_sync_api():
+    # Get user ID
+    user_id = current_user.id
+    
+    # Without since the client gets everything, as on its first sync
+    try:
+        since = parse_sync_version(request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        # Clients apply 'deleted' before the changed rows, in case a deleted id was reused
+        changes = get_sync_changes(user_id, since=since)
+        return jsonify(dict(changes, success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/sync', methods=['POST'])
+@login_required
+def post_sync_api():
+    # Get user ID
+    user_id = current_user.id
+    
+    data = request.get_json(silent=True) or {}
+    category_operations = data.get('categories') or []
+    expense_operations = data.get('expenses') or []
+    
+    if not isinstance(category_operations, list) or not isinstance(expense_operations, list):
+        return jsonify({'success': False, 'message': 'لا توجد عمليات لتنفيذها'}), 400
+    if not category_operations and not expense_operations:
+        return jsonify({'success': False, 'message': 'لا توجد عمليات لتنفيذها'}), 400
+    if len(category_operations) + len(expense_operations) > app.config['BATCH_MAX_OPERATIONS']:
+        return jsonify({'success': False, 'message': 'عدد العمليات أكبر من المسموح'}), 400
+    
+    # Validate everything first, then apply categories and expenses in one transaction, so a
+    # failed push leaves nothing half-applied for the client to untangle
+    category_results, valid_categories = parse_category_operations(category_operations)
+    expense_results, valid_expenses = parse_expense_operations(expense_operations)
+    try:
+        applied_categories, applied_expenses = [], []
+        if valid_categories or valid_expenses:
+            applied_categories, applied_expenses = apply_sync_batch(
+                [parsed for _, parsed in valid_categories], [parsed for _, parsed in valid_expenses], user_id
+            )
+        report_category_results(category_results, valid_categories, applied_categories)
+        report_expense_results(user_id, expense_results, valid_expenses, applied_expenses)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    results = category_results + expense_results
+    return jsonify({
+        'success': all(result['success'] for result in results),
+        'categories': category_results,
+        'expenses': expense_results,
+        # The client pulls with since=version next; that also returns its own accepted edits
+        'version': get_data_version(user_id)
+    })
@@ -0,0 +1,50 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Key derivation runs on a bounded pool so at most PASSWORD_HASH_WORKERS hashes run at
+# once per process. scrypt and pbkdf2 release the GIL, so each running hash takes a whole
+# core; the default of half the cores keeps the others for serving pages during a burst
+# of logins. The request thread still blocks on the result, so this caps CPU, not threads
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Create the hashing pool on first use, sized from the app config"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('PASSWORD_HASH_WORKERS') or max(1, (os.cpu_count() or 1) // 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        return _executor
+
+def normalize_hash_method(method):
+    """Expand a werkzeug hash method to the full form stored in hashes, e.g. 'scrypt' -> 'scrypt:32768:8:1'"""
+    parts = method.split(':')
+    if parts[0] == 'scrypt':
+        defaults = ['scrypt', '32768', '8', '1']
+    elif parts[0] == 'pbkdf2':
+        defaults = ['pbkdf2', 'sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        raise ValueError(f"Unsupported password hash method: {method}")
+    return ':'.join(parts + defaults[len(parts):])
+
+def configured_hash_method():
+    """Return the full hash method configured by PASSWORD_HASH_METHOD"""
+    return normalize_hash_method(current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
+
+def hash_password(password):
+    """Hash a password with the configured method on the hashing pool"""
+    method = configured_hash_method()
+    salt_length = current_app.config.get('PASSWORD_SALT_LENGTH', 16)
+    return _get_executor().submit(generate_password_hash, password, method, salt_length).result()
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash on the hashing pool"""
+    return _get_executor().submit(check_password_hash, password_hash, password).result()
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with a different method or cost than is configured now"""
+    return password_hash.split('$', 1)[0] != configured_hash_method()
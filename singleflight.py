@@ -0,0 +1,55 @@
+import copy
+import threading
+
+class _Call:
+    """One in-flight computation and the outcome its waiters will share"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Runs at most one computation per key at a time; concurrent callers with that key share its result"""
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'executed': 0, 'shared': 0}
+    
+    def do(self, key, function):
+        """Return function(), or wait for the identical call already running under key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters['executed'] += 1
+            else:
+                self._counters['shared'] += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Every caller gets its own copy, since callers decorate the dicts they receive
+            return copy.deepcopy(call.result)
+        
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh computation; only those already waiting share this one
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stats(self):
+        """How many computations ran and how many callers reused one already in flight"""
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
+
+single_flight = SingleFlight()
@@ -0,0 +1,175 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, g, request
+from sqlalchemy import event
+
+# Call sites are the innermost frame in the application's own code, skipping the wrappers every read passes through
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SKIPPED_FILES = {
+    os.path.join(_APP_ROOT, name)
+    for name in ('sql_profiler.py', 'metrics.py', 'query_cache.py', 'singleflight.py', 'concurrent_reads.py')
+}
+
+# Profiles currently recording on this thread, innermost last
+_local = threading.local()
+
+class QueryProfile:
+    """SQL statements run while the profile was active, with their durations and call sites"""
+    
+    def __init__(self, repeat_threshold=3):
+        self.repeat_threshold = repeat_threshold
+        self.statements = []  # (statement, seconds, call site)
+        self.budget_violations = []  # (endpoint, queries, budget)
+    
+    @property
+    def count(self):
+        return len(self.statements)
+    
+    @property
+    def total_time(self):
+        return sum(seconds for _, seconds, _ in self.statements)
+    
+    def statement_counts(self):
+        """How many times each distinct statement ran; parameters differ, the SQL is identical"""
+        return Counter(statement for statement, _, _ in self.statements)
+    
+    def repeated(self):
+        """Statements run at least repeat_threshold times, the usual sign of an N+1 loop"""
+        return {
+            statement: count for statement, count in self.statement_counts().items() if count >= self.repeat_threshold
+        }
+    
+    def summary(self):
+        """One-line summary for the response header and log"""
+        return f"queries={self.count}; time_ms={self.total_time * 1000:.1f}; repeated={len(self.repeated())}"
+    
+    def report(self):
+        """Every statement with its duration and call site, repeated ones flagged"""
+        repeated = self.repeated()
+        lines = [self.summary()]
+        for statement, seconds, call_site in self.statements:
+            flag = f" [x{repeated[statement]}]" if statement in repeated else ''
+            lines.append(f"  {seconds * 1000:7.2f} ms  {call_site}{flag}  {' '.join(statement.split())[:200]}")
+        return '\n'.join(lines)
+
+def _active_profiles():
+    if not hasattr(_local, 'profiles'):
+        _local.profiles = []
+    return _local.profiles
+
+def _call_site():
+    """file:line (function) of the innermost application frame that led to the statement"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_ROOT) and filename not in _SKIPPED_FILES and 'site-packages' not in filename:
+            return f"{os.path.relpath(filename, _APP_ROOT)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return 'unknown'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profiles():
+        conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiles = _active_profiles()
+    started = conn.info.get('profiler_started')
+    if not profiles or not started:
+        return
+    entry = (statement, time.perf_counter() - started.pop(), _call_site())
+    for profile in profiles:
+        profile.statements.append(entry)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('profiler_started'):
+        connection.info['profiler_started'].pop()
+
+@contextmanager
+def profile_queries(repeat_threshold=3):
+    """Record the SQL this thread runs inside the block"""
+    profile = QueryProfile(repeat_threshold)
+    _active_profiles().append(profile)
+    try:
+        yield profile
+    finally:
+        _active_profiles().remove(profile)
+
+def active_profiles():
+    """The profiles recording on this thread, to hand to work it runs on another thread"""
+    return list(_active_profiles())
+
+@contextmanager
+def recording_into(profiles):
+    """Record the SQL this thread runs inside the block into profiles started on another thread"""
+    active = _active_profiles()
+    active.extend(profiles)
+    try:
+        yield
+    finally:
+        for profile in profiles:
+            active.remove(profile)
+
+def query_budget(max_queries):
+    """Declare how many SQL statements a view may run; the profiler reports requests over it"""
+    def decorator(view):
+        view.sql_query_budget = max_queries
+        return view
+    return decorator
+
+def _start_request():
+    # Profile when switched on, or when a test is already profiling this thread
+    if not current_app.config.get('SQL_PROFILER') and not _active_profiles():
+        return
+    profile = QueryProfile(current_app.config.get('SQL_PROFILER_REPEAT_THRESHOLD', 3))
+    _active_profiles().append(profile)
+    g.sql_profile = profile
+
+def _finish_request(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+    _active_profiles().remove(profile)
+    
+    endpoint = request.endpoint or 'unmatched'
+    response.headers['X-SQL-Profile'] = profile.summary()
+    if profile.repeated():
+        logging.warning(f"Repeated SQL in {request.method} {request.path}: {profile.report()}")
+    else:
+        logging.info(f"SQL for {request.method} {request.path}: {profile.summary()}")
+    
+    # Views declare budgets with @query_budget; enclosing profiles (tests) see the violation too
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'sql_query_budget', None)
+    if budget is not None and profile.count > budget:
+        logging.warning(f"{endpoint} ran {profile.count} SQL statements, over its budget of {budget}")
+        for outer in _active_profiles():
+            outer.budget_violations.append((endpoint, profile.count, budget))
+    return response
+
+def _teardown_request(exception):
+    # A request that raised never reached _finish_request; stop recording for it
+    profile = g.pop('sql_profile', None)
+    if profile is not None and profile in _active_profiles():
+        _active_profiles().remove(profile)
+
+def init_app(app):
+    """Install the SQL listeners and request hooks; profiling itself only runs when SQL_PROFILER is on"""
+    # Import here to avoid circular imports
+    from app import db
+    
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
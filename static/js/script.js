@@ -2,6 +2,9 @@
  * Main JavaScript for Personal Expense Tracker
  */
 
+// Category pie chart on the dashboard, updated in place after mutations
+let categoryPieChart = null;
+
 // Custom plugin for HTML legend in Chart.js
 Chart.plugins.register({
     id: 'customCategoryIcons',
@@ -230,6 +233,449 @@ function setupEventListeners() {
     categoryBudgetForms.forEach(form => {
         form.addEventListener('submit', handleUpdateCategoryBudget);
     });
+    
+    // Load older expenses on scroll
+    setupExpensePagination();
+    
+    // Multi-select edit and delete in the expenses table
+    setupBulkActions();
+}
+
+/**
+ * Setup selection checkboxes and the bulk delete / category change actions
+ */
+function setupBulkActions() {
+    const tableBody = document.getElementById('expenses-table-body');
+    const bulkActions = document.getElementById('bulk-actions');
+    if (!tableBody || !bulkActions) {
+        return;
+    }
+    
+    const selectAll = document.getElementById('select-all-expenses');
+    if (selectAll) {
+        selectAll.addEventListener('change', function() {
+            tableBody.querySelectorAll('.expense-select').forEach(checkbox => {
+                checkbox.checked = selectAll.checked;
+            });
+            updateBulkActions();
+        });
+    }
+    
+    // Rows are appended as pages load, so listen on the table body
+    tableBody.addEventListener('change', function(event) {
+        if (event.target.classList.contains('expense-select')) {
+            updateBulkActions();
+        }
+    });
+    
+    document.getElementById('bulk-delete-btn').addEventListener('click', handleBulkDelete);
+    document.getElementById('bulk-category-btn').addEventListener('click', handleBulkCategoryChange);
+}
+
+/**
+ * Get the checkboxes of the currently selected expense rows
+ * @returns {Array} Checked checkbox elements
+ */
+function getSelectedExpenseCheckboxes() {
+    return Array.from(document.querySelectorAll('#expenses-table-body .expense-select:checked'));
+}
+
+/**
+ * Show the bulk actions only while at least one expense is selected
+ */
+function updateBulkActions() {
+    const bulkActions = document.getElementById('bulk-actions');
+    const selectedCount = getSelectedExpenseCheckboxes().length;
+    
+    bulkActions.style.display = selectedCount > 0 ? 'flex' : 'none';
+    document.getElementById('bulk-selected-count').textContent = selectedCount;
+}
+
+/**
+ * Send a list of create/update/delete operations to the batch API
+ * @param {Array} operations - Operations for /api/expenses/batch
+ * @returns {Promise} Resolves with the parsed response
+ */
+function sendExpenseBatch(operations) {
+    return fetch('/api/expenses/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ operations: operations })
+    })
+    .then(response => response.json());
+}
+
+/**
+ * Delete all selected expenses in one request
+ */
+function handleBulkDelete() {
+    const checkboxes = getSelectedExpenseCheckboxes();
+    if (checkboxes.length === 0 || !confirm(`هل أنت متأكد من حذف ${checkboxes.length} من المصاريف؟`)) {
+        return;
+    }
+    
+    const operations = checkboxes.map(checkbox => ({ op: 'delete', id: checkbox.value }));
+    
+    sendExpenseBatch(operations)
+    .then(data => {
+        if (!data.results) {
+            showAlert('خطأ: ' + data.message, 'danger');
+            return;
+        }
+        
+        // Remove the rows whose delete succeeded
+        let deleted = 0;
+        data.results.forEach((result, index) => {
+            if (result.success) {
+                checkboxes[index].closest('tr').remove();
+                deleted++;
+            }
+        });
+        
+        if (data.success) {
+            showAlert(`تم حذف ${deleted} من المصاريف بنجاح`, 'success');
+        } else {
+            showAlert(`تم حذف ${deleted} من ${checkboxes.length} فقط`, 'warning');
+        }
+        updateBulkActions();
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showAlert('حدث خطأ أثناء حذف المصاريف', 'danger');
+    });
+}
+
+/**
+ * Move all selected expenses to the chosen category in one request
+ */
+function handleBulkCategoryChange() {
+    const checkboxes = getSelectedExpenseCheckboxes();
+    const categorySelect = document.getElementById('bulk-category');
+    const category = categorySelect.value;
+    
+    if (checkboxes.length === 0) {
+        return;
+    }
+    if (!category) {
+        showAlert('يرجى اختيار الفئة الجديدة', 'warning');
+        return;
+    }
+    
+    // Updates carry the full expense, so read the other fields from each row
+    const operations = checkboxes.map(checkbox => {
+        const row = checkbox.closest('tr');
+        return {
+            op: 'update',
+            id: checkbox.value,
+            category: category,
+            amount: parseFloat(row.querySelector('.expense-amount').textContent.replace(/[^\d.-]/g, '')),
+            date: row.querySelector('.expense-date').getAttribute('data-date'),
+            description: row.querySelector('.expense-description').textContent.trim()
+        };
+    });
+    
+    sendExpenseBatch(operations)
+    .then(data => {
+        if (!data.results) {
+            showAlert('خطأ: ' + data.message, 'danger');
+            return;
+        }
+        
+        // Swap in freshly rendered rows for the updated expenses
+        let updated = 0;
+        data.results.forEach((result, index) => {
+            if (result.success) {
+                const newRow = createExpenseRow(result.expense);
+                checkboxes[index].closest('tr').replaceWith(newRow);
+                updated++;
+            }
+        });
+        
+        if (data.success) {
+            showAlert(`تم تحديث ${updated} من المصاريف بنجاح`, 'success');
+        } else {
+            showAlert(`تم تحديث ${updated} من ${checkboxes.length} فقط`, 'warning');
+        }
+        categorySelect.value = '';
+        updateBulkActions();
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showAlert('حدث خطأ أثناء تحديث المصاريف', 'danger');
+    });
+}
+
+/**
+ * Load further pages of the expenses table from /api/expenses as the user scrolls
+ */
+function setupExpensePagination() {
+    const tableBody = document.getElementById('expenses-table-body');
+    const loadMore = document.getElementById('expenses-load-more');
+    if (!tableBody || !loadMore) {
+        return;
+    }
+    
+    let nextCursor = tableBody.getAttribute('data-next-cursor');
+    let loading = false;
+    
+    const loadNextPage = function() {
+        if (loading || !nextCursor) {
+            return;
+        }
+        loading = true;
+        
+        fetch(`/api/expenses?cursor=${encodeURIComponent(nextCursor)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                data.expenses.forEach(expense => {
+                    tableBody.appendChild(createExpenseRow(expense));
+                });
+                nextCursor = data.next_cursor;
+                tableBody.setAttribute('data-next-cursor', nextCursor || '');
+            } else {
+                showAlert('خطأ: ' + data.message, 'danger');
+                nextCursor = null;
+            }
+            
+            if (!nextCursor) {
+                loadMore.style.display = 'none';
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showAlert('حدث خطأ أثناء تحميل المصاريف', 'danger');
+        })
+        .finally(() => {
+            loading = false;
+        });
+    };
+    
+    if (!nextCursor) {
+        return;
+    }
+    
+    // Fetch the next page whenever the loader row scrolls into view
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage();
+        }
+    }, { rootMargin: '200px' });
+    observer.observe(loadMore);
+}
+
+/**
+ * Get the Font Awesome icon class for an expense category
+ * @param {string} categoryNameEn - English category name
+ * @returns {string} Icon class
+ */
+function getExpenseCategoryIcon(categoryNameEn) {
+    const icons = {
+        'Food': 'fas fa-utensils',
+        'Transport': 'fas fa-car',
+        'Shopping': 'fas fa-shopping-bag',
+        'Bills': 'fas fa-file-invoice-dollar',
+        'Entertainment': 'fas fa-film',
+        'Health': 'fas fa-heartbeat',
+        'Education': 'fas fa-graduation-cap'
+    };
+    return icons[categoryNameEn] || 'fas fa-receipt';
+}
+
+/**
+ * Build an expenses table row matching the server-rendered markup
+ * @param {Object} expense - Expense as returned by /api/expenses
+ * @returns {HTMLTableRowElement} Table row
+ */
+function createExpenseRow(expense) {
+    const row = document.createElement('tr');
+    
+    const selectCell = document.createElement('td');
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.className = 'expense-select';
+    checkbox.value = expense.id;
+    selectCell.appendChild(checkbox);
+    
+    const categoryCell = document.createElement('td');
+    categoryCell.className = 'expense-category';
+    categoryCell.setAttribute('data-category', expense.category);
+    const iconWrapper = document.createElement('span');
+    iconWrapper.className = `category-icon category-${expense.category.toLowerCase()}`;
+    const icon = document.createElement('i');
+    icon.className = getExpenseCategoryIcon(expense.category);
+    iconWrapper.appendChild(icon);
+    categoryCell.appendChild(iconWrapper);
+    categoryCell.appendChild(document.createTextNode(' ' + (expense.display_category || expense.category)));
+    
+    const amountCell = document.createElement('td');
+    amountCell.className = 'expense-amount';
+    amountCell.textContent = `${expense.amount} ريال`;
+    
+    const dateCell = document.createElement('td');
+    dateCell.className = 'expense-date';
+    dateCell.setAttribute('data-date', expense.date);
+    dateCell.textContent = expense.date;
+    
+    const descriptionCell = document.createElement('td');
+    descriptionCell.className = 'expense-description';
+    descriptionCell.textContent = expense.description;
+    
+    const actionsCell = document.createElement('td');
+    actionsCell.innerHTML = `
+        <div class="action-buttons">
+            <button class="btn btn-sm btn-info edit-expense-btn" title="تعديل">
+                <i class="fas fa-edit"></i>
+            </button>
+            <button class="btn btn-sm btn-danger delete-expense-btn" title="حذف">
+                <i class="fas fa-trash"></i>
+            </button>
+        </div>
+    `;
+    const editButton = actionsCell.querySelector('.edit-expense-btn');
+    const deleteButton = actionsCell.querySelector('.delete-expense-btn');
+    editButton.setAttribute('data-id', expense.id);
+    deleteButton.setAttribute('data-id', expense.id);
+    editButton.addEventListener('click', handleEditExpenseClick);
+    deleteButton.addEventListener('click', handleDeleteExpense);
+    
+    row.appendChild(selectCell);
+    row.appendChild(categoryCell);
+    row.appendChild(amountCell);
+    row.appendChild(dateCell);
+    row.appendChild(descriptionCell);
+    row.appendChild(actionsCell);
+    return row;
+}
+
+/**
+ * Insert an expense row into the expenses table, keeping it sorted newest first
+ * @param {Object} expense - Expense as returned by the expenses API
+ */
+function insertExpenseRow(expense) {
+    const tableBody = document.getElementById('expenses-table-body');
+    if (!tableBody) {
+        return;
+    }
+    
+    const rows = Array.from(tableBody.querySelectorAll('tr'));
+    const nextRow = rows.find(row => {
+        const dateCell = row.querySelector('.expense-date');
+        return dateCell && dateCell.getAttribute('data-date') <= expense.date;
+    });
+    
+    if (nextRow) {
+        tableBody.insertBefore(createExpenseRow(expense), nextRow);
+    } else if (!tableBody.getAttribute('data-next-cursor')) {
+        // Rows older than the loaded pages arrive with pagination instead
+        tableBody.appendChild(createExpenseRow(expense));
+    }
+    
+    // The first expense on an empty page replaces the empty state with the table
+    const table = document.getElementById('expenses-table');
+    const emptyState = document.getElementById('expenses-empty');
+    if (table && emptyState) {
+        table.style.display = '';
+        emptyState.style.display = 'none';
+    }
+}
+
+/**
+ * Update totals, the category chart and budget bars from a mutation's delta
+ * @param {Object} delta - Delta returned by the expense and category APIs
+ */
+function applySpendingDelta(delta) {
+    if (!delta) {
+        return;
+    }
+    
+    const currentMonth = delta.months[delta.current_month];
+    if (currentMonth) {
+        const totalSpent = document.getElementById('total-spent');
+        if (totalSpent) {
+            totalSpent.textContent = `${currentMonth.total.toFixed(2)} ريال`;
+        }
+        updateCategoryPieChart(currentMonth.categories);
+    }
+    
+    delta.budgets.forEach(updateBudgetCard);
+}
+
+/**
+ * Replace the category pie chart's data with this month's category totals
+ * @param {Array} categories - Category totals from a spending delta
+ */
+function updateCategoryPieChart(categories) {
+    if (!categoryPieChart) {
+        return;
+    }
+    
+    // Categories sharing a display name are shown as one slice, as on the server
+    const totals = {};
+    const names = {};
+    categories.forEach(category => {
+        totals[category.display_name] = (totals[category.display_name] || 0) + category.total;
+        names[category.display_name] = category.category;
+    });
+    
+    const labels = Object.keys(totals);
+    const colors = generateRandomColors(labels.length);
+    const dataset = categoryPieChart.data.datasets[0];
+    categoryPieChart.data.labels = labels;
+    dataset.data = labels.map(label => Math.round(totals[label] * 100) / 100);
+    dataset.backgroundColor = colors;
+    dataset.borderColor = colors;
+    
+    // The legend plugin reads the names mapping and redraws once the flag is cleared
+    const categoryNamesElement = document.getElementById('category-names-data');
+    if (categoryNamesElement) {
+        categoryNamesElement.value = JSON.stringify(names);
+    }
+    categoryPieChart.customLegendRendered = false;
+    categoryPieChart.update();
+}
+
+/**
+ * Update a category card's spent amount, budget, progress bar and status
+ * @param {Object} budget - Budget status from a spending delta
+ */
+function updateBudgetCard(budget) {
+    const card = document.querySelector(`.category-card[data-category-id="${budget.category_id}"]`);
+    if (!card) {
+        return;
+    }
+    
+    card.querySelector('.budget-spent').textContent = `${budget.spent.toFixed(2)} ريال`;
+    card.querySelector('.budget-amount').textContent = `${budget.budget.toFixed(2)} ريال`;
+    
+    // Same thresholds as budget.html
+    const percentage = budget.percentage;
+    const progressBar = card.querySelector('.budget-progress .progress-bar');
+    progressBar.className = 'progress-bar';
+    if (percentage > 100) {
+        progressBar.classList.add('bg-danger');
+    } else if (percentage > 85) {
+        progressBar.classList.add('bg-warning');
+    }
+    progressBar.style.width = `${Math.min(percentage, 100)}%`;
+    
+    let status;
+    if (percentage > 100) {
+        status = `<div class="text-danger text-center mb-3">
+            <i class="fas fa-exclamation-circle"></i> تجاوزت الميزانية بنسبة ${Math.round(percentage - 100)}%
+        </div>`;
+    } else if (percentage > 85) {
+        status = `<div class="text-warning text-center mb-3">
+            <i class="fas fa-exclamation-triangle"></i> اقتربت من تجاوز الميزانية
+        </div>`;
+    } else {
+        status = `<div class="text-success text-center mb-3">
+            <i class="fas fa-check-circle"></i> ضمن الميزانية
+        </div>`;
+    }
+    card.querySelector('.budget-status').innerHTML = status;
 }
 
 /**
@@ -262,10 +708,9 @@ function handleAddExpense(event) {
                 dateInput.value = new Date().toISOString().split('T')[0];
             }
             
-            // Reload page after short delay to reflect the changes
-            setTimeout(() => {
-                window.location.reload();
-            }, 1000);
+            // Patch the table, chart and totals in place
+            insertExpenseRow(data.expense);
+            applySpendingDelta(data.delta);
         } else {
             // Show error message
             showAlert('خطأ: ' + data.message, 'danger');
@@ -287,7 +732,8 @@ function handleEditExpenseClick(event) {
     const expenseRow = button.closest('tr');
     
     // Get expense data from the row
-    const category = expenseRow.querySelector('.expense-category').textContent.trim();
+    const categoryCell = expenseRow.querySelector('.expense-category');
+    const category = categoryCell.getAttribute('data-category') || categoryCell.textContent.trim();
     const amount = parseFloat(expenseRow.querySelector('.expense-amount').textContent.replace(/[^\d.-]/g, ''));
     const date = expenseRow.querySelector('.expense-date').getAttribute('data-date');
     const description = expenseRow.querySelector('.expense-description').textContent.trim();
@@ -350,10 +796,13 @@ function handleUpdateExpense(event) {
                 modal.hide();
             }
             
-            // Reload page after short delay to reflect the changes
-            setTimeout(() => {
-                window.location.reload();
-            }, 1000);
+            // Swap in the updated row and patch the totals in place
+            const expenseRow = document.querySelector(`#expenses-table-body .edit-expense-btn[data-id="${expenseId}"]`);
+            if (expenseRow) {
+                expenseRow.closest('tr').remove();
+            }
+            insertExpenseRow(data.expense);
+            applySpendingDelta(data.delta);
         } else {
             // Show error message
             showAlert('خطأ: ' + data.message, 'danger');
@@ -392,6 +841,7 @@ function handleDeleteExpense(event) {
             if (expenseRow) {
                 expenseRow.remove();
             }
+            applySpendingDelta(data.delta);
         } else {
             // Show error message
             showAlert('خطأ: ' + data.message, 'danger');
@@ -441,10 +891,8 @@ function handleUpdateCategoryBudget(event) {
             // Show success message
             showAlert('تم تحديث الميزانية بنجاح', 'success');
             
-            // Reload page after short delay to reflect the changes
-            setTimeout(() => {
-                window.location.reload();
-            }, 1000);
+            // Patch the budget bar in place
+            applySpendingDelta(data.delta);
         } else {
             // Show error message
             showAlert('خطأ: ' + data.message, 'danger');
@@ -478,8 +926,8 @@ function initializeCharts() {
                 // Generate random colors for each category
                 const colors = generateRandomColors(labels.length);
                 
-                // Create chart
-                new Chart(pieChartCanvas, {
+                // Create chart, kept so mutations can update it in place
+                categoryPieChart = new Chart(pieChartCanvas, {
                     type: 'pie',
                     data: {
                         labels: labels,
@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+import pytest
+
+# app.py reads its settings when it is imported, so point it at a scratch database first
+WORKDIR = tempfile.mkdtemp(prefix='fintrack-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ['QUERY_CACHE_BACKEND'] = 'memory'
+# A cheap hash keeps registering and logging in fast; the method is configurable anyway
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+PASSWORD = 'test-password'
+
+@pytest.fixture(scope='session')
+def app():
+    """The application with its schema created in the scratch database"""
+    import main
+    import commands
+    
+    main.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    
+    # init-db writes the legacy data files relative to the working directory
+    previous = os.getcwd()
+    os.chdir(WORKDIR)
+    try:
+        commands.init_database()
+    finally:
+        os.chdir(previous)
+    return main.app
+
+@pytest.fixture(autouse=True)
+def clean_database(app):
+    """Empty every table and drop the in-process caches after each test, as ids are reused"""
+    yield
+    import forecasting
+    import models
+    from app import db
+    from query_cache import query_cache
+    
+    with app.app_context():
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    query_cache.clear()
+    models.CategoryManager.invalidate_cache()
+    with models._user_cache_lock:
+        models._user_cache.clear()
+    with forecasting._cache_lock:
+        forecasting._cache.clear()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(client):
+    """Register a user through the form, which also creates their default categories, and log in"""
+    client.post('/register', data={
+        'username': 'test_user',
+        'email': 'test_user@example.com',
+        'password': PASSWORD,
+        'password2': PASSWORD
+    })
+    response = client.post('/login', data={'username': 'test_user', 'password': PASSWORD})
+    assert response.status_code == 302
+    
+    from app import db
+    from models import User
+    with client.application.app_context():
+        return db.session.scalar(db.select(User.id).where(User.username == 'test_user'))
+
+@pytest.fixture
+def add_expenses(client):
+    """Add expenses through the API: add_expenses(count) spreads them over categories and recent days"""
+    def add(count, categories=('Food', 'Transport', 'Bills', 'Shopping', 'Health')):
+        today = date.today()
+        for index in range(count):
+            response = client.post('/api/expenses', data={
+                'category': categories[index % len(categories)],
+                'amount': str(10 + index),
+                'date': (today - timedelta(days=index % 60)).isoformat()
+            })
+            assert response.get_json()['success']
+    return add
+
+@pytest.fixture
+def query_budget_check():
+    """Fail the test when a block runs more SQL than allowed, or a request exceeds its view's budget
+    
+        with query_budget_check(max_queries=6):
+            client.get('/')
+    """
+    from sql_profiler import profile_queries
+    
+    @contextmanager
+    def check(max_queries=None, max_repeats=None):
+        with profile_queries() as profile:
+            yield profile
+        if profile.budget_violations:
+            endpoint, queries, budget = profile.budget_violations[0]
+            pytest.fail(f"{endpoint} ran {queries} SQL statements, over its budget of {budget}\n{profile.report()}")
+        if max_queries is not None and profile.count > max_queries:
+            pytest.fail(f"Ran {profile.count} SQL statements, over the budget of {max_queries}\n{profile.report()}")
+        if max_repeats is not None and any(count > max_repeats for count in profile.statement_counts().values()):
+            pytest.fail(f"Statements repeated more than {max_repeats} times\n{profile.report()}")
+    return check
@@ -0,0 +1,34 @@
+from sqlalchemy import update
+from app import db
+from models import Category, CategoryManager, mark_user_data_changed
+
+def edit_budget_in_another_worker(user_id, name_en, budget_minor):
+    """Change a budget the way another process would: the data version moves, this process's cache isn't told"""
+    db.session.execute(
+        update(Category).where(Category.user_id == user_id, Category.name_en == name_en).values(budget_minor=budget_minor)
+    )
+    mark_user_data_changed(user_id)
+    db.session.commit()
+
+def test_cached_categories_are_reloaded_at_a_new_data_version(app, user):
+    with app.app_context():
+        budgets = {category['name_en']: category['budget'] for category in CategoryManager.get_all_categories(user_id=user)}
+        assert budgets['Food'] != 4321
+        
+        edit_budget_in_another_worker(user, 'Food', 432100)
+    
+    with app.app_context():
+        categories = CategoryManager.get_categories_by_name(user_id=user)
+        assert categories['Food']['budget'] == 4321
+
+def test_budget_page_never_pairs_a_new_etag_with_old_categories(app, client, user):
+    client.get('/budget')
+    response = client.get('/budget')
+    etag = response.headers['ETag']
+    
+    with app.app_context():
+        edit_budget_in_another_worker(user, 'Food', 432100)
+    
+    response = client.get('/budget', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert '4321' in response.get_data(as_text=True)
@@ -0,0 +1,47 @@
+import pytest
+from prometheus_client import REGISTRY
+from app import db
+import dashboard
+from models import InsightBundle, CategoryManager
+from query_cache import query_cache
+from sql_profiler import profile_queries
+
+@pytest.fixture
+def concurrent_reads(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CONCURRENT_READS', True)
+
+def cold_get(client, path):
+    """Request a page with the caches dropped and return how many SQL statements it ran"""
+    query_cache.clear()
+    CategoryManager.invalidate_cache()
+    with profile_queries() as profile:
+        assert client.get(path).status_code == 200
+    return profile.count
+
+def request_queries_observed():
+    return REGISTRY.get_sample_value('fintrack_request_db_queries_sum', {'endpoint': 'index'}) or 0
+
+def test_dashboard_computes_a_missing_bundle_from_its_own_snapshot(app, client, user, add_expenses, concurrent_reads, monkeypatch):
+    add_expenses(5)
+    built = []
+    
+    class CountingSnapshot(dashboard.DashboardSnapshot):
+        def __init__(self, user_id, today=None):
+            built.append(user_id)
+            super().__init__(user_id, today)
+    monkeypatch.setattr(dashboard, 'DashboardSnapshot', CountingSnapshot)
+    
+    assert client.get('/').status_code == 200
+    assert built == [user]
+    with app.app_context():
+        assert db.session.get(InsightBundle, user) is not None
+
+def test_pool_queries_count_toward_the_request(app, client, user, add_expenses, monkeypatch):
+    add_expenses(5)
+    client.get('/')
+    sequential = cold_get(client, '/')
+    
+    monkeypatch.setitem(app.config, 'CONCURRENT_READS', True)
+    before = request_queries_observed()
+    assert cold_get(client, '/') == sequential
+    assert request_queries_observed() - before == sequential
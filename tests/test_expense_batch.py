@@ -0,0 +1,45 @@
+import logging
+from datetime import date
+import pytest
+from models import Expense, ExpenseManager
+
+TODAY = date.today().isoformat()
+
+def batch(client, operations):
+    response = client.post('/api/expenses/batch', json={'operations': operations})
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+def create_expense(client, amount='10'):
+    results = batch(client, [{'op': 'create', 'category': 'Food', 'amount': amount, 'date': TODAY}])
+    return results[0]['id']
+
+def test_update_then_delete_reports_no_row(client, user):
+    expense_id = create_expense(client)
+    
+    updated, removed = batch(client, [
+        {'op': 'update', 'id': expense_id, 'category': 'Food', 'amount': '20', 'date': TODAY},
+        {'op': 'delete', 'id': expense_id}
+    ])
+    assert updated['success'] and removed['success']
+    assert 'expense' not in updated
+
+@pytest.mark.parametrize('expense_id', [2 ** 31, 10 ** 30, -1, 0, 'abc'])
+def test_ids_out_of_range_fail_only_their_operation(client, user, expense_id):
+    results = batch(client, [
+        {'op': 'delete', 'id': expense_id},
+        {'op': 'create', 'category': 'Food', 'amount': '10', 'date': TODAY}
+    ])
+    assert [result['success'] for result in results] == [False, True]
+
+def test_failed_lookup_is_logged_and_rolled_back(app, user, monkeypatch, caplog):
+    class UnavailableQuery:
+        def filter(self, *args, **kwargs):
+            raise RuntimeError('database unavailable')
+    
+    with app.app_context():
+        monkeypatch.setattr(Expense, 'query', UnavailableQuery())
+        
+        with caplog.at_level(logging.ERROR), pytest.raises(RuntimeError):
+            ExpenseManager.apply_expense_batch([{'op': 'delete', 'id': 1}], user)
+        assert 'Error applying expense batch' in caplog.text
@@ -0,0 +1,17 @@
+TABLE_HIDDEN = 'id="expenses-table" style="display: none;"'
+EMPTY_STATE_HIDDEN = 'id="expenses-empty" style="display: none;"'
+
+def test_empty_expenses_page_renders_the_table_for_new_rows(client, user):
+    page = client.get('/expenses').get_data(as_text=True)
+    
+    # script.js inserts the first added expense into this body and then reveals the table
+    assert 'id="expenses-table-body"' in page
+    assert TABLE_HIDDEN in page
+    assert EMPTY_STATE_HIDDEN not in page
+
+def test_expenses_page_hides_the_empty_state_once_there_are_rows(client, user, add_expenses):
+    add_expenses(1)
+    page = client.get('/expenses').get_data(as_text=True)
+    
+    assert TABLE_HIDDEN not in page
+    assert EMPTY_STATE_HIDDEN in page
@@ -0,0 +1,88 @@
+import io
+from datetime import date
+import pytest
+from importer import parse_expense_row
+from models import MAX_AMOUNT_MINOR
+
+TODAY = date.today().isoformat()
+
+def row(amount):
+    return {'category': 'Food', 'amount': amount, 'date': TODAY}
+
+def test_parses_amount_to_minor_units():
+    assert parse_expense_row(row('12.345'))['amount_minor'] == 1235
+
+@pytest.mark.parametrize('amount', ['abc', '1e40', '-1e40', 'NaN', 'Infinity', '0', '-5', str(MAX_AMOUNT_MINOR)])
+def test_rejects_invalid_amounts_as_row_errors(amount):
+    with pytest.raises(ValueError):
+        parse_expense_row(row(amount))
+
+def test_accepts_the_largest_amount():
+    largest = f"{MAX_AMOUNT_MINOR // 100}.00"
+    assert parse_expense_row(row(largest))['amount_minor'] == MAX_AMOUNT_MINOR
+
+def test_csv_import_reports_bad_amounts_per_row(client, user):
+    csv_text = (
+        "category,amount,date,description\n"
+        f"Food,12.50,{TODAY},ok\n"
+        f"Food,1e40,{TODAY},too precise to quantize\n"
+        f"Food,99999999999999999999,{TODAY},over the maximum\n"
+        f"Transport,30,{TODAY},ok\n"
+    )
+    response = client.post('/api/expenses/import', data={
+        'file': (io.BytesIO(csv_text.encode('utf-8')), 'expenses.csv')
+    }, content_type='multipart/form-data')
+    
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['imported'] == 2
+    assert body['failed'] == 2
+    assert [error['line'] for error in body['errors']] == [3, 4]
+
+# The batch API answers with 'results', a sync push with 'expenses'
+@pytest.mark.parametrize('path, key, results_key', [
+    ('/api/expenses/batch', 'operations', 'results'),
+    ('/api/sync', 'expenses', 'expenses')
+])
+def test_batch_and_sync_report_bad_amounts_per_operation(client, user, path, key, results_key):
+    response = client.post(path, json={key: [
+        {'op': 'create', 'category': 'Food', 'amount': '1e40', 'date': TODAY},
+        {'op': 'create', 'category': 'Food', 'amount': '20', 'date': TODAY}
+    ]})
+    
+    assert response.status_code == 200
+    results = response.get_json()[results_key]
+    assert [result['success'] for result in results] == [False, True]
+
+def data_version(app, user_id):
+    from app import db
+    from models import User
+    with app.app_context():
+        return db.session.scalar(db.select(User.data_version).where(User.id == user_id))
+
+def test_csv_import_bumps_the_data_version_once(app, client, user):
+    # Every row lands in a new month, so each one opens a savepoint for its new rollup key
+    csv_text = "category,amount,date,description\n" + ''.join(
+        f"{category},10,{year}-{month:02d}-15,\n"
+        for year in (2023, 2024) for month in range(1, 13) for category in ('Food', 'Bills')
+    )
+    before = data_version(app, user)
+    response = client.post('/api/expenses/import', data={
+        'file': (io.BytesIO(csv_text.encode('utf-8')), 'expenses.csv')
+    }, content_type='multipart/form-data')
+    
+    assert response.get_json()['imported'] == 48
+    assert data_version(app, user) == before + 1
+    
+    from models import verify_expense_rollups
+    with app.app_context():
+        assert verify_expense_rollups(user_id=user) == []
+
+def test_batch_bumps_the_data_version_once(app, client, user):
+    before = data_version(app, user)
+    response = client.post('/api/expenses/batch', json={'operations': [
+        {'op': 'create', 'category': 'Food', 'amount': '10', 'date': f"2024-{month:02d}-01"} for month in range(1, 13)
+    ]})
+    
+    assert all(result['success'] for result in response.get_json()['results'])
+    assert data_version(app, user) == before + 1
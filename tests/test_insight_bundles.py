@@ -0,0 +1,46 @@
+import json
+from datetime import date, timedelta
+from sqlalchemy import select, update
+from app import db
+from jobs import enqueue_day_rollover_jobs, get_insight_bundle, run_worker
+from models import InsightBundle, InsightJob
+
+def backdate_bundle(user_id, days):
+    """Make the stored bundle look computed the given number of days ago, with a marker payload"""
+    day = date.today() - timedelta(days=days)
+    db.session.execute(update(InsightBundle).where(InsightBundle.user_id == user_id).values(
+        day=day, month=day.strftime('%Y-%m'), payload=json.dumps({'marker': 'yesterday'})
+    ))
+    db.session.commit()
+
+def test_bundle_from_an_earlier_day_is_recomputed(app, user, add_expenses):
+    add_expenses(5)
+    with app.app_context():
+        get_insight_bundle(user)
+        backdate_bundle(user, days=1)
+        
+        bundle = get_insight_bundle(user)
+        assert 'marker' not in bundle
+        assert db.session.get(InsightBundle, user).day == date.today()
+
+def test_bundle_from_today_is_reused(app, user, add_expenses):
+    add_expenses(5)
+    with app.app_context():
+        get_insight_bundle(user)
+        backdate_bundle(user, days=0)
+        
+        assert get_insight_bundle(user) == {'marker': 'yesterday'}
+
+def test_daily_pass_queues_bundles_from_earlier_days(app, user, add_expenses):
+    add_expenses(5)
+    with app.app_context():
+        run_worker(until_empty=True)
+        get_insight_bundle(user)
+        assert enqueue_day_rollover_jobs(date.today()) == 0
+        
+        backdate_bundle(user, days=1)
+        assert enqueue_day_rollover_jobs(date.today()) == 1
+        assert db.session.scalar(select(InsightJob.reason).where(InsightJob.status == 'pending')) == 'day_rollover'
+        
+        run_worker(until_empty=True)
+        assert db.session.get(InsightBundle, user).day == date.today()
@@ -0,0 +1,36 @@
+import pytest
+
+# The routes declare their budgets with @query_budget; these run with the caches dropped
+BUDGETED_PAGES = ['/', '/expenses', '/budget', '/insights', '/api/expenses', '/api/sync']
+
+def drop_caches():
+    from models import CategoryManager
+    from query_cache import query_cache
+    
+    query_cache.clear()
+    CategoryManager.invalidate_cache()
+
+@pytest.mark.parametrize('path', BUDGETED_PAGES)
+def test_route_within_its_query_budget_passes(client, user, add_expenses, query_budget_check, path):
+    add_expenses(20)
+    client.get(path)
+    drop_caches()
+    
+    with query_budget_check():
+        assert client.get(path).status_code == 200
+
+def test_route_over_its_query_budget_fails(app, client, user, add_expenses, query_budget_check, monkeypatch):
+    add_expenses(5)
+    monkeypatch.setattr(app.view_functions['budget'], 'sql_query_budget', 1)
+    drop_caches()
+    
+    with pytest.raises(pytest.fail.Exception, match='over its budget of 1'):
+        with query_budget_check():
+            client.get('/budget')
+
+def test_block_over_max_queries_fails(client, user, query_budget_check):
+    drop_caches()
+    
+    with pytest.raises(pytest.fail.Exception, match='over the budget of 0'):
+        with query_budget_check(max_queries=0):
+            client.get('/budget')
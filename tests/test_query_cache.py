@@ -0,0 +1,61 @@
+from sqlalchemy import update
+from app import db
+from models import ExpenseManager, ExpenseRollup, rebuild_expense_rollups
+from query_cache import query_cache
+
+def corrupt_rollups(user_id):
+    """Change the user's rollup totals behind the application's back, as drift would"""
+    db.session.execute(update(ExpenseRollup).where(ExpenseRollup.user_id == user_id).values(total_minor=999999))
+    db.session.commit()
+
+def test_rebuilding_rollups_invalidates_cached_totals(app, user, add_expenses):
+    add_expenses(5)
+    with app.app_context():
+        expected = ExpenseManager.get_monthly_totals(user_id=user)
+        query_cache.clear()
+        corrupt_rollups(user)
+        assert ExpenseManager.get_monthly_totals(user_id=user) != expected
+        
+        rebuild_expense_rollups()
+    
+    with app.app_context():
+        assert ExpenseManager.get_monthly_totals(user_id=user) == expected
+
+def test_rebuilding_rollups_changes_page_etags(app, client, user, add_expenses):
+    add_expenses(5)
+    # The first page after logging in shows the flashed welcome, which is never cached
+    client.get('/insights')
+    etag = client.get('/insights').headers['ETag']
+    assert client.get('/insights', headers={'If-None-Match': etag}).status_code == 304
+    
+    with app.app_context():
+        rebuild_expense_rollups(user_id=user)
+    
+    assert client.get('/insights', headers={'If-None-Match': etag}).status_code == 200
+
+def test_cache_entries_are_kept_apart_per_database(app, user, add_expenses, monkeypatch):
+    add_expenses(5)
+    with app.app_context():
+        cached = ExpenseManager.get_monthly_totals(user_id=user)
+        corrupt_rollups(user)
+        
+        # Another database with the same user id and data version must not get this one's entry
+        monkeypatch.setattr(query_cache, 'database_key', 'another-database')
+        assert ExpenseManager.get_monthly_totals(user_id=user) != cached
+
+def test_results_of_failed_reads_are_not_cached(app, user, add_expenses, monkeypatch):
+    add_expenses(5)
+    with app.app_context():
+        months = sorted(ExpenseManager.get_monthly_totals(user_id=user))
+        expected = ExpenseManager.get_rollup_totals(months, user_id=user)
+        query_cache.clear()
+        
+        def fail(*args, **kwargs):
+            raise RuntimeError('database unavailable')
+        monkeypatch.setattr(db.session, 'query', fail)
+        assert ExpenseManager.get_rollup_totals(months, user_id=user) == {month: {} for month in months}
+        assert ExpenseManager.get_monthly_totals(user_id=user) == {}
+        monkeypatch.undo()
+        
+        # Same data version: a cached fallback would be served here as zero spending
+        assert ExpenseManager.get_rollup_totals(months, user_id=user) == expected
@@ -0,0 +1,37 @@
+import pytest
+from sql_profiler import profile_queries
+
+# Pages whose SQL must not grow with the number of expenses or categories (no N+1 loops)
+PAGES = ['/', '/budget', '/insights']
+
+def count_queries(client, path):
+    from models import CategoryManager
+    from query_cache import query_cache
+    
+    # The first visit after a write may compute the insight bundle inline; measure a later one
+    client.get(path)
+    
+    # Every measured request pays for its reads, with nothing left in the caches
+    query_cache.clear()
+    CategoryManager.invalidate_cache()
+    with profile_queries() as profile:
+        response = client.get(path)
+    assert response.status_code == 200
+    return profile
+
+@pytest.mark.parametrize('path', PAGES)
+def test_page_query_count_is_independent_of_data_size(client, user, add_expenses, path):
+    add_expenses(3)
+    small = count_queries(client, path).count
+    
+    add_expenses(60)
+    large = count_queries(client, path)
+    
+    assert large.count == small, large.report()
+    assert not large.repeated(), large.report()
+
+@pytest.mark.parametrize('path, expected', [('/', 4), ('/budget', 3), ('/insights', 3)])
+def test_page_query_count(client, user, add_expenses, path, expected):
+    add_expenses(20)
+    profile = count_queries(client, path)
+    assert profile.count == expected, profile.report()
@@ -0,0 +1,133 @@
+from datetime import date
+import pytest
+import models
+from app import db
+from models import Category, Expense
+
+TODAY = date.today().isoformat()
+
+def pull(client, since=None):
+    response = client.get('/api/sync' if since is None else f'/api/sync?since={since}')
+    assert response.status_code == 200
+    return response.get_json()
+
+def push(client, categories=(), expenses=()):
+    return client.post('/api/sync', json={'categories': list(categories), 'expenses': list(expenses)})
+
+def create_expense(amount='10', client_id=None):
+    operation = {'op': 'create', 'category': 'Food', 'amount': amount, 'date': TODAY}
+    if client_id:
+        operation['client_id'] = client_id
+    return operation
+
+def count_rows(app, model):
+    with app.app_context():
+        return db.session.scalar(db.select(db.func.count()).select_from(model))
+
+def test_full_pull_returns_everything_with_the_current_version(client, user, add_expenses):
+    add_expenses(3)
+    changes = pull(client)
+    
+    assert changes['full'] is True
+    assert changes['deleted'] == []
+    assert len(changes['expense_changes']) == 3
+    assert changes['category_changes']
+    assert all(row['version'] <= changes['version'] for row in changes['expense_changes'])
+
+def test_delta_pull_returns_only_rows_changed_since_the_version(client, user, add_expenses):
+    add_expenses(3)
+    version = pull(client)['version']
+    assert pull(client, since=version)['expense_changes'] == []
+    
+    response = push(client, expenses=[create_expense('42')])
+    created = response.get_json()['expenses'][0]['expense']
+    
+    changes = pull(client, since=version)
+    assert changes['full'] is False
+    assert [row['id'] for row in changes['expense_changes']] == [created['id']]
+    assert changes['expense_changes'][0]['version'] == response.get_json()['version'] > version
+    assert pull(client, since=changes['version'])['expense_changes'] == []
+
+def test_delete_reaches_other_clients_as_a_tombstone(client, user):
+    expense = push(client, expenses=[create_expense()]).get_json()['expenses'][0]['expense']
+    version = pull(client)['version']
+    
+    push(client, expenses=[{'op': 'delete', 'id': expense['id']}])
+    changes = pull(client, since=version)
+    assert changes['deleted'] == [{'entity': 'expense', 'id': expense['id'], 'version': changes['version']}]
+    assert changes['expense_changes'] == []
+    
+    # A client still holding the expense learns it was deleted rather than never existing
+    result = push(client, expenses=[{
+        'op': 'update', 'id': expense['id'], 'category': 'Food', 'amount': '5', 'date': TODAY
+    }]).get_json()['expenses'][0]
+    assert result['success'] is False
+    assert result['error'] == 'deleted'
+
+def test_update_from_a_stale_version_conflicts_and_returns_the_server_copy(client, user):
+    expense = push(client, expenses=[create_expense('10')]).get_json()['expenses'][0]['expense']
+    stale_version = expense['version']
+    push(client, expenses=[{
+        'op': 'update', 'id': expense['id'], 'category': 'Food', 'amount': '20', 'date': TODAY, 'version': stale_version
+    }])
+    
+    result = push(client, expenses=[{
+        'op': 'update', 'id': expense['id'], 'category': 'Food', 'amount': '30', 'date': TODAY, 'version': stale_version
+    }]).get_json()['expenses'][0]
+    assert result['success'] is False
+    assert result['error'] == 'conflict'
+    assert result['message']
+    assert result['expense']['amount'] == 20.0
+    assert result['expense']['version'] > stale_version
+
+def test_retried_create_is_applied_once(app, client, user):
+    first = push(client, expenses=[create_expense(client_id='device-1:7')]).get_json()['expenses'][0]
+    # The response was lost and the client sends the same push again
+    retry = push(client, expenses=[create_expense(client_id='device-1:7')]).get_json()['expenses'][0]
+    
+    assert retry['success'] and retry['replayed']
+    assert retry['id'] == first['id']
+    assert retry['expense'] == first['expense']
+    assert count_rows(app, Expense) == 1
+
+def test_duplicate_client_keys_in_one_push_create_one_row(app, client, user):
+    results = push(client, expenses=[
+        create_expense(client_id='device-1:8'), create_expense(client_id='device-1:8')
+    ]).get_json()['expenses']
+    
+    assert [result['success'] for result in results] == [True, True]
+    assert results[0]['id'] == results[1]['id']
+    assert count_rows(app, Expense) == 1
+
+def test_retried_category_create_is_applied_once(app, client, user):
+    categories_before = count_rows(app, Category)
+    operation = {'op': 'create', 'name_en': 'Pets', 'name_ar': 'حيوانات', 'budget': 50, 'client_id': 'device-1:9'}
+    first = push(client, categories=[operation]).get_json()['categories'][0]
+    retry = push(client, categories=[operation]).get_json()['categories'][0]
+    
+    assert retry['replayed']
+    assert retry['id'] == first['id']
+    assert count_rows(app, Category) == categories_before + 1
+
+@pytest.mark.parametrize('client_id', [7, ['a'], 'k' * 65])
+def test_invalid_client_keys_fail_only_their_operation(client, user, client_id):
+    results = push(client, expenses=[
+        create_expense(client_id=client_id), create_expense()
+    ]).get_json()['expenses']
+    assert [result['success'] for result in results] == [False, True]
+
+def test_failed_push_applies_nothing(app, client, user, monkeypatch):
+    categories_before = count_rows(app, Category)
+    
+    def fail(*args, **kwargs):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(models, '_apply_rollup_delta', fail)
+    
+    response = push(
+        client,
+        categories=[{'op': 'create', 'name_en': 'Pets', 'name_ar': 'حيوانات', 'budget': 50}],
+        expenses=[create_expense()]
+    )
+    assert response.status_code == 500
+    assert count_rows(app, Category) == categories_before
+    assert count_rows(app, Expense) == 0
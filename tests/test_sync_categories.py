@@ -0,0 +1,20 @@
+import pytest
+
+@pytest.mark.parametrize('name_en', [123, ['Pets'], {'name': 'Pets'}, True, 'P' * 101])
+def test_invalid_category_names_fail_only_their_operation(client, user, name_en):
+    response = client.post('/api/sync', json={'categories': [
+        {'op': 'create', 'name_en': name_en, 'name_ar': 'حيوانات', 'budget': 50},
+        {'op': 'create', 'name_en': 'Gifts', 'name_ar': 'هدايا', 'budget': 50}
+    ]})
+    
+    assert response.status_code == 200
+    results = response.get_json()['categories']
+    assert [result['success'] for result in results] == [False, True]
+    assert results[0]['message']
+
+def test_missing_category_name_is_reported_as_required(client, user):
+    response = client.post('/api/sync', json={'categories': [
+        {'op': 'create', 'name_en': None, 'name_ar': 'حيوانات'}
+    ]})
+    
+    assert response.get_json()['categories'][0]['message'] == 'اسم الفئة مطلوب'
@@ -1,7 +1,7 @@
 import json
 import os
-from datetime import datetime, timedelta
-from models import ExpenseManager, CategoryManager
+from dashboard import get_dashboard_snapshot
+from models import to_minor_units
 
 def initialize_data_files():
     """Initialize data files if they don't exist (for backward compatibility)"""
@@ -61,12 +61,11 @@ def create_default_categories_if_empty():
             # Get or create default user
             default_user = User.query.filter_by(username='default_user').first()
             if not default_user:
-                from werkzeug.security import generate_password_hash
                 default_user = User(
                     username='default_user',
-                    email='default@example.com',
-                    password_hash=generate_password_hash('default_password')
+                    email='default@example.com'
                 )
+                default_user.set_password('default_password')
                 db.session.add(default_user)
                 db.session.commit()
                 print("Created default user for data migration")
@@ -82,11 +81,12 @@ def create_default_categories_for_user(user_id):
     """Create default expense categories for a specific user"""
     # Import here to avoid circular imports
     from app import db
-    from models import Category
+    from sqlalchemy import select
+    from models import Category, CategoryManager, mark_user_data_changed
     
-    # First check if user already has categories
-    existing_categories = Category.query.filter_by(user_id=user_id).first()
-    if existing_categories:
+    # First check if user already has categories; the id is enough, no need to load the row
+    existing_category = db.session.scalar(select(Category.id).where(Category.user_id == user_id).limit(1))
+    if existing_category:
         return True
         
     try:
@@ -139,44 +139,32 @@ def create_default_categories_for_user(user_id):
             category = Category(
                 name_en=cat_data["name_en"],
                 name_ar=cat_data["name_ar"],
-                budget=cat_data["budget"],
+                budget_minor=to_minor_units(cat_data["budget"]),
                 user_id=user_id
             )
             db.session.add(category)
         
         # Commit to database
+        mark_user_data_changed(user_id)
         db.session.commit()
+        CategoryManager.invalidate_cache(user_id)
         return True
     except Exception as e:
         import logging
         logging.error(f"Error creating default categories for user ID {user_id}: {str(e)}")
         return False
 
-def get_insights(user_id=None):
+def get_insights(user_id=None, snapshot=None):
     """Generate spending insights based on user's expenses"""
     insights = []
     
-    # Get current month's expenses
-    today = datetime.now()
-    start_of_month = datetime(today.year, today.month, 1).strftime('%Y-%m-%d')
-    end_of_month = (datetime(today.year, today.month + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    # Get previous month's date range
-    first_of_prev_month = (datetime(today.year, today.month, 1) - timedelta(days=1)).replace(day=1)
-    start_of_prev_month = first_of_prev_month.strftime('%Y-%m-%d')
-    end_of_prev_month = (datetime(today.year, today.month, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    # Get expenses for current and previous month for this user
-    current_expenses = ExpenseManager.get_expenses_by_date_range(start_of_month, end_of_month, user_id=user_id)
-    previous_expenses = ExpenseManager.get_expenses_by_date_range(start_of_prev_month, end_of_prev_month, user_id=user_id)
-    
-    # Calculate totals
-    current_total = sum(expense['amount'] for expense in current_expenses)
-    previous_total = sum(expense['amount'] for expense in previous_expenses)
+    # Monthly totals and budget use per category, computed in one vectorized pass
+    snapshot = snapshot or get_dashboard_snapshot(user_id)
+    analytics = snapshot.analytics
     
     # Calculate spending change percentage
-    if previous_total > 0:
-        change_percentage = ((current_total - previous_total) / previous_total) * 100
+    change_percentage = analytics.total_change_percent
+    if change_percentage is not None:
         if change_percentage > 10:
             insights.append({
                 'type': 'warning',
@@ -188,23 +176,16 @@ def get_insights(user_id=None):
                 'message': f'أحسنت! إنفاقك هذا الشهر أقل بنسبة {abs(change_percentage):.1f}% من الشهر الماضي'
             })
     
-    # Analyze category spending
-    categories = CategoryManager.get_all_categories(user_id=user_id)
-    for category in categories:
-        category_name = category['name_en']
-        
-        # Get current month spending for this category
-        category_expenses = [e for e in current_expenses if e['category'] == category_name]
-        category_total = sum(expense['amount'] for expense in category_expenses)
-        
-        # Check against budget
-        if category['budget'] > 0 and category_total > category['budget']:
-            percentage_over = ((category_total - category['budget']) / category['budget']) * 100
+    # Analyze category spending against budgets (utilization is a percentage of the budget)
+    for category_name in analytics.categories_where(analytics.utilization > 90):
+        category = snapshot.categories_by_name[category_name]
+        utilization = analytics.utilization[analytics.index[category_name]]
+        if utilization > 100:
             insights.append({
                 'type': 'danger',
-                'message': f'تجاوزت ميزانية {category["name_ar"]} بنسبة {percentage_over:.1f}%'
+                'message': f'تجاوزت ميزانية {category["name_ar"]} بنسبة {utilization - 100:.1f}%'
             })
-        elif category['budget'] > 0 and category_total > (category['budget'] * 0.9):
+        else:
             insights.append({
                 'type': 'warning',
                 'message': f'أنت قريب من تجاوز ميزانية {category["name_ar"]}'
@@ -219,38 +200,15 @@ def get_insights(user_id=None):
     
     return insights
 
-def get_spending_alerts(user_id=None):
+def get_spending_alerts(user_id=None, snapshot=None):
     """Generate spending alerts based on user's expenses"""
     alerts = []
     
-    # Get current month's expenses
-    today = datetime.now()
-    start_of_month = datetime(today.year, today.month, 1).strftime('%Y-%m-%d')
-    current_date = today.strftime('%Y-%m-%d')
-    
-    # Get previous month's date range
-    first_of_prev_month = (datetime(today.year, today.month, 1) - timedelta(days=1)).replace(day=1)
-    start_of_prev_month = first_of_prev_month.strftime('%Y-%m-%d')
-    end_of_prev_month = (datetime(today.year, today.month, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    # Get expenses for this user
-    current_month_expenses = ExpenseManager.get_expenses_by_date_range(start_of_month, current_date, user_id=user_id)
-    previous_month_expenses = ExpenseManager.get_expenses_by_date_range(start_of_prev_month, end_of_prev_month, user_id=user_id)
-    
-    # Calculate days elapsed in current month
-    days_elapsed = (today - datetime(today.year, today.month, 1)).days + 1
-    days_in_month = (datetime(today.year, today.month + 1, 1) - datetime(today.year, today.month, 1)).days
-    
-    # Project monthly total based on current spending rate
-    current_month_total = sum(expense['amount'] for expense in current_month_expenses)
-    
-    # Avoid division by zero if it's the first day of month
-    if days_elapsed > 0:
-        projected_month_total = (current_month_total / days_elapsed) * days_in_month
-    else:
-        projected_month_total = current_month_total
-    
-    previous_month_total = sum(expense['amount'] for expense in previous_month_expenses)
+    # Month-end projections come from the user's forecast model (recurring payments, seasonality)
+    snapshot = snapshot or get_dashboard_snapshot(user_id)
+    analytics = snapshot.analytics
+    projected_month_total = analytics.projected_total
+    previous_month_total = analytics.previous_total
     
     # Alert if projected spending is 20% more than previous month
     if previous_month_total > 0 and projected_month_total > (previous_month_total * 1.2):
@@ -260,39 +218,18 @@ def get_spending_alerts(user_id=None):
             'message': f'⚠️ معدل إنفاقك الحالي أعلى بنسبة {increase_percentage:.1f}% من الشهر الماضي. حاول خفض إنفاقك لتجنب تجاوز ميزانيتك.'
         })
     
-    # Check for high spending categories
-    categories = CategoryManager.get_all_categories(user_id=user_id)
-    
-    for category in categories:
-        category_name = category['name_en']
-        category_ar_name = category['name_ar']
-        category_budget = category['budget']
-        
-        # Skip categories with no budget
-        if category_budget <= 0:
-            continue
-        
-        # Get current month spending for this category
-        current_category_expenses = [e for e in current_month_expenses if e['category'] == category_name]
-        current_category_total = sum(expense['amount'] for expense in current_category_expenses)
-        
-        # Project category total for the month (avoid division by zero)
-        if days_elapsed > 0:
-            projected_category_total = (current_category_total / days_elapsed) * days_in_month
-        else:
-            projected_category_total = current_category_total
-        
-        # Alert if projected spending is over budget
-        if projected_category_total > category_budget:
-            percentage_over = ((projected_category_total - category_budget) / category_budget) * 100
-            alerts.append({
-                'title': f'تنبيه {category_ar_name}!',
-                'message': f'⚠️ من المتوقع أن تتجاوز ميزانية {category_ar_name} بنسبة {percentage_over:.1f}% بنهاية الشهر إذا استمر معدل الإنفاق الحالي.'
-            })
+    # Alert for categories projected to end the month over budget
+    for category_name in analytics.categories_where(analytics.projected_utilization > 100):
+        category_ar_name = snapshot.categories_by_name[category_name]['name_ar']
+        percentage_over = analytics.projected_utilization[analytics.index[category_name]] - 100
+        alerts.append({
+            'title': f'تنبيه {category_ar_name}!',
+            'message': f'⚠️ من المتوقع أن تتجاوز ميزانية {category_ar_name} بنسبة {percentage_over:.1f}% بنهاية الشهر إذا استمر معدل الإنفاق الحالي.'
+        })
     
     return alerts
 
-def get_savings_tips(user_id=None):
+def get_savings_tips(user_id=None, snapshot=None):
     """Generate savings tips based on user's spending patterns"""
     tips = [
         {
@@ -317,21 +254,9 @@ def get_savings_tips(user_id=None):
         }
     ]
     
-    # Get current month's expenses by category for this user
-    today = datetime.now()
-    start_of_month = datetime(today.year, today.month, 1).strftime('%Y-%m-%d')
-    end_of_month = (datetime(today.year, today.month + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    monthly_expenses = ExpenseManager.get_expenses_by_date_range(start_of_month, end_of_month, user_id=user_id)
-    
-    # Calculate spending per category
-    category_spending = {}
-    for expense in monthly_expenses:
-        category = expense['category']
-        if category in category_spending:
-            category_spending[category] += expense['amount']
-        else:
-            category_spending[category] = expense['amount']
+    # Get current month's spending by category for this user
+    snapshot = snapshot or get_dashboard_snapshot(user_id)
+    category_spending = snapshot.current_minor
     
     # Add personalized tips based on spending
     if category_spending.get('Food', 0) > 0: